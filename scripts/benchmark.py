@@ -0,0 +1,282 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: time each stage of the analysis pipeline on synthetic
+experiments of several sizes.
+
+Experiments are generated with the Ornstein-Uhlenbeck simulator (see
+:func:`tuna.simu.writer.generate_experiment`), at scales given as
+CONTAINERSxCOLONIESxGENERATIONS. For each scale, the following stages are
+timed separately, each one being fed with the output of the previous ones:
+
+    * generate: simulation and text export
+    * parse: reading container text files
+    * build_cells: :func:`build_cells` on parsed arrays
+    * filiation: :meth:`Container.make_filiation`
+    * trees: :meth:`Container.make_trees`
+    * decompose: decomposition of trees onto lineages
+    * timeseries_plain, timeseries_diff, timeseries_fit:
+      :meth:`Lineage.get_timeseries` for a raw observable, a
+      differentiated one, and a local-fit differentiated one
+    * dynamics: :func:`set_dynamics` (plain observable)
+    * stationary: :func:`set_stationary_autocorrelation` (plain observable)
+    * crosscorrelation: :func:`set_crosscorrelation` (plain vs. local-fit)
+
+Results are written as JSON: environment (versions, git revision) and one
+record per scale and stage, with the best time over repeats.
+
+Example
+-------
+python scripts/benchmark.py --scales 10x2x4 50x4x5 -o bench.json
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+import tuna
+from tuna import Parser, Observable
+from tuna.base.container import Container, build_cells
+from tuna.io import text
+from tuna.simu.writer import generate_experiment
+from tuna.stats.api import initialize_univariate
+from tuna.stats.compute import (set_dynamics,
+                                set_stationary_autocorrelation,
+                                set_crosscorrelation)
+from tuna.stats.single import StationaryUnivariate
+from tuna.stats.two import Bivariate
+from tuna.stats.utils import Regions, CompuParams
+
+OBSERVABLES = {
+    'plain': Observable(raw='ou'),
+    'diff': Observable(raw='exp_ou_int', differentiate=True, scale='log'),
+    'fit': Observable(raw='exp_ou_int', differentiate=True, scale='log',
+                      local_fit=True, time_window=15.)}
+
+
+def parse_scale(string):
+    """Returns (containers, colonies, generations) from 'CxTxG' string"""
+    values = [int(item) for item in string.lower().split('x')]
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError('scale must read CxTxG')
+    return tuple(values)
+
+
+class Timer(object):
+    """Records best time of named stages over repeats"""
+
+    def __init__(self):
+        self.times = {}
+        self.order = []
+        return
+
+    def run(self, stage, func, *args, **kwargs):
+        start = timeit.default_timer()
+        out = func(*args, **kwargs)
+        elapsed = timeit.default_timer() - start
+        if stage not in self.times:
+            self.order.append(stage)
+            self.times[stage] = []
+        self.times[stage].append(elapsed)
+        return out
+
+
+def _parse(exp):
+    folder = os.path.join(exp.abspath, 'containers')
+    return [(label, text.get_array(text.get_file(label, folder),
+                                   exp.datatype))
+            for label in exp.containers]
+
+
+def _build_cells(exp, arrays):
+    containers = []
+    for label, arr in arrays:
+        container = Container(label, exp=exp)
+        container.data = arr
+        container.cells = build_cells(arr, container=container)
+        containers.append(container)
+    return containers
+
+
+def _filiation(containers):
+    for container in containers:
+        container.make_filiation()
+    return
+
+
+def _trees(containers):
+    for container in containers:
+        container.make_trees()
+    return
+
+
+def _decompose(containers):
+    return [lineage for container in containers
+            for colony in container.trees
+            for lineage in colony.iter_lineages()]
+
+
+def _timeseries(lineages, obs):
+    return [lineage.get_timeseries(obs) for lineage in lineages]
+
+
+def _dynamics(parser, obs, timeseries):
+    univ = initialize_univariate(parser, obs)
+    set_dynamics(iter(timeseries), univ, univ.eval_times)
+    return univ
+
+
+def _stationary(univ, region, options, timeseries):
+    stationary = StationaryUnivariate(univ, region, options)
+    set_stationary_autocorrelation(iter(timeseries), univ, stationary,
+                                   tmin=region.tmin, tmax=region.tmax,
+                                   adjust_mean=options.adjust_mean,
+                                   disjoint=options.disjoint)
+    return stationary
+
+
+def _crosscorrelation(row_univ, col_univ, couples):
+    two = Bivariate(row_univ, col_univ)
+    set_crosscorrelation(iter(couples), row_univ, col_univ, two)
+    return two
+
+
+def run_pipeline(exp_path, timer):
+    """Run every stage once on experiment, recording times in timer
+
+    Returns
+    -------
+    dict of sizes: number of cells, rows and lineages
+    """
+    parser = Parser(exp_path)
+    exp = parser.experiment
+    arrays = timer.run('parse', _parse, exp)
+    containers = timer.run('build_cells', _build_cells, exp, arrays)
+    timer.run('filiation', _filiation, containers)
+    timer.run('trees', _trees, containers)
+    lineages = timer.run('decompose', _decompose, containers)
+    series = {}
+    for key in ['plain', 'diff', 'fit']:
+        series[key] = timer.run('timeseries_' + key, _timeseries, lineages,
+                                OBSERVABLES[key])
+    univ = timer.run('dynamics', _dynamics, parser, OBSERVABLES['plain'],
+                     series['plain'])
+    fit_univ = _dynamics(parser, OBSERVABLES['fit'], series['fit'])
+    region = Regions(parser).get('ALL')
+    timer.run('stationary', _stationary, univ, region, CompuParams(),
+              series['plain'])
+    timer.run('crosscorrelation', _crosscorrelation, univ, fit_univ,
+              list(zip(series['plain'], series['fit'])))
+    sizes = {'cells': sum(len(cont.cells) for cont in containers),
+             'rows': sum(len(arr) for label, arr in arrays),
+             'lineages': len(lineages)}
+    return sizes
+
+
+def get_environment():
+    """Versions of python, dependencies and tunacell (with git revision)"""
+    env = {'python': platform.python_version(),
+           'numpy': np.__version__,
+           'pandas': pd.__version__,
+           'platform': platform.platform()}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(tuna.__file__)))
+    try:
+        with open(os.devnull, 'w') as devnull:
+            rev = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                          cwd=root, stderr=devnull)
+        env['revision'] = rev.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        env['revision'] = None
+    return env
+
+
+def benchmark(scales, path, repeat=3, seed=0):
+    """Time pipeline stages on synthetic experiments
+
+    Parameters
+    ----------
+    scales : list of (containers, colonies, generations) triplets
+    path : str
+        directory where experiments are generated
+    repeat : int
+        number of runs of each stage; best time is reported
+    seed : int
+        simulation master seed
+
+    Returns
+    -------
+    records : list of dict
+    """
+    records = []
+    for nbr_container, nbr_colony, generations in scales:
+        scale = '{}x{}x{}'.format(nbr_container, nbr_colony, generations)
+        print('Scale {}'.format(scale))
+        timer = Timer()
+        exp_path = timer.run('generate', generate_experiment, path=path,
+                             label='bench_' + scale,
+                             nbr_container=nbr_container,
+                             nbr_colony=nbr_colony, generations=generations,
+                             seed=seed)
+        for index in range(repeat):
+            sizes = run_pipeline(exp_path, timer)
+        for stage in timer.order:
+            times = timer.times[stage]
+            record = {'scale': scale,
+                      'containers': nbr_container,
+                      'colonies': nbr_colony,
+                      'generations': generations,
+                      'stage': stage,
+                      'seconds': min(times),
+                      'runs': times}
+            record.update(sizes)
+            records.append(record)
+            print('  {:<20s}{:10.4f} s'.format(stage, min(times)))
+    return records
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    argparser.add_argument('-s', '--scales', type=parse_scale, nargs='+',
+                           help='Sizes as CONTAINERSxCOLONIESxGENERATIONS',
+                           default=[(5, 2, 3), (20, 2, 4), (20, 4, 5)])
+    argparser.add_argument('-r', '--repeat', type=int,
+                           help='Number of runs per stage (best is kept)',
+                           default=3)
+    argparser.add_argument('-o', '--output', type=str,
+                           help='JSON file where results are written',
+                           default='benchmark.json')
+    argparser.add_argument('-p', '--path', type=str,
+                           help=('Directory where experiments are generated'
+                                 ' (default: temporary, removed at exit)'),
+                           default=None)
+    argparser.add_argument('--seed', type=int,
+                           help='Simulation master seed',
+                           default=0)
+    args = argparser.parse_args()
+
+    if args.path is None:
+        path = tempfile.mkdtemp(prefix='tuna_bench_')
+    else:
+        path = os.path.abspath(os.path.expanduser(args.path))
+    try:
+        records = benchmark(args.scales, path, repeat=args.repeat,
+                            seed=args.seed)
+    finally:
+        if args.path is None:
+            shutil.rmtree(path)
+    output = {'environment': get_environment(),
+              'repeat': args.repeat,
+              'seed': args.seed,
+              'results': records}
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=1, sort_keys=True)
+    print('Results written in {}'.format(os.path.abspath(args.output)))
@@ -11,6 +11,7 @@ import shutil
 import numpy as np
 from tuna.simu.main import SimuParams, DivisionParams
 from tuna.simu.ou import OUParams, OUSimulation
+from tuna.simu.writer import FORMATS, write_simulation
 
 # Arguments
 parser = argparse.ArgumentParser()
@@ -33,6 +34,16 @@ parser.add_argument('--period', type=float,
                     help=('Time period between two consecutive time-lapse'
                           ' acquisitions'),
                     default=5.)
+parser.add_argument('--seed', type=int,
+                    help=('Master seed of the random number generator'
+                          ' (default: drawn from system entropy)'),
+                    default=None)
+parser.add_argument('-f', '--format', type=str, choices=FORMATS,
+                    help='Format of container files',
+                    default='text')
+parser.add_argument('-n', '--processes', type=int,
+                    help='Number of processes used to simulate containers',
+                    default=1)
 args = parser.parse_args()
 
 
@@ -73,11 +84,10 @@ ouParams = OUParams(target=target_value, spring=spring,
 divParams = DivisionParams(mean=interdivision_mean, std=interdivision_std)
 
 # %% SIMULATION: initiate, define, run/write
-np.random.seed()  # seed for the random number generator
-
 exp = OUSimulation(label=args.label,
                    simuParams=simuParams, divisionParams=divParams,
-                   ouParams=ouParams)
+                   ouParams=ouParams, seed=args.seed)
+print('Seed: {}'.format(exp.seed))
 
 # check that experiment has been saved before
 ans = 'go'
@@ -97,5 +107,7 @@ while os.path.exists(exp_path) and ans != 'a':
         shutil.rmtree(exp_path)
 
 # export except if process has been aborted
+# containers are written as they are simulated
 if ans != 'a':
-    exp.raw_text_export(path=path)
+    write_simulation(exp, path=path, fmt=args.format,
+                     processes=args.processes)
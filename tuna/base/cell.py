@@ -12,6 +12,7 @@ from copy import deepcopy
 import treelib as tlib
 
 
+from tuna import profiling
 from tuna.datatools import (local_rate, extrapolate_endpoints,
                             derivative, logderivative, ExtrapolationError)
 
@@ -268,11 +269,12 @@ class Cell(tlib.Node):
             # case : local estimates using local_rates
             else:
                 # dismiss the adjusted values
-                fit, adjusted = local_rate(self, yaxis=yaxis,
-                                           yscale=obs.scale,
-                                           time_window=obs.time_window,
-                                           dt=dt,
-                                           join_points=obs.join_points)
+                with profiling.stage('local_rate'):
+                    fit, adjusted = local_rate(self, yaxis=yaxis,
+                                               yscale=obs.scale,
+                                               time_window=obs.time_window,
+                                               dt=dt,
+                                               join_points=obs.join_points)
                 time = fit['time']
                 array = fit['rate_' + yaxis]
                 idarray = fit['cellID']
@@ -286,11 +288,12 @@ class Cell(tlib.Node):
                 idarray = self.data['cellID']
             # case : local fits using local_rate
             else:
-                fit, adjusted = local_rate(self, yaxis=yaxis,
-                                           yscale=obs.scale,
-                                           time_window=obs.time_window,
-                                           dt=dt,
-                                           join_points=obs.join_points)
+                with profiling.stage('local_rate'):
+                    fit, adjusted = local_rate(self, yaxis=yaxis,
+                                               yscale=obs.scale,
+                                               time_window=obs.time_window,
+                                               dt=dt,
+                                               join_points=obs.join_points)
                 time = fit['time']
                 array = fit['fit_' + yaxis]
                 idarray = fit['cellID']
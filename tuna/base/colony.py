@@ -10,6 +10,7 @@ import random
 
 from numpy.random import randint
 from tuna.base.lineage import Lineage
+from tuna import profiling
 
 
 class ColonyError(Exception):
@@ -100,7 +101,8 @@ class Colony(treelib.Tree):
         """Iterates through lineages.
         """
         if self.idseqs is None:
-            idseqs = self.decompose()
+            with profiling.stage('decompose'):
+                idseqs = self.decompose()
         else:
             idseqs = self.idseqs[:]
         if shuffle:
@@ -15,10 +15,13 @@ import collections
 import logging
 
 from tuna.io import text, h5
+from tuna import profiling
 
 from tuna.base.cell import Cell
 from tuna.datatools import compute_secondary_observables
 from tuna.base.colony import Colony
+from tuna.base.forest import Forest
+from tuna.filters.compiled import compile_cell_filter
 from tuna.observable import Observable
 
 
@@ -113,6 +116,7 @@ class Container(object):
         # these attributes are set to empty lists, will be loaded by .read_data
         self.cells = []
         self.trees = []
+        self._reset_condition_masks()
 
         # acquisition periodicity
         self.period = self.metadata.loc['period']
@@ -179,11 +183,14 @@ class Container(object):
         """
         self.cells = []
         self.trees = []
+        self._reset_condition_masks()
 
         # TEXT FILETYPE
         if self.filetype == 'text':
             # Read cells from file
-            arr = text.get_array(self.abspath, self.datatype, delimiter='\t')
+            with profiling.stage('read'):
+                arr = text.get_array(self.abspath, self.datatype,
+                                     delimiter='\t')
 
         # H5 FILETYPE
         elif self.filetype == 'h5':
@@ -201,9 +208,10 @@ class Container(object):
         self.data = arr
 
         if build:
-            self.cells = build_cells(arr, container=self,
-                                     extend_observables=extend_observables,
-                                     report_NaNs=report_NaNs)
+            with profiling.stage('build'):
+                self.cells = build_cells(arr, container=self,
+                                         extend_observables=extend_observables,
+                                         report_NaNs=report_NaNs)
 
         
             self._build(prefilt=prefilt)
@@ -218,10 +226,13 @@ class Container(object):
         prefilt : Filter instance
             used to filter Cell instances at reading
         """
-        self.make_filiation()
+        with profiling.stage('build'):
+            self.make_filiation()
         if prefilt is not None:
-            self.prefilter(filt=prefilt)
-        self.make_trees()
+            with profiling.stage('prefilter'):
+                self.prefilter(filt=prefilt)
+        with profiling.stage('build'):
+            self.make_trees()
         return
 
     def make_filiation(self):
@@ -282,22 +293,24 @@ class Container(object):
             for cell in self.cells:
                 for obs in suppl_obs:
                     cell.build(obs)
-        for cell in self.cells:
-            if filt is not None:
-                if not filt(cell):
-                    erased.append(cell)
-                    # make Colony.add_cell_recursive non functional
-                    cell.bpointer = None
-                    if cell.parent:
-                        cell.parent.childs.remove(cell)
-                    # make daughter cells new roots
-                    for ch in cell.childs:
-                        ch.bpointer = None
+        if filt is not None:
+            # filter is evaluated on all cells at once, before any removal
+            keep = compile_cell_filter(filt)(self.cells, self)
+            erased = [cell for cell, boo in zip(self.cells, keep) if not boo]
+        for cell in erased:
+            # make Colony.add_cell_recursive non functional
+            cell.bpointer = None
+            if cell.parent:
+                cell.parent.childs.remove(cell)
+            # make daughter cells new roots
+            for ch in cell.childs:
+                ch.bpointer = None
         if verbose:
             msg = '{} cells do not pass filter.'.format(len(erased))
             print(msg)
         for cell in erased:
             self.cells.remove(cell)  # otherwise would be considered root
+        self._reset_condition_masks()
         # clean-up actions for computing extra obs
         # extra obs computation depends on tree decomposition
         # this will be done in lineage.get_timeseries()
@@ -321,7 +334,8 @@ class Container(object):
         return
 
     # TODO : postfiltering does not work with filter involving observables
-    def postfilter(self, filt=None, verbose=False):
+    def postfilter(self, filt=None, verbose=False, exonerate_root=False,
+                   view=False):
         """Rebuild trees after filtering on cells.
 
         Parameters
@@ -330,6 +344,16 @@ class Container(object):
            has to accept Cell instance as argument
            has to be callable
            returns True when cell is acccepted, False when not
+        verbose : bool (default False)
+        exonerate_root : bool (default False)
+           whether root cells of trees are kept without being tested
+        view : bool (default False)
+           when True, trees and cells are left untouched, and the surviving
+           forest is returned
+
+        Returns
+        -------
+        :class:`Forest` instance when view is True, None otherwise
 
         Notes
         -----
@@ -337,7 +361,8 @@ class Container(object):
         read in import file.
 
         Apply .postfilter AFTER having built trees. It updates the list of
-        trees accordingly.
+        trees accordingly: daughter cells of rejected cells become roots of
+        new trees.
 
         See also
         --------
@@ -346,43 +371,45 @@ class Container(object):
         .. warning:: does not compute supplementary observables in filters
 
         """
-        new_trees = []
         if verbose:
             print('Starting postfiltering\n')
             print('Prior to filtering: {0} trees.'.format(len(self.trees)))
 
-        for t in self.trees:
-            outliers = []
-            ns = t.all_nodes()
-            if filt is not None:
-                if filt.exonerate_root:
-                    ns.remove(t.get_node(t.root))  # root has no data, so no filter
-                for n in ns:
-                    if not filt(n):
-                        outliers.append(n)
-
-            # sort outliers from leaves to root
-            soutliers = sorted(outliers,
-                               key=lambda x: t.level(x.identifier),
-                               reverse=True)
-
-            # with such ordering, no need for recursive action
-            for n in soutliers:
-                for ch in n.childs:
-                    chid = ch.identifier
-                    st = t.remove_subtree(chid)
-                    st = Colony(tree=st, deep=False, container=self)
-                    new_trees.append(st)
-                p = n.parent
-                if p is not None:
-                    p.childs.remove(n)
-                t.remove_node(n.identifier)
-
-        # modify the list of trees
-        self.trees += new_trees
+        forest = Forest.from_trees(self.trees)
+        keep = np.ones(len(forest), dtype=bool)
+        if filt is not None and len(forest) > 0:
+            keep = compile_cell_filter(filt)(forest.cells, self)
+            if exonerate_root:
+                keep[forest.get_roots()] = True
+        new_forest = forest.filtered(keep)
+
+        if view:
+            return new_forest
+
+        # outliers are removed from daughter lists of their parent cell
+        for cell, boo in zip(forest.cells, keep):
+            if not boo and cell.parent is not None:
+                if cell in cell.parent.childs:
+                    cell.parent.childs.remove(cell)
+        # build new trees, parents are added before daughters
+        trees = []
+        tree_of = {}
+        for cell, parent in zip(new_forest.cells, new_forest.parents):
+            cell.fpointer = []
+            if parent < 0:
+                tree = Colony(container=self)
+                tree.add_node(cell, parent=None)
+                trees.append(tree)
+            else:
+                pid = new_forest.cells[parent].identifier
+                tree = tree_of[pid]
+                tree.add_node(cell, parent=pid)
+            tree_of[cell.identifier] = tree
+        self.trees = trees
 
         # update cells
-        self.cells = [cell for tree in self.trees for cell in tree.all_nodes()]
+        self.cells = new_forest.cells
+        self._reset_condition_masks()
 
         if verbose and filt is not None:
             msg = 'Post-filtering on cells: '
@@ -391,6 +418,52 @@ class Container(object):
 #        self.metadata.filters.append(repr(boofunc))
         return
 
+    def _reset_condition_masks(self):
+        "Cached condition masks are not valid anymore when cells change"
+        self._condition_masks = {}
+        self._cell_positions = None
+        return
+
+    def get_cell_positions(self, identifiers):
+        """Positions in self.cells of cells with given identifiers
+
+        Parameters
+        ----------
+        identifiers : sequence of cell identifiers
+
+        Returns
+        -------
+        numpy array of int, or None when one identifier is not found
+        """
+        if self._cell_positions is None:
+            self._cell_positions = {cell.identifier: index
+                                    for index, cell in enumerate(self.cells)}
+        try:
+            return np.array([self._cell_positions[cid] for cid in identifiers],
+                            dtype=int)
+        except KeyError:
+            return None
+
+    def get_condition_mask(self, fset):
+        """Boolean array of cells that pass the cell filter of fset
+
+        Filter is evaluated once for all cells of container, then cached
+        (use it for cell filters that do not depend on observables).
+
+        Parameters
+        ----------
+        fset : :class:`FilterSet` instance
+
+        Returns
+        -------
+        numpy boolean array, index matches self.cells
+        """
+        key = repr(fset)
+        if key not in self._condition_masks:
+            compiled = compile_cell_filter(fset.cell_filter)
+            self._condition_masks[key] = compiled(self.cells, self)
+        return self._condition_masks[key]
+
     def get_cells(self):
         return [cell for tree in self.trees for cell in tree.all_nodes()]
 
@@ -464,25 +537,40 @@ class Container(object):
             arrays.append(cell.data)
         array = np.concatenate(arrays)
         fn = os.path.join(path, self.label + '.txt')
-        fmt = []
-        p = re.compile('(\w)(\d+)')
-        for key, value in self.datatype:
-            m = p.search(value)
-            if m:
-                kind, size = m.groups()
-                # strings
-                if kind == 'S':
-                    add = '%{}c'.format(size)
-                # integers
-                elif kind in ['u', 'i']:
-                    add = '%d'
-                else:
-                    add = '%.8e'
+        fmt = get_text_format(self.datatype)
+        text.write_array(fn, array, fmt, delimiter='\t')
+        return
+
+
+def get_text_format(datatype):
+    """Format of each column of datatype, to be used with numpy.savetxt
+
+    Parameters
+    ----------
+    datatype : list of couples (column name, numpy type string)
+
+    Returns
+    -------
+    list of str
+    """
+    fmt = []
+    p = re.compile('(\w)(\d+)')
+    for key, value in datatype:
+        m = p.search(value)
+        if m:
+            kind, size = m.groups()
+            # strings
+            if kind == 'S':
+                add = '%{}c'.format(size)
+            # integers
+            elif kind in ['u', 'i']:
+                add = '%d'
             else:
                 add = '%.8e'
-            fmt.append(add)
-        np.savetxt(fn, array, fmt=fmt, delimiter='\t')
-        return
+        else:
+            add = '%.8e'
+        fmt.append(add)
+    return fmt
 
 
 # %% READING
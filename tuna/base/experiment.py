@@ -33,8 +33,11 @@ import datetime
 import random
 import warnings
 import shutil
+import collections
+import multiprocessing
 
 from tuna.base.container import Container
+from tuna.base.forest import Forest
 
 #from tuna.base.metadata import Metadata, get_time_interval
 from tuna.io import text, metadata
@@ -90,7 +93,7 @@ class Experiment(object):
     -------
     iter_containers(self, read=True, build=True, prefilt=None,
                     extend_observables=False, report_NaNs=True,
-                    size=None, shuffle=False)
+                    size=None, shuffle=False, labels=None)
         main API to browse containers. MUST BE DEFINED FOR USE IN HIGH LEVEL
         PARSER API CLASS.
     """
@@ -189,7 +192,7 @@ class Experiment(object):
 
     def iter_container(self, read=True, build=True, prefilt=None,
                        extend_observables=False, report_NaNs=True,
-                       size=None, shuffle=False):
+                       size=None, shuffle=False, labels=None):
         """Iterator over containers.
 
         Parameters
@@ -208,16 +211,22 @@ class Experiment(object):
         shuffle : bool (default False)
             when `size` is set to a number, whether to randomize ordering of
             upcoming containers
+        labels : list of str (default None)
+            when not None, restrict iteration to containers with these labels
 
         Returns
         -------
         iterator iver Container instances of current Experiment instance.
         """
-        containers = self.containers[:]
+        if labels is None:
+            containers = self.containers[:]
+        else:
+            selected = set(labels)
+            containers = [lab for lab in self.containers if lab in selected]
         if shuffle:
             random.shuffle(containers)
         if size is None:
-            size = len(self.containers)
+            size = len(containers)
         if self.filetype == 'h5':
             h5file = tables.open_file(self.abspath)
         else:
@@ -299,28 +308,56 @@ class Experiment(object):
             msg += ' but somehow container initialization failed'
             raise ParsingExperimentError(msg)
 
-    # TODO: update
     def h5_export(self, directory='~', filename=None, overide=False,
-                  prefilt=None, testing=True, extend_observables=False,
-                  out=False):
+                  prefilt=None, testing=False, extend_observables=False,
+                  out=False, complib='blosc', complevel=5, index=True,
+                  filiation=False, processes=1):
         """Export data as a HDF5 archive.
 
+        Each container is stored as a compressed, chunked table
+        /lineages/data_<label>, where rows of a given cell are contiguous.
+        Containers are written one at a time: only one container is held in
+        memory (with processes > 1, one per worker process, plus the one
+        being written, see :func:`imap_bounded`).
+
         Parameters
         ----------
         directory -- str, where to store the h5 file
         filename -- str, name of file (without '.h5' extension)
         overide -- bool (default False), overide existing file
         prefilt -- prefiltering function (default None)
-        testing -- bool (default True), when True, export only 10 containers
+        testing -- bool (default False), when True, export only 10 containers
+        extend_observables -- bool (default False), whether to export
+            secondary observables as well
         out -- bool (default False), output or not tables.File object
+        complib -- str {'blosc', 'zlib'}, compression library ('blosc' is
+            faster, 'zlib' is readable by any HDF5 tool)
+        complevel -- int (default 5), compression level, 0 for none
+        index -- bool (default True), whether to index 'cellID' and 'time'
+            columns
+        filiation -- bool (default False), whether to store, for each
+            container, a table /filiation/data_<label> of cells, see
+            :func:`get_filiation_array`
+        processes -- int (default 1), number of processes in which
+            containers are read and prepared (writing is sequential); only
+            for experiments read from text files (otherwise, e.g. for
+            simulations, containers are browsed with iter_container)
 
         Returns
         -------
         if out is True, returns the corresponding tables.File object, that one
         has to close at some point.
         """
+        if complib not in H5_COMPLIBS:
+            raise ValueError('complib must be one of {}'.format(H5_COMPLIBS))
+        if processes > 1 and self.filetype != 'text':
+            raise ValueError('h5_export with processes > 1 requires an '
+                             "experiment of filetype 'text', not "
+                             "'{}': use processes=1".format(self.filetype))
         path = os.path.abspath(os.path.expanduser(directory))
-        if filename is None:
+        if filename is None and self.filetype != 'text':
+            bn = self.label  # no experiment file
+        elif filename is None:
             bn = os.path.basename(self.abspath)
         else:
             fn, fnext = os.path.splitext(filename)
@@ -344,45 +381,72 @@ class Experiment(object):
         log += '\nFILTER USED:\n'
         log += repr(prefilt)
         log += '\n'
+        filters = tables.Filters(complevel=complevel, complib=complib,
+                                 shuffle=True)
         # go on
-        h5file = tables.open_file(fn, mode='w', title='Experiment file')
+        h5file = tables.open_file(fn, mode='w', title='Experiment file',
+                                  filters=filters)
         try:
             # add metadata as attributes
-            for k, v in self.metadata.content:
+            for k, v in self.metadata.loc[self.label].iteritems():
                 h5file.root._v_attrs.__setattr__(k, v)
             # create the lineages folder where container tables are stored
             lineages = h5file.create_group(h5file.root, 'lineages',
                                            'Microscopy data flat containers')
+            if filiation:
+                filiations = h5file.create_group(h5file.root, 'filiation',
+                                                 'Cells of container trees')
             # loop over containers
+            size = None
             if testing:
                 size = 10  # only 10 containers for testing
                 log += '\nTesting mode: only {} containers.\n'.format(size)
-            else:
-                size = None  # all containers
             log += '\nCOUNTS:\n'
             log += '\n{}\t{}\t{}'.format('Label', 'Cells', 'Trees')
             count_cells, count_trees = 0, 0
-            for cont in self.iter_container(size=size, prefilt=prefilt,
-                                            extend_observables=extend_observables,
-                                            report_NaNs=True):
-                if cont.log is not None:
-                    warns += cont.log
-                arrs = []
-                for cell in cont.cells:
-                    arrs.append(cell.data)
-                arr = np.concatenate(arrs)
-                lab = 'Cells from container {}'.format(cont.label)
-                tab = h5file.create_table(h5file.root.lineages,
-                                          'data_{}'.format(cont.label),
-                                          arr.dtype,
-                                          lab)
-                tab.append(arr)
-                tab.flush()
-                # logging
-                log += '\n{}\t{}\t{}'.format(cont.label, len(cont.cells),
-                                             len(cont.trees))
-                count_cells += len(cont.cells)
-                count_trees += len(cont.trees)
+            pool = None
+            if processes > 1:
+                labels = self.containers[:size]
+                initargs = (self.abspath, self.filetype, prefilt,
+                            extend_observables, filiation)
+                pool = multiprocessing.Pool(processes,
+                                            initializer=_init_h5_worker,
+                                            initargs=initargs)
+                prepared = imap_bounded(pool, _prepare_h5_label, labels,
+                                        processes)
+            else:
+                containers = self.iter_container(
+                    size=size, prefilt=prefilt,
+                    extend_observables=extend_observables, report_NaNs=True)
+                prepared = (_prepare_h5_container(cont, filiation)
+                            for cont in containers)
+            try:
+                for label, arr, fil, warn, ncells, ntrees in prepared:
+                    if warn is not None:
+                        warns += warn
+                    lab = 'Cells from container {}'.format(label)
+                    tab = _write_h5_table(h5file, lineages, label, arr, lab,
+                                          index=index)
+                    if label in self.metadata.index:
+                        for k, v in self.metadata.loc[label].iteritems():
+                            tab.attrs[k] = v
+                    if fil is not None:
+                        lab = 'Filiation of container {}'.format(label)
+                        _write_h5_table(h5file, filiations, label, fil, lab,
+                                        index=False)
+                    # logging
+                    log += '\n{}\t{}\t{}'.format(label, ncells, ntrees)
+                    count_cells += ncells
+                    count_trees += ntrees
+            except BaseException:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+                raise
+            else:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
             log += '\n\nTotal\t{}\t{}'.format(count_cells, count_trees)
             # write log file
             with open(logfn, 'w') as f:
@@ -420,9 +484,8 @@ class Experiment(object):
         fn = os.path.join(exp_path, 'metadata.csv')
         self.metadata.to_csv(fn, index=False)
         # write descriptor file
-        with open(os.path.join(exp_path, 'descriptor.csv'), 'w') as f:
-            for key, value in self.datatype:
-                f.write(str(key) + ',' + str(value) + '\n')
+        text.write_descriptor(os.path.join(exp_path, 'descriptor.csv'),
+                              self.datatype)
         data_path = os.path.join(exp_path, 'containers')
         if not os.path.exists(data_path):
             os.makedirs(data_path)
@@ -435,3 +498,137 @@ class Experiment(object):
         for container in self.iter_container():
             container.write_raw_text(data_path)
         return
+
+
+# %% HDF5 export
+H5_COMPLIBS = ('blosc', 'zlib')
+H5_CHUNK_BYTES = 262144  # chunks of container tables
+
+
+def get_filiation_array(container, arr):
+    """Cells of container trees, with parent position and rows in arr
+
+    Parameters
+    ----------
+    container : :class:`Container` instance
+        trees must be built
+    arr : Numpy structured array
+        concatenated data of container cells
+
+    Returns
+    -------
+    Numpy structured array, one row per cell (parents come before their
+    daughters), with columns 'cellID', 'parent' (position of parent cell,
+    -1 for roots), 'start', 'stop' (rows of cell in arr, -1 when cell
+    has no data)
+    """
+    forest = Forest.from_trees(container.trees)
+    if arr.dtype.names is not None and 'cellID' in arr.dtype.names:
+        cid_type = arr.dtype['cellID']
+    else:
+        cid_type = np.dtype('S16')
+    fil = np.zeros(len(forest), dtype=[('cellID', cid_type),
+                                       ('parent', 'i8'),
+                                       ('start', 'i8'),
+                                       ('stop', 'i8')])
+    if len(forest) == 0:
+        return fil
+    bounds = {}
+    start = 0
+    for cell in container.cells:
+        if cell.data is not None:
+            bounds[cell.identifier] = (start, start + len(cell.data))
+            start += len(cell.data)
+    cids = [cell.identifier for cell in forest.cells]
+    fil['cellID'] = np.array(cids).astype(cid_type)
+    fil['parent'] = forest.parents
+    rows = np.array([bounds.get(cid, (-1, -1)) for cid in cids])
+    fil['start'] = rows[:, 0]
+    fil['stop'] = rows[:, 1]
+    return fil
+
+
+def imap_bounded(pool, func, iterable, window):
+    """Ordered results of func over items, computed in a pool of processes
+
+    Unlike :meth:`multiprocessing.Pool.imap`, which submits all items at
+    once and buffers results that are not consumed yet, at most `window`
+    tasks are submitted and not yet consumed: a new item is submitted each
+    time a result is yielded, and memory is bounded by `window` results,
+    plus the one being consumed.
+
+    Parameters
+    ----------
+    pool : :class:`multiprocessing.Pool` instance
+    func : callable
+        picklable function of one argument
+    iterable : iterable of arguments
+    window : int
+        maximal number of pending tasks (usually the number of processes)
+
+    Yields
+    ------
+    func(item), in the order of items
+    """
+    pending = collections.deque()
+    for item in iterable:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(func, (item, )))
+    while pending:
+        yield pending.popleft().get()
+    return
+
+
+# reading state, set once per process
+_WORKER = {}
+
+
+def _init_h5_worker(path, filetype, prefilt, extend_observables, filiation):
+    _WORKER['exp'] = Experiment(path, filetype=filetype)
+    _WORKER['prefilt'] = prefilt
+    _WORKER['extend_observables'] = extend_observables
+    _WORKER['filiation'] = filiation
+    return
+
+
+def _prepare_h5_label(label):
+    """Read container, returns arrays to be written, warnings, counts"""
+    cont = _WORKER['exp'].get_container(
+        label, prefilt=_WORKER['prefilt'],
+        extend_observables=_WORKER['extend_observables'], report_NaNs=True)
+    return _prepare_h5_container(cont, _WORKER['filiation'])
+
+
+def _prepare_h5_container(cont, filiation):
+    """Returns label, arrays to be written, warnings, counts of container"""
+    arrs = [cell.data for cell in cont.cells if cell.data is not None]
+    if arrs:
+        arr = np.concatenate(arrs)
+    else:
+        arr = np.zeros(0, dtype=cont.data.dtype)
+    fil = None
+    if filiation:
+        fil = get_filiation_array(cont, arr)
+    warn = getattr(cont, 'log', None)
+    return cont.label, arr, fil, warn, len(cont.cells), len(cont.trees)
+
+
+def _write_h5_table(h5file, group, label, arr, title, index=True):
+    """Write arr as a chunked table, indexed on 'cellID' and 'time' columns
+
+    Chunks hold H5_CHUNK_BYTES, or the whole table when it is smaller, so
+    that reading a container needs a few chunks only.
+    """
+    nrows = max(len(arr), 1)
+    chunkrows = max(1, min(nrows, H5_CHUNK_BYTES // arr.dtype.itemsize))
+    tab = h5file.create_table(group, 'data_{}'.format(label), arr.dtype,
+                              title, expectedrows=nrows,
+                              chunkshape=(chunkrows, ))
+    tab.append(arr)
+    tab.flush()
+    if index:
+        for name in ('cellID', 'time'):
+            if name in tab.colnames:
+                getattr(tab.cols, name).create_index()
+    return tab
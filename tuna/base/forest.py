@@ -0,0 +1,142 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+This module defines the :class:`Forest` class, an array-backed description
+of the trees made by cells of a container, after cells have been filtered.
+
+Trees are stored as a list of cells, ordered such that a parent cell comes
+before its daughter cells, and an array of parent positions (-1 for roots).
+Removing cells that do not pass a filter is then a single vectorized
+operation: surviving cells whose parent is removed become roots of new trees.
+No tree and no cell is modified, so that a container can be described under
+several filters without copies.
+"""
+from __future__ import print_function
+
+import numpy as np
+
+
+class Forest(object):
+    """Trees of cells described by parent arrays
+
+    Parameters
+    ----------
+    cells : list of :class:`Cell` instances
+        ordered such that parents come before their daughters
+    parents : array of int
+        position of parent cell in cells, -1 for roots
+
+    Attributes
+    ----------
+    cells : list of :class:`Cell` instances
+    parents : numpy array of int
+    """
+
+    def __init__(self, cells, parents):
+        self.cells = cells
+        self.parents = np.asarray(parents, dtype=int)
+        return
+
+    @classmethod
+    def from_trees(cls, trees):
+        """Forest made of treelib-based trees (e.g. :class:`Colony` instances)
+        """
+        cells = []
+        parents = []
+        for tree in trees:
+            if tree.root is None:
+                continue
+            positions = {}
+            for nid in tree.expand_tree(mode=tree.DEPTH):
+                node = tree.get_node(nid)
+                positions[nid] = len(cells)
+                cells.append(node)
+                if nid == tree.root:
+                    parents.append(-1)
+                else:
+                    parents.append(positions[node.bpointer])
+        return cls(cells, parents)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def filtered(self, keep):
+        """Surviving forest when only cells where keep is True are kept
+
+        Parameters
+        ----------
+        keep : array of bool
+            one item per cell
+
+        Returns
+        -------
+        :class:`Forest` instance
+        """
+        keep = np.asarray(keep, dtype=bool)
+        has_parent = self.parents >= 0
+        # daughters of removed cells become roots
+        parent_kept = np.zeros(len(self), dtype=bool)
+        parent_kept[has_parent] = keep[self.parents[has_parent]]
+        parents = np.where(parent_kept, self.parents, -1)
+        # renumber positions of surviving cells
+        new_positions = np.cumsum(keep) - 1
+        parents = parents[keep]
+        parents = np.where(parents >= 0, new_positions[parents], -1)
+        cells = [cell for cell, boo in zip(self.cells, keep) if boo]
+        return Forest(cells, parents)
+
+    def get_roots(self):
+        """Positions of root cells"""
+        return np.flatnonzero(self.parents < 0)
+
+    def get_leaves(self):
+        """Positions of cells without daughter cells"""
+        has_childs = np.zeros(len(self), dtype=bool)
+        has_childs[self.parents[self.parents >= 0]] = True
+        return np.flatnonzero(~has_childs)
+
+    def get_levels(self):
+        """Returns levels (root at 0) and tree index (root position) of cells
+        """
+        levels = np.zeros(len(self), dtype=int)
+        tree_index = np.arange(len(self))
+        # parents come before daughters: a single pass is enough
+        for index, parent in enumerate(self.parents):
+            if parent >= 0:
+                levels[index] = levels[parent] + 1
+                tree_index[index] = tree_index[parent]
+        return levels, tree_index
+
+    def get_tree_depths(self):
+        """Depth of each tree (ordered as roots), as treelib.Tree.depth()"""
+        levels, tree_index = self.get_levels()
+        roots = self.get_roots()
+        depths = np.zeros(len(self), dtype=int)
+        np.maximum.at(depths, tree_index, levels)
+        return depths[roots]
+
+    def get_lineage_sizes(self):
+        """Number of cells in each lineage of an independent decomposition
+
+        Same distribution as sizes of lineages returned by
+        :meth:`Colony.decompose`: each cell with daughters is continued by one of
+        them, picked at random; other daughters start new lineages.
+
+        Returns
+        -------
+        numpy array of int, one item per lineage
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=int)
+        has_parent = np.flatnonzero(self.parents >= 0)
+        # random order, then first daughter found for each parent continues
+        shuffled = has_parent[np.random.permutation(len(has_parent))]
+        _, first = np.unique(self.parents[shuffled], return_index=True)
+        continued = np.zeros(len(self), dtype=bool)
+        continued[shuffled[first]] = True
+        starts = np.arange(len(self))
+        # parents come before daughters: a single pass is enough
+        for index in has_parent[continued[has_parent]]:
+            starts[index] = starts[self.parents[index]]
+        sizes = np.bincount(starts, minlength=len(self))
+        return sizes[~continued]
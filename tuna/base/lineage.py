@@ -11,7 +11,9 @@ import collections
 
 from tuna.observable import Observable
 
-from tuna.base.timeseries import TimeSeries
+from tuna.base.timeseries import TimeSeries, cast_values
+from tuna.filters.compiled import compile_cell_filter
+from tuna import profiling
 
 
 class LineageError(Exception):
@@ -76,6 +78,31 @@ class Lineage(object):
             yield self.colony.get_node(cid)
         return
 
+    def get_time_extent(self):
+        """Get time range spanned by lineage cells, from raw data only
+
+        Returns
+        -------
+        (tleft, tright) : couple of floats
+            earliest birth time (or first data time), latest division time
+            (or last data time); (inf, -inf) when no time is found
+        """
+        tleft, tright = np.infty, -np.infty
+        for cid in self.idseq:
+            cell = self.colony.get_node(cid)
+            times = []
+            if cell.birth_time is not None:
+                times.append(cell.birth_time)
+            if cell.division_time is not None:
+                times.append(cell.division_time)
+            if cell.data is not None and len(cell.data) > 0:
+                times.append(np.nanmin(cell.data['time']))
+                times.append(np.nanmax(cell.data['time']))
+            if times:
+                tleft = min(tleft, min(times))
+                tright = max(tright, max(times))
+        return tleft, tright
+
     def get_generations(self, tref=None):
         """Get generation number
 
@@ -143,39 +170,64 @@ class Lineage(object):
         # add the master entry (which will be a sequence of True values)
         select_ids = {}
         # master mask gets all True
-        select_ids['master'] = np.array([True for _ in self.idseq])
-        # add as many entries as there are conditions
-        for fset in cset:
-            # we have to make a logical AND between different filter types
-            col = self.colony
-            cont = col.container
-            # check True for upstream structures: container, colony, lineage
-            boo = (fset.container_filter(cont) and
-                   fset.colony_filter(col) and
-                   fset.lineage_filter(self))
-            # cell selections
-            # initialize all to False
-            arrbool = np.array(len(self.idseq) * [False])
-            # perform tests only if upstream tests where True
-            if boo:
-                for index, cid in enumerate(self.idseq):
-                    cell = col.get_node(cid)
-                    arrbool[index] = fset.cell_filter(cell)
-            select_ids[repr(fset)] = arrbool
+        select_ids['master'] = np.ones(len(self.idseq), dtype=bool)
+        if not cset:
+            return select_ids
+        with profiling.stage('conditions'):
+            # add as many entries as there are conditions
+            for fset in cset:
+                # we have to make a logical AND between different filter types
+                col = self.colony
+                cont = col.container
+                # check True for upstream structures: container, colony,
+                # lineage
+                boo = (fset.container_filter(cont) and
+                       fset.colony_filter(col) and
+                       fset.lineage_filter(self))
+                # cell selections
+                # initialize all to False
+                arrbool = np.zeros(len(self.idseq), dtype=bool)
+                # perform tests only if upstream tests where True
+                if boo:
+                    arrbool = self._get_cell_tests(fset)
+                select_ids[repr(fset)] = arrbool
         return select_ids
 
-    def get_timeseries(self, obs, cset=[]):
+    def _get_cell_tests(self, fset):
+        """Boolean array of cells in self.idseq passing fset.cell_filter"""
+        col = self.colony
+        cont = col.container
+        filt = fset.cell_filter
+        # container masks are computed once, and gathered for each lineage;
+        # observables values depend on lineage decomposition: no caching
+        if (filt.get_stage() != 'observable' and
+                hasattr(cont, 'get_condition_mask')):
+            positions = cont.get_cell_positions(self.idseq)
+            if positions is not None:
+                return cont.get_condition_mask(fset)[positions]
+        cells = [col.get_node(cid) for cid in self.idseq]
+        return compile_cell_filter(filt)(cells, cont)
+
+    def get_timeseries(self, obs, cset=[], precision='double'):
         """Contructs timeseries.
 
         Parameters
         ----------
         obs : :class:`Observable` instance
         cset: sequence of :class:`FilterSet` instances (default [])
+        precision : str {'double', 'single'}
+            storage type of observable values: float64 or float32 (times
+            are always stored as float64)
 
         Returns
         -------
         TimeSeries instance
         """
+        with profiling.stage('observable'):
+            return self._get_timeseries(obs, cset=cset, precision=precision)
+
+    def _get_timeseries(self, obs, cset=[], precision='double'):
+        "Builds timeseries, see :meth:`get_timeseries`"
         # check for supplementary observables to be computed
         suppl_obs = []
         for filt in cset:
@@ -196,11 +248,11 @@ class Lineage(object):
 
         # build timeseries depending on obs mode
         if obs.mode == 'dynamics':
-            return self.get_continuous_timeseries(obs, cset)
+            return self.get_continuous_timeseries(obs, cset, precision)
         else:
-            return self.get_cyclized_timeseries(obs, cset)
+            return self.get_cyclized_timeseries(obs, cset, precision)
 
-    def get_cyclized_timeseries(self, obs, cset=[]):
+    def get_cyclized_timeseries(self, obs, cset=[], precision='double'):
         """Constructs timeseries for cell cycle observables.
 
         Parameters
@@ -208,6 +260,8 @@ class Lineage(object):
         obs : :class:`Observable` instance
             mode should be different from 'dynamics'
         cset: sequence of :class:`FilterSet` instances (default [])
+        precision : str {'double', 'single'}
+            storage type of observable values
 
         Returns
         -------
@@ -264,12 +318,13 @@ class Lineage(object):
         select_ids = self.get_boolean_tests(cset)
         cts = np.array(cts, dtype=[('time', 'f8'), (label, 'f8'),
                                    ('cellID', 'u2')])
+        cts = cast_values(cts, label, precision)
         new = TimeSeries(label=label, ts=cts, ids=self.idseq[:],
                          time_bounds=time_bounds,
                          index_cycles=index_cycles, select_ids=select_ids)
         return new
 
-    def get_continuous_timeseries(self, obs, cset=[]):
+    def get_continuous_timeseries(self, obs, cset=[], precision='double'):
         """Method that computes timeseries associated to observable obs.
 
         Parameters
@@ -277,6 +332,8 @@ class Lineage(object):
         obs : :class:`Observable` instance
             It defines how to get observable from Numpy structured arrays
         cset: sequence of :class:`FilterSet` instances (default [])
+        precision : str {'double', 'single'}
+            storage type of observable values
 
         Returns
         -------
@@ -323,7 +380,7 @@ class Lineage(object):
         # try to identify closest frames to cell birth/division
         index_cycles = []
 
-        ts = np.concatenate(arrays)
+        ts = cast_values(np.concatenate(arrays), obs.label(), precision)
         if len(ts) > 0:
 
             # get array of times
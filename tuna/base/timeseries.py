@@ -7,6 +7,37 @@ import numpy as np
 import pandas as pd
 
 
+# storage type of observable values in timeseries arrays
+VALUE_TYPES = {'double': 'f8', 'single': 'f4'}
+
+
+def cast_values(arr, label, precision='double'):
+    """Returns structured array where values of label use precision type
+
+    Parameters
+    ----------
+    arr : Numpy structured array
+    label : str
+        name of the column to cast (other columns are left unchanged)
+    precision : str {'double', 'single'}
+
+    Returns
+    -------
+    Numpy structured array (arr itself when no cast is needed)
+    """
+    if precision not in VALUE_TYPES:
+        raise ValueError('precision must be one of '
+                         '{}'.format(sorted(VALUE_TYPES.keys())))
+    vtype = np.dtype(VALUE_TYPES[precision])
+    if arr.dtype.names is None or label not in arr.dtype.names:
+        return arr
+    if arr.dtype[label] == vtype:
+        return arr
+    dtype = [(name, vtype if name == label else arr.dtype[name])
+             for name in arr.dtype.names]
+    return arr.astype(dtype)
+
+
 # define an object to handle heterogeneous types of time series
 class TimeSeries(object):
     """Object that decorates the data with other useful attributes.
@@ -131,6 +162,9 @@ class TimeSeries(object):
             how to separate cells (default: one blank line)
         print_labels : bool {False, True}
             first line is labels, followed by empty line
+
+        See :func:`tuna.io.columnar.export_timeseries` to export timeseries
+        of many lineages at once.
         """
         labels = None
         if isinstance(self.timeseries, np.ndarray):
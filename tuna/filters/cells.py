@@ -12,9 +12,11 @@ Class definitions to filter cells.
 from __future__ import print_function
 
 import copy
+import collections
 import numpy as np
 
-from tuna.filters.main import FilterGeneral, bounded, included, FilterAND
+from tuna.filters.main import (FilterGeneral, bounded, included,
+                               bounded_mask, included_mask)
 from tuna.datatools import multiplicative_increments
 
 from tuna.observable import Observable
@@ -29,6 +31,8 @@ class FilterCell(FilterGeneral):
 class FilterCellAny(FilterCell):
     "Class that does not filter anything."
 
+    _cost = 0
+
     def __init__(self):
         self.label = 'Always True'  # short description for human readers
         return
@@ -36,10 +40,15 @@ class FilterCellAny(FilterCell):
     def func(self, cell):
         return True
 
+    def mask(self, table, index):
+        return np.ones(len(index), dtype=bool)
+
 
 class FilterData(FilterCell):
     """Default filter test only if cell exists and cell.data non empty."""
 
+    _cost = 1
+
     def __init__(self):
         self.label = 'Cell Has Data'
         return
@@ -50,10 +59,15 @@ class FilterData(FilterCell):
             boo = cell.data is not None and len(cell.data) > 0
         return boo
 
+    def mask(self, table, index):
+        return table.column('has_data')[index]
+
 
 class FilterCellIDparity(FilterCell):
     """Test whether identifier is odd or even"""
 
+    _cost = 1
+
     def __init__(self, parity='even'):
         self.parity = parity
         self.label = 'Cell identifier is {}'.format(parity)
@@ -73,10 +87,21 @@ class FilterCellIDparity(FilterCell):
             print(ve)
             return False
 
+    def mask(self, table, index):
+        if self.parity not in ['even', 'odd']:
+            return FilterCell.mask(self, table, index)
+        valid = table.column('valid_identifier')[index]
+        even = table.column('identifier')[index] % 2 == 0
+        if self.parity == 'even':
+            return valid & even
+        return valid & ~even
+
 
 class FilterCellIDbound(FilterCell):
     """Test class"""
 
+    _cost = 1
+
     def __init__(self, lower_bound=None, upper_bound=None):
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
@@ -87,10 +112,19 @@ class FilterCellIDbound(FilterCell):
         return bounded(int(cell.identifier),
                        self.lower_bound, self.upper_bound)
 
+    def mask(self, table, index):
+        if not np.all(table.column('valid_identifier')[index]):
+            # raises the error met when calling filter on a cell
+            return FilterCell.mask(self, table, index)
+        return bounded_mask(table.column('identifier')[index],
+                            self.lower_bound, self.upper_bound)
+
 
 class FilterHasParent(FilterCell):
     """Test whether a cell has an identified parent cell"""
 
+    _cost = 1
+
     def __init__(self):
         self.label = 'Cell Has Parent'
         return
@@ -101,10 +135,15 @@ class FilterHasParent(FilterCell):
             boo = True
         return boo
 
+    def mask(self, table, index):
+        return table.column('has_parent')[index]
+
 
 class FilterDaughters(FilterCell):
     "Test whether a given cell as at least one daughter cell"
 
+    _cost = 1
+
     def __init__(self, daughter_min=1, daughter_max=2):
         label = 'Number of daughter cell(s): '
         label += '{0} <= n_daughters <= {1}'.format(daughter_min, daughter_max)
@@ -118,10 +157,17 @@ class FilterDaughters(FilterCell):
                        lower_bound=self.lower_bound,
                        upper_bound=self.upper_bound)
 
+    def mask(self, table, index):
+        return bounded_mask(table.column('n_childs')[index],
+                            lower_bound=self.lower_bound,
+                            upper_bound=self.upper_bound)
+
 
 class FilterCompleteCycle(FilterCell):
     "Test whether a cell has a given parent and at least one daughter."
 
+    _cost = 2
+
     def __init__(self, daughter_min=1):
         label = 'Cell cycle complete'
         label += ' (with at least {} daughter cell(s)'.format(daughter_min)
@@ -134,10 +180,17 @@ class FilterCompleteCycle(FilterCell):
         filt_daughter = FilterDaughters(daughter_min=self.daughter_min)
         return filt_parent(cell) and filt_daughter(cell)
 
+    def mask(self, table, index):
+        filt_daughter = FilterDaughters(daughter_min=self.daughter_min)
+        return (table.column('has_parent')[index] &
+                filt_daughter.mask(table, index))
+
 
 class FilterCycleFrames(FilterCell):
     """Check whether cell has got a minimal number of datapoints."""
 
+    _cost = 1
+
     def __init__(self, lower_bound=None, upper_bound=None):
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
@@ -158,10 +211,18 @@ class FilterCycleFrames(FilterCell):
                           )
         return boo
 
+    def mask(self, table, index):
+        return (table.column('has_data')[index] &
+                bounded_mask(table.column('n_frames')[index],
+                             lower_bound=self.lower_bound,
+                             upper_bound=self.upper_bound))
+
 
 class FilterCycleSpanIncluded(FilterCell):
     """Check that cell cycle time interval is within valid bounds."""
 
+    _cost = 2
+
     def __init__(self, lower_bound=None, upper_bound=None):
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
@@ -179,10 +240,18 @@ class FilterCycleSpanIncluded(FilterCell):
                            upper_bound=self.upper_bound)
         return boo
 
+    def mask(self, table, index):
+        return included_mask(table.column('time_min')[index],
+                             table.column('time_max')[index],
+                             lower_bound=self.lower_bound,
+                             upper_bound=self.upper_bound)
+
 
 class FilterTimeInCycle(FilterCell):
     """Check that tref is within cell birth and division time"""
 
+    _cost = 2
+
     def __init__(self, tref=0.):
         self.tref = tref
         label = 'birth/first time <= {} < division/last time'.format(tref)
@@ -204,6 +273,14 @@ class FilterTimeInCycle(FilterCell):
             boo = lower <= self.tref < upper
         return boo
 
+    def mask(self, table, index):
+        lower = table.column('cycle_start')[index]
+        upper = table.column('cycle_end')[index]
+        boo = table.column('has_data')[index]
+        with np.errstate(invalid='ignore'):
+            boo = boo & (lower <= self.tref) & (self.tref < upper)
+        return boo
+
 
 class FilterObservableBound(FilterCell):
     """Check that a given observable is bounded.
@@ -219,6 +296,8 @@ class FilterObservableBound(FilterCell):
     upper_bound : float (default None)
     """
 
+    _cost = 20
+
     def __init__(self, obs=Observable(), tref=None,
                  lower_bound=None, upper_bound=None):
         self.obs = obs  # as a param to be correctly represented
@@ -235,42 +314,53 @@ class FilterObservableBound(FilterCell):
             label += ' (t={})'.format(tref)
         label += ' < {}'.format(upper_bound)
         self.label = label
+        # data checks are built once (hidden: not part of parameters)
+        if tref is not None:
+            self._precheck = FilterTimeInCycle(tref=tref)  # checks data too
+        else:
+            self._precheck = FilterData()
         return
 
     def func(self, cell):
-        import collections
+        if not self._precheck(cell):
+            return False
+        return self._check_value(cell)
+
+    def _check_value(self, cell):
+        """Bound test on computed observable, for a cell that has data"""
         boo = False
-        if self.tref is not None:
-            filt = FilterAND(FilterData(),
-                             FilterTimeInCycle(tref=self.tref))
-        else:
-            filt = FilterData()
         label = self.obs.label()
-        if filt(cell):
-            # retrieve data
-            array = cell._sdata[label]  # two cases: array, or single value
-            raw_time = cell.data['time']
-            if len(raw_time) > 1:
-                dt = np.amin(raw_time[1:] - raw_time[:-1])
+        # retrieve data
+        array = cell._sdata[label]  # two cases: array, or single value
+        if array is None:
+            return False
+        if isinstance(array, collections.Iterable):
+            if self.tref is None:
+                # data may be one value (for cycle observables), or array
+                boo = bounded(array[label], self.lower_bound, self.upper_bound)
             else:
-                dt = cell.container.period
-            if array is None:
-                return False
-            if isinstance(array, collections.Iterable):
-                if self.tref is None:
-                    # data may be one value (for cycle observables), or array
-                    boo = bounded(array[label], self.lower_bound, self.upper_bound)
+                # find data closest to tref (-> round to closest time)
+                # for now return closest time to tref
+                index = np.argmin(np.abs(array['time'] - self.tref))
+                # check that it's really close:
+                raw_time = cell.data['time']
+                if len(raw_time) > 1:
+                    dt = np.amin(np.diff(raw_time))
                 else:
-                    # find data closest to tref (-> round to closest time)
-                    # for now return closest time to tref
-                    index = np.argmin(np.abs(array['time'] - self.tref))
-                    # check that it's really close:
-                    if np.abs(array['time'][index] - self.tref) < dt:
-                        value = array[label][index]
-                        boo = bounded(value, self.lower_bound, self.upper_bound)
-            # otherwise it's a number
-            else:
-                boo = bounded(array, self.lower_bound, self.upper_bound)
+                    dt = cell.container.period
+                if np.abs(array['time'][index] - self.tref) < dt:
+                    value = array[label][index]
+                    boo = bounded(value, self.lower_bound, self.upper_bound)
+        # otherwise it's a number
+        else:
+            boo = bounded(array, self.lower_bound, self.upper_bound)
+        return boo
+
+    def mask(self, table, index):
+        # vectorized data checks, then value checks on remaining cells
+        boo = self._precheck.mask(table, index)
+        for position in np.flatnonzero(boo):
+            boo[position] = self._check_value(table.targets[index[position]])
         return boo
 
 
@@ -0,0 +1,299 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+filters/compiled.py module
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Vectorized evaluation of cell filters over all cells of a container.
+
+Cell attributes used by filters (number of frames, identifiers, number of
+daughters, birth and division times, ...) are collected once per container
+in a :class:`CellTable`, as arrays computed on demand. Each filter provides a
+``mask`` method that evaluates its test for a set of cells indices at once;
+filters that cannot be vectorized fall back to calling the filter on each
+cell. Boolean filters evaluate their members by increasing estimated cost,
+and only on cells that are still undecided (short-circuit).
+"""
+from __future__ import print_function
+
+import numpy as np
+
+
+class CellTable(object):
+    """Container-level arrays of cell attributes used by cell filters
+
+    Parameters
+    ----------
+    cells : list of :class:`Cell` instances
+    container : :class:`Container` instance (default None)
+        container of cells; when given, number of frames, identifiers, time
+        bounds and cycle bounds are derived from container arrays (see
+        :meth:`groups`) instead of browsing each cell
+
+    Notes
+    -----
+    Columns are computed on first access, then cached; see
+    :meth:`column` for available column names.
+    """
+
+    def __init__(self, cells, container=None):
+        self.targets = list(cells)
+        self.container = container
+        self._columns = {}
+        self._groups = None
+        return
+
+    def __len__(self):
+        return len(self.targets)
+
+    def indices(self, index=None):
+        """Returns array of indices of targets to evaluate (default: all)"""
+        if index is None:
+            return np.arange(len(self.targets))
+        return np.asarray(index, dtype=int)
+
+    def column(self, name):
+        """Returns array of cell attribute
+
+        Parameters
+        ----------
+        name : str
+            one of 'has_data', 'n_frames', 'has_parent', 'n_childs',
+            'identifier', 'valid_identifier', 'time_min', 'time_max',
+            'cycle_start', 'cycle_end'
+
+        Returns
+        -------
+        numpy array with one item per cell
+        """
+        if name not in self._columns:
+            builder = getattr(self, '_build_' + name)
+            self._columns[name] = builder()
+        return self._columns[name]
+
+    def groups(self):
+        """Per-cell arrays derived from container data, in one pass
+
+        Rows of container data are grouped by cellID; for each group, the
+        number of frames, extremal times and cycle bounds are computed, then
+        mapped on targets through their identifiers (targets absent from
+        data have no frame, and NaN times).
+
+        Returns
+        -------
+        dict of arrays with one item per target, with keys 'n_frames',
+        'identifier', 'time_min', 'time_max', 'cycle_start', 'cycle_end';
+        or None when container data is not available
+        """
+        if self._groups is None:
+            self._groups = self._build_groups() or {}
+        return self._groups or None
+
+    def _build_groups(self):
+        data = getattr(self.container, 'data', None)
+        if data is None or data.ndim != 1 or len(data) == 0:
+            return None
+        names = data.dtype.names
+        if names is None or 'cellID' not in names or 'time' not in names:
+            return None
+        cids = data['cellID']
+        order = np.argsort(cids, kind='mergesort')  # stable: keeps frames
+        uids, starts, counts = np.unique(cids[order], return_index=True,
+                                         return_counts=True)
+        times = data['time'][order]
+        first = times[starts]
+        last = times[starts + counts - 1]
+        # cell identifiers are string representations of cellID values
+        try:
+            keys = np.array([cell.identifier for cell in self.targets])
+            keys = keys.astype(uids.dtype)
+        except (TypeError, ValueError):
+            return None
+        position, found = _lookup(uids, keys)
+        start, end = self._cycle_bounds(uids, order[starts], first, last)
+        nan = np.nan * np.ones(len(keys))
+        groups = {'n_frames': np.where(found, counts[position], 0),
+                  'identifier': keys,
+                  'time_min': np.where(
+                      found, np.minimum.reduceat(times, starts)[position],
+                      nan),
+                  'time_max': np.where(
+                      found, np.maximum.reduceat(times, starts)[position],
+                      nan),
+                  'cycle_start': np.where(found, start[position], nan),
+                  'cycle_end': np.where(found, end[position], nan)}
+        # simulated containers record birth and division times
+        genealogy = getattr(self.container, 'genealogy', None)
+        if genealogy is not None:
+            ranks = np.argsort(genealogy['cellID'], kind='mergesort')
+            rows, found = _lookup(genealogy['cellID'][ranks], keys)
+            rows = ranks[rows[found]]
+            groups['cycle_start'][found] = genealogy['birth_time'][rows]
+            groups['cycle_end'][found] = genealogy['division_time'][rows]
+        return groups
+
+    def _cycle_bounds(self, uids, rows, first, last):
+        """Birth and division times of groups of container data
+
+        Division happens halfway between last frame of parent and first
+        frame of daughter (see :meth:`Cell.set_division_event`). Without
+        division event, first and last times are used.
+        """
+        start = first.copy()
+        end = last.copy()
+        if 'parentID' not in self.container.data.dtype.names:
+            return start, end
+        pids = self.container.data['parentID'][rows]
+        parents, linked = _lookup(uids, pids)
+        childs = np.flatnonzero(linked & (pids != 0))
+        # daughters in data order: last one sets division time of parent
+        childs = childs[np.argsort(rows[childs], kind='mergesort')]
+        births = (last[parents[childs]] + first[childs]) / 2.
+        start[childs] = births
+        reverse = parents[childs][::-1]
+        _, index = np.unique(reverse, return_index=True)
+        end[reverse[index]] = births[::-1][index]
+        return start, end
+
+    def _build_has_data(self):
+        return self.column('n_frames') > 0
+
+    def _build_n_frames(self):
+        groups = self.groups()
+        if groups is not None:
+            return groups['n_frames'].astype(int)
+        return np.array([len(cell.data) if cell.data is not None else 0
+                         for cell in self.targets], dtype=int)
+
+    def _build_has_parent(self):
+        return np.array([bool(cell.parent) for cell in self.targets],
+                        dtype=bool)
+
+    def _build_n_childs(self):
+        return np.array([len(cell.childs) for cell in self.targets],
+                        dtype=int)
+
+    def _build_identifier(self):
+        groups = self.groups()
+        if groups is not None and groups['identifier'].dtype.kind in 'iu':
+            valid = np.ones(len(self.targets), dtype=bool)
+            self._columns['valid_identifier'] = valid
+            return groups['identifier'].astype(np.int64)
+        identifiers = np.zeros(len(self.targets), dtype=np.int64)
+        valid = np.zeros(len(self.targets), dtype=bool)
+        for index, cell in enumerate(self.targets):
+            try:
+                identifiers[index] = int(cell.identifier)
+                valid[index] = True
+            except (TypeError, ValueError):
+                continue
+        self._columns['valid_identifier'] = valid
+        return identifiers
+
+    def _build_valid_identifier(self):
+        self.column('identifier')
+        return self._columns['valid_identifier']
+
+    def _time_column(self, func):
+        values = np.nan * np.ones(len(self.targets))
+        has_data = self.column('has_data')
+        for index, cell in enumerate(self.targets):
+            if has_data[index]:
+                values[index] = func(cell.data['time'])
+        return values
+
+    def _build_time_min(self):
+        groups = self.groups()
+        if groups is not None:
+            return groups['time_min']
+        return self._time_column(np.amin)
+
+    def _build_time_max(self):
+        groups = self.groups()
+        if groups is not None:
+            return groups['time_max']
+        return self._time_column(np.amax)
+
+    def _build_cycle_start(self):
+        groups = self.groups()
+        if groups is not None:
+            return groups['cycle_start']
+        values = self._time_column(lambda times: times[0])
+        for index, cell in enumerate(self.targets):
+            if cell.birth_time is not None:
+                values[index] = cell.birth_time
+        return values
+
+    def _build_cycle_end(self):
+        groups = self.groups()
+        if groups is not None:
+            return groups['cycle_end']
+        values = self._time_column(lambda times: times[-1])
+        for index, cell in enumerate(self.targets):
+            if cell.division_time is not None:
+                values[index] = cell.division_time
+        return values
+
+
+def _lookup(sorted_values, values):
+    """Positions of values in sorted array, and whether they are found"""
+    if len(sorted_values) == 0:
+        return (np.zeros(len(values), dtype=int),
+                np.zeros(len(values), dtype=bool))
+    position = np.searchsorted(sorted_values, values)
+    position[position == len(sorted_values)] = 0
+    found = sorted_values[position] == values
+    return position, found
+
+
+class CompiledCellFilter(object):
+    """Cell filter evaluated on all cells of a container at once
+
+    Parameters
+    ----------
+    filt : :class:`FilterGeneral` instance
+        filter of type 'CELL' (or 'ANY')
+
+    Examples
+    --------
+    >>> compiled = compile_cell_filter(fset.cell_filter)
+    >>> keep = compiled(container.cells, container)  # boolean array
+    """
+
+    def __init__(self, filt):
+        self.filt = filt
+        return
+
+    def __call__(self, cells, container=None):
+        """Returns boolean mask over cells
+
+        Parameters
+        ----------
+        cells : list of :class:`Cell` instances
+        container : :class:`Container` instance (default None)
+            container of cells, whose arrays are used to collect cell
+            attributes (see :class:`CellTable`)
+
+        Returns
+        -------
+        numpy boolean array, True for cells passing filter
+        """
+        return self.evaluate(CellTable(cells, container=container))
+
+    def evaluate(self, table):
+        """Returns boolean mask over cells of a :class:`CellTable` instance
+
+        A single table can be shared between several compiled filters, so
+        that cell attributes are collected only once.
+        """
+        if len(table) == 0:
+            return np.zeros(0, dtype=bool)
+        return self.filt.mask(table, table.indices())
+
+
+def compile_cell_filter(filt):
+    """Returns a compiled, vectorized version of cell filter filt"""
+    return CompiledCellFilter(filt)
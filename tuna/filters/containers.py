@@ -26,6 +26,7 @@ class FilterContainer(FilterGeneral):
 
 class FilterContainerAny(FilterContainer):
     """True for any container"""
+    _stage = 'metadata'
 
     def __init__(self):
         label = 'True for any container'
@@ -49,6 +50,7 @@ class FilterContainerMetadataEquals(FilterContainer):
     TypeError : if test called upon non-Container object
     KeyError : when requested key is not present in container metadata
     """
+    _stage = 'metadata'  # can be evaluated before data is read
 
     def __init__(self, key, value):
         self.key = key
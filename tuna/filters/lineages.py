@@ -22,6 +22,7 @@ class FilterLineage(FilterGeneral):
 
 class FilterLineageAny(FilterLineage):
     "No selection"
+    _stage = 'metadata'
 
     def __init__(self):
         self.label = 'Always True'
@@ -70,6 +71,8 @@ class FilterLineageTimeIntersect(FilterLineage):
     """Select lineages which data time interval has non-empty intersection
     with given bounds.
     """
+    _stage = 'time'
+
     def __init__(self, lower_bound=None, upper_bound=None):
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
@@ -87,9 +90,13 @@ class FilterLineageTimeIntersect(FilterLineage):
                             upper_bound=self.upper_bound)
         return boo
 
+    def get_time_window(self):
+        return (self.lower_bound, self.upper_bound)
+
 
 class FilterLineageTimeBound(FilterLineage):
     """Select lineages which data time interval is bounded by parameters"""
+    _stage = 'time'
 
     def __init__(self, lower_bound=None, upper_bound=None):
         self.lower_bound = lower_bound
@@ -107,6 +114,9 @@ class FilterLineageTimeBound(FilterLineage):
                           upper_bound=self.upper_bound)
         return boo
 
+    def get_time_window(self):
+        return (self.lower_bound, self.upper_bound)
+
 
 class FilterLineageTimeLength(FilterLineage):
     """Select Lineages which data time interval is bounded by given params."""
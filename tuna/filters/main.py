@@ -77,11 +77,11 @@ def intersect(values, lower_bound=None, upper_bound=None):
         values = [values, ]
     tmin = np.amin(values)
     tmax = np.amax(values)
-    if lower_bound is not None:
+    if upper_bound is not None:
         lower = tmin < upper_bound
     else:
         lower = True
-    if upper_bound is not None:
+    if lower_bound is not None:
         upper = tmax > lower_bound
     else:
         upper = True
@@ -104,6 +104,75 @@ def included(values, lower_bound=None, upper_bound=None):
     return lower and upper
 
 
+def bounded_mask(values, lower_bound=None, upper_bound=None):
+    """Element-wise version of :func:`bounded` for an array of numbers
+
+    NaN values do not pass the test.
+
+    Returns
+    -------
+    numpy boolean array
+    """
+    values = np.asarray(values)
+    boo = ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        if lower_bound is not None:
+            boo &= values >= lower_bound
+        if upper_bound is not None:
+            boo &= values < upper_bound
+    return boo
+
+
+def included_mask(mins, maxs, lower_bound=None, upper_bound=None):
+    """Element-wise version of :func:`included`, given min and max values
+
+    NaN values do not pass the test.
+
+    Returns
+    -------
+    numpy boolean array
+    """
+    mins = np.asarray(mins)
+    maxs = np.asarray(maxs)
+    boo = ~(np.isnan(mins) | np.isnan(maxs))
+    with np.errstate(invalid='ignore'):
+        if lower_bound is not None:
+            boo &= mins > lower_bound
+        if upper_bound is not None:
+            boo &= maxs < upper_bound
+    return boo
+
+
+# parsing stages, from cheapest to most expensive, at which filters can be
+# evaluated: container metadata, time extents of data, parsed data,
+# computed observables
+STAGES = ('metadata', 'time', 'data', 'observable')
+
+
+def _combine_windows(windows, mode='and'):
+    """Combine time windows of filters combined with AND or OR
+
+    A window is a couple (lower, upper), where None stands for no bound; a
+    window set to None stands for no time constraint.
+    """
+    if mode == 'or':
+        if not windows or None in windows:
+            return None
+        lowers = [w[0] for w in windows]
+        uppers = [w[1] for w in windows]
+        lower = None if None in lowers else min(lowers)
+        upper = None if None in uppers else max(uppers)
+        return (lower, upper)
+    windows = [w for w in windows if w is not None]
+    if not windows:
+        return None
+    lowers = [w[0] for w in windows if w[0] is not None]
+    uppers = [w[1] for w in windows if w[1] is not None]
+    lower = max(lowers) if lowers else None
+    upper = min(uppers) if uppers else None
+    return (lower, upper)
+
+
 class FilterError(Exception):
     "Superclass for errors while filtering"
     pass
@@ -138,6 +207,8 @@ class FilterGeneral(object):
     _label = ''  # to be updated
     _type = None  # to be determined
     _obs = []  # declare observables that need to be computed prior to filter
+    _stage = 'data'  # see STAGES: what is needed to evaluate filter
+    _cost = 10  # estimated cost of evaluation (per target)
 
     def __call__(self, *args):
         "Need `func` method -for each filter class- that performs boolean test"
@@ -174,6 +245,50 @@ class FilterGeneral(object):
         """
         return True
 
+    def get_stage(self):
+        """Returns earliest parsing stage at which filter can be evaluated
+
+        Returns
+        -------
+        str, one of STAGES
+        """
+        if self._obs:
+            return 'observable'
+        return self._stage
+
+    def get_time_window(self):
+        """Returns time window that data of any valid target intersects
+
+        Returns
+        -------
+        (lower, upper), or None when filter sets no time constraint
+        """
+        return None
+
+    def get_cost(self):
+        """Returns estimated cost of evaluation, per target"""
+        return self._cost
+
+    def mask(self, table, index):
+        """Boolean test on several targets at once
+
+        Default operation calls filter on each target; filters that can be
+        vectorized override this method.
+
+        Parameters
+        ----------
+        table : :class:`CellTable` instance
+            (see tuna.filters.compiled) stores targets and their attributes
+        index : array of int
+            indices of targets to be tested
+
+        Returns
+        -------
+        numpy boolean array, with same length as index
+        """
+        return np.array([bool(self(table.targets[i])) for i in index],
+                        dtype=bool)
+
     @property
     def label(self):
         "Get label of applied filter(s)"
@@ -218,6 +333,25 @@ class FilterBoolean(FilterGeneral):
         self._obs = ls
         return
 
+    def _update_order(self):
+        """Order of evaluation: cheapest stages, then cheapest filters first
+
+        (repr is unchanged)
+        """
+        def key(filt):
+            return (STAGES.index(filt.get_stage()), filt.get_cost())
+        self._ordered = sorted(self._sequence, key=key)
+        return
+
+    def get_cost(self):
+        return sum([filt.get_cost() for filt in self._sequence])
+
+    def get_stage(self):
+        stages = [STAGES.index(filt.get_stage()) for filt in self._sequence]
+        if not stages:
+            return self._stage
+        return STAGES[max(stages)]
+
     @property
     def label(self):
         "Get label of applied filter(s)"
@@ -242,6 +376,8 @@ class FilterTRUE(FilterBoolean):
     We need this artificial Filter to plug in defaults FilterSets.
 
     """
+    _stage = 'metadata'
+    _cost = 0
 
     def __init__(self):
         self._type = 'ANY'
@@ -251,6 +387,9 @@ class FilterTRUE(FilterBoolean):
     def func(self, *args):
         return True
 
+    def mask(self, table, index):
+        return np.ones(len(index), dtype=bool)
+
 
 class FilterAND(FilterBoolean):
     """Defines boolean AND operation between same type filters.
@@ -313,17 +452,32 @@ class FilterAND(FilterBoolean):
         self.label = label.rstrip()
         # pulls up observable list from content
         self._update_obs()
+        self._update_order()
         return
 
     def func(self, target):
         boo = True
         # when first False is found, no need to go further
-        for filt in self._sequence:
+        for filt in self._ordered:
             boo = filt(target)
             if not boo:
                 break
         return boo
 
+    def mask(self, table, index):
+        boo = np.ones(len(index), dtype=bool)
+        # evaluate each filter on targets that passed previous filters only
+        for filt in self._ordered:
+            candidates = np.flatnonzero(boo)
+            if len(candidates) == 0:
+                break
+            boo[candidates] = filt.mask(table, index[candidates])
+        return boo
+
+    def get_time_window(self):
+        windows = [filt.get_time_window() for filt in self._sequence]
+        return _combine_windows(windows, mode='and')
+
 
 class FilterOR(FilterBoolean):
     """Defines boolean OR operation between same type filters.
@@ -377,17 +531,32 @@ class FilterOR(FilterBoolean):
         self.label = label.rstrip()
         # pulls up observable list from content
         self._update_obs()
+        self._update_order()
         return
 
     def func(self, target):
         boo = False
         # when first True is found, no need to go further
-        for filt in self._sequence:
+        for filt in self._ordered:
             boo = filt(target)
             if boo:
                 break
         return boo
 
+    def mask(self, table, index):
+        boo = np.zeros(len(index), dtype=bool)
+        # evaluate each filter on targets that failed previous filters only
+        for filt in self._ordered:
+            candidates = np.flatnonzero(~boo)
+            if len(candidates) == 0:
+                break
+            boo[candidates] = filt.mask(table, index[candidates])
+        return boo
+
+    def get_time_window(self):
+        windows = [filt.get_time_window() for filt in self._sequence]
+        return _combine_windows(windows, mode='or')
+
 
 class FilterNOT(FilterBoolean):
     """Defines boolean NOT operation on filter.
@@ -410,6 +579,14 @@ class FilterNOT(FilterBoolean):
         filt, = self._sequence
         return not filt(target)
 
+    def get_cost(self):
+        filt, = self._sequence
+        return filt.get_cost()
+
+    def mask(self, table, index):
+        filt, = self._sequence
+        return ~filt.mask(table, index)
+
 
 class FilterSet(object):
     """Collects filters of each type in a single object"""
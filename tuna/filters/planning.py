@@ -0,0 +1,112 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+filters/planning.py module
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Planning of filter evaluation: checks that can be performed on containers
+before their data is read.
+
+Each filter reports the earliest parsing stage at which it can be evaluated
+(see :data:`tuna.filters.main.STAGES`), and the time window that data of a
+valid target must intersect. Container filters that depend only on metadata
+are evaluated before the container file is read; tree and lineage filters
+that bound time reject containers whose time extent, read from the
+container index, does not intersect their window.
+"""
+from __future__ import print_function
+
+from tuna.base.container import Container
+from tuna.filters.main import _combine_windows
+from tuna.io.index import get_container_index
+
+
+class ContainerPlan(object):
+    """Container checks derived from a :class:`FilterSet` instance
+
+    Parameters
+    ----------
+    fset : :class:`FilterSet` instance
+    exp : :class:`Experiment` instance
+
+    Attributes
+    ----------
+    metadata_check : bool
+        whether container filter depends only on container metadata
+    time_window : (lower, upper) or None
+        time window that data of valid trees and lineages must intersect
+    """
+
+    def __init__(self, fset, exp):
+        self.fset = fset
+        self.exp = exp
+        container_filter = fset.container_filter
+        self.metadata_check = container_filter.get_stage() == 'metadata'
+        windows = [fset.colony_filter.get_time_window(),
+                   fset.lineage_filter.get_time_window()]
+        self.time_window = _combine_windows(windows, mode='and')
+        self._index = None
+        return
+
+    @property
+    def active(self):
+        """Whether some check can be performed before reading data"""
+        if self.exp.filetype != 'text':
+            return False
+        return self.metadata_check or self.time_window is not None
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = get_container_index(self.exp)
+        return self._index
+
+    def precheck(self, label):
+        """Whether container might yield valid data, without reading it
+
+        Parameters
+        ----------
+        label : str
+            container label
+
+        Returns
+        -------
+        bool
+            False when container is rejected by metadata, or when its time
+            extent does not intersect time window of tree/lineage filters
+        """
+        if self.metadata_check:
+            container = Container(label, exp=self.exp)
+            if not self.fset.container_filter(container):
+                return False
+        if self.time_window is not None:
+            index = self._get_index()
+            tmin = index.loc[label, 'tmin']
+            tmax = index.loc[label, 'tmax']
+            lower, upper = self.time_window
+            # conservative bounds: filters may include boundaries
+            if upper is not None and not tmin <= upper:
+                return False
+            if lower is not None and not tmax >= lower:
+                return False
+        return True
+
+    def select(self, labels=None):
+        """Returns labels of containers that pass prechecks
+
+        Parameters
+        ----------
+        labels : list of str (default None)
+            container labels to check, None for all experiment containers
+
+        Returns
+        -------
+        list of str, or labels when no check can be performed
+        """
+        if not self.active:
+            return labels
+        if labels is None:
+            labels = self.exp.containers
+        return [label for label in labels if self.precheck(label)]
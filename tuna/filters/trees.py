@@ -22,6 +22,7 @@ class FilterTree(FilterGeneral):
 
 
 class FilterTreeAny(FilterTree):
+    _stage = 'metadata'
 
     def __init__(self):
         self.label = 'Always True'
@@ -54,6 +55,7 @@ class FilterTreeDepth(FilterTree):
 
 
 class FilterTreeTimeIntersect(FilterTree):
+    _stage = 'time'
 
     def __init__(self, lower_bound=None, upper_bound=None):
         self.lower_bound = lower_bound
@@ -73,3 +75,6 @@ class FilterTreeTimeIntersect(FilterTree):
             values.append(np.amax(tmaxs))
         return intersect(values, lower_bound=self.lower_bound,
                          upper_bound=self.upper_bound)
+
+    def get_time_window(self):
+        return (self.lower_bound, self.upper_bound)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Modules that defines import from/export to binary Numpy files (.npy)
+
+Large arrays are stored as .npy files, that can be memory-mapped: data is
+read from disk only when it is accessed. :class:`LazyArray` attributes
+defer loading until first access.
+"""
+from __future__ import print_function
+
+import os
+
+import numpy as np
+
+from tuna.io.text import MissingFileError
+
+
+def save_array(path, arr):
+    """Save array to .npy file
+
+    Parameters
+    ----------
+    path : str
+        absolute path to .npy file
+    arr : ndarray (structured arrays are accepted)
+    """
+    np.save(path, arr)
+    return
+
+
+def load_array(path, lazy=True):
+    """Load array from .npy file
+
+    Parameters
+    ----------
+    path : str
+        absolute path to .npy file
+    lazy : bool {True, False}
+        whether to memory-map the file (read-only) instead of reading it
+
+    Returns
+    -------
+    ndarray (or read-only :class:`numpy.memmap` when lazy)
+
+    Raises
+    ------
+    :exception:`MissingFileError` when file does not exist
+    """
+    if not os.path.exists(path):
+        raise MissingFileError(path)
+    if lazy:
+        return np.load(path, mmap_mode='r')
+    return np.load(path)
+
+
+class LazyArray(object):
+    """Attribute that can be bound to a .npy file, loaded on first access.
+
+    Parameters
+    ----------
+    name : str
+        name of the attribute in the owner class
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.key = '_' + name
+        return
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.key)
+        if value is None:
+            paths = obj.__dict__.get('_lazy_paths', {})
+            if self.name in paths:
+                value = load_array(paths.pop(self.name), lazy=True)
+                obj.__dict__[self.key] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.key] = value
+        obj.__dict__.setdefault('_lazy_paths', {}).pop(self.name, None)
+        return
+
+
+def defer(obj, name, path):
+    """Bind LazyArray attribute name of obj to .npy file path
+
+    Parameters
+    ----------
+    obj : instance of a class with a LazyArray attribute called name
+    name : str
+    path : str
+        absolute path to .npy file
+
+    Raises
+    ------
+    :exception:`MissingFileError` when file does not exist
+    """
+    if not os.path.exists(path):
+        raise MissingFileError(path)
+    obj.__dict__['_' + name] = None
+    obj.__dict__.setdefault('_lazy_paths', {})[name] = path
+    return
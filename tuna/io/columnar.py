@@ -0,0 +1,328 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+io/columnar.py module
+~~~~~~~~~~~~~~~~~~~~~
+
+Bulk export of lineage timeseries to a columnar file.
+
+Every lineage browsed by a :class:`Parser` instance is converted to
+timeseries of a set of observables, under a set of conditions, and rows
+are appended to a single table, in large batches. Columns are:
+
+    * 'container': container label
+    * 'colony': index of colony in container
+    * 'lineage': index of lineage in colony (in the decomposition used)
+    * 'cellID': cell identifier
+    * 'time': time (or generation index, depending on observable timing)
+    * one column per observable, named after :meth:`Observable.label`;
+      when several observables are exported, rows are the union of their
+      (cellID, time) couples, and missing values are NaN
+    * 'condition_<k>': whether cell passes k-th condition (boolean)
+
+Supported formats are:
+
+    * 'h5': HDF5 table /timeseries (PyTables), zlib compressed; observable
+      and condition representations are stored as table attributes
+    * 'parquet': Apache Parquet file, requires pyarrow; representations
+      are stored as schema metadata
+
+Files are read back as :class:`pandas.DataFrame` with
+:func:`read_timeseries`.
+"""
+from __future__ import print_function
+
+import os
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+import tables
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from tuna.io import text
+
+FORMATS = ('h5', 'parquet')
+BATCH_SIZE = 262144  # rows
+# file attributes, stored as JSON strings
+ATTRIBUTES = ('experiment', 'observables', 'observable_labels', 'conditions')
+
+
+def _get_dtype(exp, observables, cset):
+    "Structured type of exported rows"
+    width = max([len(label) for label in exp.containers] + [1])
+    cid_type = 'S16'
+    names = np.dtype(exp.datatype).names
+    if names is not None and 'cellID' in names:
+        cid_type = np.dtype(exp.datatype)['cellID']
+    dtype = [('container', 'S{}'.format(width)),
+             ('colony', 'u4'),
+             ('lineage', 'u4'),
+             ('cellID', cid_type),
+             ('time', 'f8')]
+    dtype += [(obs.label(), 'f8') for obs in observables]
+    dtype += [('condition_{}'.format(index), '?')
+              for index in range(len(cset))]
+    return np.dtype(dtype)
+
+
+def lineage_rows(lineage, observables, cset, dtype):
+    """Rows of lineage timeseries, as a Numpy structured array
+
+    Parameters
+    ----------
+    lineage : :class:`Lineage` instance
+    observables : list of :class:`Observable` instances
+    cset : list of :class:`FilterSet` instances
+    dtype : Numpy structured type
+        see module docstring for columns
+
+    Returns
+    -------
+    Numpy structured array, without container, colony, lineage indices
+    """
+    positions = []
+    times = []
+    values = []
+    selections = None
+    for obs in observables:
+        ts = lineage.get_timeseries(obs, cset)
+        if selections is None:
+            selections = ts.selections
+        label = obs.label()
+        pos = []
+        for index, sl in enumerate(ts.slices):
+            if sl is None:
+                continue
+            chunk = ts.timeseries[sl]
+            pos.append(np.repeat(index, len(chunk)))
+            times.append(chunk['time'])
+            values.append((label, chunk[label]))
+        positions.extend(pos)
+    if not positions:
+        return np.zeros(0, dtype=dtype)
+    keys = np.zeros(sum(len(pos) for pos in positions),
+                    dtype=[('position', 'i8'), ('time', 'f8')])
+    keys['position'] = np.concatenate(positions)
+    keys['time'] = np.concatenate(times)
+    # union of (cell, time) couples over observables
+    unique, inverse = np.unique(keys, return_inverse=True)
+    rows = np.zeros(len(unique), dtype=dtype)
+    for obs in observables:
+        rows[obs.label()] = np.nan
+    start = 0
+    for label, vals in values:
+        stop = start + len(vals)
+        rows[label][inverse[start:stop]] = vals
+        start = stop
+    idseq = np.array(lineage.idseq)
+    rows['cellID'] = idseq[unique['position']].astype(dtype['cellID'])
+    rows['time'] = unique['time']
+    for index, fset in enumerate(cset):
+        mask = np.asarray(selections[repr(fset)], dtype=bool)
+        rows['condition_{}'.format(index)] = mask[unique['position']]
+    return rows
+
+
+def iter_batches(parser, observables, cset=[], size=None,
+                 batch_size=BATCH_SIZE):
+    """Iterate over batches of rows of lineage timeseries
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    observables : list of :class:`Observable` instances
+    cset : list of :class:`FilterSet` instances
+    size : int (default None)
+        limit on the number of lineages
+    batch_size : int
+        minimal number of rows per batch (except last batch)
+
+    Yields
+    ------
+    Numpy structured arrays
+    """
+    exp = parser.experiment
+    dtype = _get_dtype(exp, observables, cset)
+    chunks = []
+    nrows = 0
+    count = 0
+    for colony in parser.iter_colonies(mode='all'):
+        container = colony.container
+        colony_index = container.trees.index(colony)
+        lineages = colony.iter_lineages(filt=parser.fset.lineage_filter)
+        for lineage_index, lineage in enumerate(lineages):
+            rows = lineage_rows(lineage, observables, cset, dtype)
+            rows['container'] = container.label
+            rows['colony'] = colony_index
+            rows['lineage'] = lineage_index
+            chunks.append(rows)
+            nrows += len(rows)
+            if nrows >= batch_size:
+                yield np.concatenate(chunks)
+                chunks = []
+                nrows = 0
+            count += 1
+            if size is not None and count >= size:
+                break
+        if size is not None and count >= size:
+            break
+    if chunks:
+        yield np.concatenate(chunks)
+    return
+
+
+def _get_attributes(exp, observables, cset):
+    "Experiment label, representations of observables and conditions (JSON)"
+    attrs = {'experiment': exp.label,
+             'observables': [repr(obs) for obs in observables],
+             'observable_labels': [obs.label() for obs in observables],
+             'conditions': [repr(fset) for fset in cset]}
+    return dict((key, json.dumps(value)) for key, value in attrs.items())
+
+
+def _write_h5(fname, batches, dtype, attrs, complevel):
+    "Append batches to /timeseries table of HDF5 file"
+    filters = tables.Filters(complevel=complevel, complib='zlib')
+    h5file = tables.open_file(fname, mode='w', title='Lineage timeseries')
+    try:
+        with warnings.catch_warnings():
+            # observable labels are not valid python identifiers
+            warnings.simplefilter('ignore', tables.NaturalNameWarning)
+            table = h5file.create_table(h5file.root, 'timeseries', dtype,
+                                        'Lineage timeseries', filters=filters,
+                                        expectedrows=BATCH_SIZE)
+        for key, value in attrs.items():
+            table.attrs[key] = value
+        for batch in batches:
+            table.append(batch)
+        table.flush()
+    finally:
+        h5file.close()
+    return
+
+
+def _as_dataframe(arr):
+    "DataFrame from structured array, with byte strings decoded"
+    df = pd.DataFrame.from_records(arr)
+    for name in df.columns:
+        if arr.dtype[name].kind == 'S':
+            df[name] = df[name].str.decode('utf-8')
+    return df
+
+
+def _write_parquet(fname, batches, dtype, attrs):
+    "Write batches as row groups of a Parquet file"
+    if pyarrow is None:
+        raise ImportError("format 'parquet' requires pyarrow")
+    writer = None
+    try:
+        for batch in batches:
+            table = pyarrow.Table.from_pandas(_as_dataframe(batch),
+                                              preserve_index=False)
+            table = table.replace_schema_metadata(attrs)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(fname, table.schema)
+            writer.write_table(table)
+        if writer is None:  # no row: write empty table
+            table = pyarrow.Table.from_pandas(
+                _as_dataframe(np.zeros(0, dtype=dtype)), preserve_index=False)
+            pyarrow.parquet.write_table(table.replace_schema_metadata(attrs),
+                                        fname)
+    finally:
+        if writer is not None:
+            writer.close()
+    return
+
+
+def export_timeseries(parser, observables, cset=[], fname=None, fmt='h5',
+                      size=None, batch_size=BATCH_SIZE, complevel=5):
+    """Export timeseries of all lineages to a columnar file
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    observables : :class:`Observable` instance, or list of them
+    cset : list of :class:`FilterSet` instances
+        conditions, exported as boolean columns
+    fname : str (default None)
+        output file; default is 'timeseries.h5' (or '.parquet') in the
+        analysis folder
+    fmt : str {'h5', 'parquet'}
+    size : int (default None)
+        limit on the number of lineages
+    batch_size : int
+        number of rows written at once
+    complevel : int
+        compression level of HDF5 file (0 for no compression)
+
+    Returns
+    -------
+    fname : str
+        absolute path to written file
+    """
+    if fmt not in FORMATS:
+        raise ValueError('fmt must be one of {}'.format(FORMATS))
+    if not isinstance(observables, (list, tuple)):
+        observables = [observables, ]
+    labels = [obs.label() for obs in observables]
+    if len(set(labels)) != len(labels):
+        raise ValueError('observables must have distinct labels')
+    exp = parser.experiment
+    if fname is None:
+        path = text.get_analysis_path(exp, write=True)
+        fname = os.path.join(path, 'timeseries.' + fmt)
+    fname = os.path.abspath(os.path.expanduser(fname))
+    dtype = _get_dtype(exp, observables, cset)
+    attrs = _get_attributes(exp, observables, cset)
+    batches = iter_batches(parser, observables, cset, size=size,
+                           batch_size=batch_size)
+    if fmt == 'h5':
+        _write_h5(fname, batches, dtype, attrs, complevel)
+    else:
+        _write_parquet(fname, batches, dtype, attrs)
+    return fname
+
+
+def read_timeseries(fname):
+    """Read exported timeseries
+
+    Parameters
+    ----------
+    fname : str
+        file written by :func:`export_timeseries`
+
+    Returns
+    -------
+    df : :class:`pandas.DataFrame` instance
+    attrs : dict
+        'experiment' label, 'observables', 'observable_labels', and
+        'conditions' (representations of condition k, for column
+        'condition_<k>')
+    """
+    if fname.endswith('.parquet'):
+        if pyarrow is None:
+            raise ImportError("format 'parquet' requires pyarrow")
+        table = pyarrow.parquet.read_table(fname)
+        metadata = table.schema.metadata or {}
+        attrs = {}
+        for key in ATTRIBUTES:
+            value = metadata.get(key.encode('utf-8'))
+            if value is not None:
+                attrs[key] = json.loads(value.decode('utf-8'))
+        return table.to_pandas(), attrs
+    with tables.open_file(fname, mode='r') as h5file:
+        table = h5file.root.timeseries
+        arr = table.read()
+        attrs = dict((key, json.loads(table.attrs[key]))
+                     for key in ATTRIBUTES if key in table.attrs)
+    return _as_dataframe(arr), attrs
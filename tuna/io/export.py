@@ -35,6 +35,9 @@ def output_by_lineages(exp,
     testing -- bool
 
     TODO: edit README file (automatic), using filter labels
+
+    See :func:`tuna.io.columnar.export_timeseries` for a bulk, columnar
+    export (HDF5 or Parquet) of lineage timeseries.
     """
     export_path = os.path.abspath(os.path.expanduser(export_path))
 
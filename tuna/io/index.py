@@ -0,0 +1,154 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+This module defines a small persisted index of containers.
+
+For each container of a text experiment, the index stores the modification
+time of its file, the time extents of its data, and its numbers of rows
+(frames), cells and lineages (in an independent decomposition). It is written as
+'containers_index.tsv' in the analysis folder, and it is updated only for
+containers whose file has been added or modified since last inspection.
+"""
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from tuna.io import text
+
+
+INDEX_BASENAME = 'containers_index.tsv'
+INDEX_COLUMNS = ['mtime', 'tmin', 'tmax', 'nrows', 'ncells', 'nlineages']
+
+
+def _get_index_path(exp, write=False):
+    analysis_path = text.get_analysis_path(exp, write=write)
+    return os.path.join(analysis_path, INDEX_BASENAME)
+
+
+def scan_container(exp, label):
+    """Inspect container file, reading only time and identifier columns
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+        text experiment
+    label : str
+        container label
+
+    Returns
+    -------
+    dict
+        keys are 'mtime', 'tmin', 'tmax', 'nrows', 'ncells', 'nlineages';
+        number of lineages is the number of cells that are not parent of
+        another cell of the container (NaN when there is no parentID column)
+    """
+    folder = os.path.join(exp.abspath, 'containers')
+    fname = text.get_file(label, folder)
+    labels = [name for name, dtype in exp.datatype]
+    names = [name for name in ['time', 'cellID', 'parentID']
+             if name in labels]
+    arr = text.get_columns(fname, exp.datatype, names)
+    times = arr['time']
+    if len(times) == 0 or np.all(np.isnan(times)):
+        tmin, tmax = np.nan, np.nan
+    else:
+        tmin, tmax = np.nanmin(times), np.nanmax(times)
+    ncells, nlineages = np.nan, np.nan
+    if 'cellID' in names:
+        cids = np.unique(arr['cellID'])
+        ncells = len(cids)
+        if 'parentID' in names:
+            parents = np.unique(arr['parentID'])
+            nlineages = ncells - np.sum(np.in1d(cids, parents))
+    return {'mtime': os.path.getmtime(fname),
+            'tmin': tmin, 'tmax': tmax, 'nrows': len(times),
+            'ncells': ncells, 'nlineages': nlineages}
+
+
+def load_container_index(exp):
+    """Load persisted index, with no update
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+
+    Returns
+    -------
+    :class:`pandas.DataFrame` instance
+        indexed by container label, columns are INDEX_COLUMNS
+
+    Raises
+    ------
+    :exception:`MissingFileError` when no index has been written yet
+    """
+    path = _get_index_path(exp, write=False)
+    if not os.path.exists(path):
+        raise text.MissingFileError(path)
+    df = pd.read_csv(path, sep='\t', index_col='label',
+                     dtype={'label': str})
+    return df
+
+
+def get_container_index(exp, write=True):
+    """Get up-to-date index of containers from a text experiment
+
+    Stored index is loaded when it exists; containers whose file has been
+    added or modified are scanned, removed containers are dropped.
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+        text experiment
+    write : bool {True, False}
+        whether to save index when it has been updated
+
+    Returns
+    -------
+    :class:`pandas.DataFrame` instance
+        indexed by container label, columns are INDEX_COLUMNS
+    """
+    if exp.filetype != 'text':
+        raise ValueError('Container index is defined for text experiments')
+    try:
+        stored = load_container_index(exp)
+    except text.MissingFileError:
+        stored = None
+    # index written by previous versions lacks columns: rescan
+    if stored is None or not set(INDEX_COLUMNS).issubset(stored.columns):
+        stored = pd.DataFrame(columns=INDEX_COLUMNS,
+                              index=pd.Index([], name='label'))
+    folder = os.path.join(exp.abspath, 'containers')
+    records = []
+    updated = False
+    for label in exp.containers:
+        mtime = os.path.getmtime(text.get_file(label, folder))
+        if label in stored.index and abs(stored.loc[label, 'mtime'] - mtime) < 1.e-3:
+            record = stored.loc[label].to_dict()
+        else:
+            record = scan_container(exp, label)
+            updated = True
+        record['label'] = label
+        records.append(record)
+    if len(records) != len(stored):
+        updated = True
+    df = pd.DataFrame(records, columns=['label'] + INDEX_COLUMNS)
+    df = df.set_index('label')
+    if updated and write:
+        df.to_csv(_get_index_path(exp, write=True), sep='\t',
+                  float_format='%.6f')
+    return df
+
+
+def get_time_boundaries(exp):
+    """Returns min and max value for time values from container index
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+        text experiment
+    """
+    df = get_container_index(exp)
+    return np.nanmin(df['tmin'].values), np.nanmax(df['tmax'].values)
@@ -9,9 +9,12 @@ import os
 import re
 import warnings
 
+import numpy as np
 import treelib
 
-from tuna.io.text import is_valid_experiment_folder
+from tuna.io import binary
+from tuna.io.text import (is_valid_experiment_folder, read_manifest,
+                          MissingFileError, MissingFolderError)
 from tuna import Observable
 from tuna.parser import Parser
 
@@ -51,11 +54,17 @@ except ImportError:
 class SniffingError(Exception):
     pass
 
-(EXPERIMENT, ANALYSIS, FILTERSET, OBSERVABLE, CONDITION) = list(range(5))
+(EXPERIMENT, ANALYSIS, FILTERSET, CONDITION, OBSERVABLE) = list(range(5))
 
 
 class Sniffer(object):
-    """A class to explore the experiment folder"""
+    """A class to explore the experiment folder
+
+    Analysis folders are organized as filterset -> condition -> observable.
+    When the analysis folder holds a manifest (see
+    :func:`tuna.io.text.read_manifest`), the folder tree is built from it,
+    otherwise each directory is listed and parsed.
+    """
 
     def __init__(self, path=None):
         self.path = None
@@ -81,17 +90,25 @@ class Sniffer(object):
                 return
             else:
                 self.path = path
-#        analysis = os.path.join(self.path, 'analysis')
-#        if not os.path.exists(analysis):
-#            msg = ('No analysis folder under {}'.format(self.path))
-#            warnings.warn(msg)
-#            return
-        fold = SniffFolder(self.path)
+        fold = SniffFolder(self.path, level=EXPERIMENT)
         root = treelib.Node(tag=self.label, data=fold)
         root.level = 0  # necessary for later purposes
         tree = treelib.Tree()
         tree.add_node(root, parent=None)
-        _add_children_nodes(tree, root)
+        for item in fold._contains:
+            # data files are not explored
+            if item == 'containers':
+                continue
+            path = os.path.join(self.path, item)
+            fold = SniffFolder(path, level=ANALYSIS)
+            node = treelib.Node(tag=fold.label, data=fold)
+            tree.add_node(node, parent=root.identifier)
+            try:
+                records = read_manifest(path)
+            except MissingFileError:
+                _add_children_nodes(tree, node)
+            else:
+                _add_manifest_nodes(tree, node, records)
         self._tree = tree
         tree.show()
         return
@@ -143,13 +160,13 @@ class Sniffer(object):
                 if depth == 0:
                     path = node.data.path
                 else:
-                    _, last = node.data.path.split(self.label)
-                    path = self.label + last
+                    path = os.path.relpath(node.data.path,
+                                           os.path.dirname(self.path))
                 indent = '  ' * depth
                 loc = ('{}label: {}'.format(indent, node.data.label) + '\n'
                        '{}path: {}'.format(indent, path) + '\n'
                        '{}description:'.format(indent) + '\n')
-                for line in StringIO(node.data.human).readlines():
+                for line in StringIO(node.data.human or '').readlines():
                     loc += '{}{}'.format(indent, line)
                 loc += '\n\n'
                 msg += loc
@@ -201,43 +218,18 @@ class Sniffer(object):
             raise SniffingError('No filterset_{:02d}'.format(index))
         return res
 
-    def get_obs_node(self, codestring, filterset_index, folder='analysis'):
-        """Returns obs node corresponding to observable codestring.
-
-        Parameters
-        ----------
-        codestring : str
-            codestring encoding :class:`Observable` parameters
-        filterset_index: int
-            sets the filterset for which observable has been computed
-        folder : str
-            this is the main folder under which filterset are defined
-
-        Returns
-        -------
-        :class:`Node` instance
-        """
-        res = None
-        fnode = self.get_filterset_node(filterset_index, folder=folder)
-        for nid in fnode.fpointer:
-            node = self._tree.get_node(nid)
-            if node.data.label == codestring:
-                res = node
-        if res is None:
-            raise SniffingError('No obs codestring {}'.format(codestring))
-        return res
-
-    def get_condition_node(self, condition_index, codestring, filterset_index,
-                           folder='analysis'):
-        """Returns condition node corresponding to observable codestring
+    def get_condition_node(self, condition_index, codestring=None,
+                           filterset_index=0, folder='analysis'):
+        """Returns condition node corresponding to condition index
 
         Parameters
         ----------
         condition_index : int
             condition index to get. Note that 0 corresponds to 'master';
             nodes corresponding to condition Filters start at index 1
-        codestring : str
-            observable codestring
+        codestring : str (default None)
+            when given, checks that observable has been analyzed under
+            this condition
         filterset_index : int
             filterset index
         folder : str (default 'analysis')
@@ -249,20 +241,71 @@ class Sniffer(object):
             node instance of folder tree, with :attr:`.data` pointing
             to corresponding :class:`SniffingFolder` instance.
         """
-        onode = self.get_obs_node(codestring, filterset_index, folder)
+        fnode = self.get_filterset_node(filterset_index, folder=folder)
         res = None
-        for cid in onode.fpointer:
+        for cid in fnode.fpointer:
             node = self._tree.get_node(cid)
-            if condition_index == 0 and node.data.label == 'master':
-                res = node
-                break
-            elif node.data.index == condition_index:
+            if node.data.level == CONDITION and node.data.index == condition_index:
                 res = node
                 break
         if res is None:
             raise SniffingError('No condition_{:02d}'.format(condition_index))
+        if codestring is not None:
+            self._get_child_by_label(res, codestring)
         return res
 
+    def get_obs_node(self, codestring, filterset_index, folder='analysis',
+                     condition_index=0):
+        """Returns obs node corresponding to observable codestring.
+
+        Parameters
+        ----------
+        codestring : str
+            codestring encoding :class:`Observable` parameters
+        filterset_index: int
+            sets the filterset for which observable has been computed
+        folder : str
+            this is the main folder under which filterset are defined
+        condition_index : int (default 0)
+            condition under which observable has been computed, 0 is 'master'
+
+        Returns
+        -------
+        :class:`Node` instance
+        """
+        cnode = self.get_condition_node(condition_index,
+                                        filterset_index=filterset_index,
+                                        folder=folder)
+        return self._get_child_by_label(cnode, codestring)
+
+    def _get_child_by_label(self, node, label):
+        for nid in node.fpointer:
+            child = self._tree.get_node(nid)
+            if child.data.label == label:
+                return child
+        raise SniffingError('No obs codestring {}'.format(label))
+
+    def get_results(self, codestring, filterset_index=0, condition_index=0,
+                    folder='analysis'):
+        """Returns lazy handle to results computed for observable
+
+        Parameters
+        ----------
+        codestring : str
+            observable codestring (use 'row---column' for bivariate results)
+        filterset_index : int (default 0)
+        condition_index : int (default 0)
+            0 is 'master'
+        folder : str (default 'analysis')
+
+        Returns
+        -------
+        :class:`ResultHandle` instance
+        """
+        node = self.get_obs_node(codestring, filterset_index, folder=folder,
+                                 condition_index=condition_index)
+        return ResultHandle(node.data.path)
+
     def get_node(self, path):
         """Returns node corresponding to SniffFolder instance at path=
         """
@@ -303,7 +346,7 @@ class Sniffer(object):
         res = None
         if abspath is not None:
             node = self.get_node(abspath)
-            if node.data.level != self.FILTERSET:
+            if node.data.level != FILTERSET:
                 raise SniffingError('This is no filterset')
             res = eval(node.data.representation)
         else:
@@ -418,26 +461,38 @@ class Sniffer(object):
         -------
         list of :class:`FilterSet` instances
         """
-        node = None
         if abspath is not None:
             node = self.get_node(abspath)
             if node.data.level != OBSERVABLE:
                 msg = '{} should point to observable'.format(abspath)
                 raise SniffingError(msg)
+            codestring = node.data.label
+            fnode = self._tree.parent(self._tree.parent(node.identifier).identifier)
         else:
-            node = self.get_obs_node(codestring, filterset_index, folder)
-        if node is None:
-            raise SniffingError('This is not a node')
+            fnode = self.get_filterset_node(filterset_index, folder=folder)
         selections = []
-        for cid in node.fpointer:
-            cnode = self._tree.get_node(cid)
-            if cnode.data.label != 'master':
+        for cnode, onode in self._iter_conditions(fnode, codestring):
+            if cnode.data.index != 0:
                 selections.append(eval(cnode.data.representation))
         return selections
 
+    def _iter_conditions(self, fnode, codestring):
+        """Yields (condition node, obs node) where codestring was analyzed
+
+        Conditions are sorted by index, 'master' comes first.
+        """
+        cnodes = [self._tree.get_node(cid) for cid in fnode.fpointer]
+        cnodes = [cnode for cnode in cnodes if cnode.data.level == CONDITION]
+        for cnode in sorted(cnodes, key=lambda n: n.data.index):
+            for oid in cnode.fpointer:
+                onode = self._tree.get_node(oid)
+                if onode.data.label == codestring:
+                    yield cnode, onode
+                    break
+
 
 def load_framework(sniffer, filterset_index=0, codestring=None,
-                   folder='analysis'):
+                   folder='analysis', lazy_results=False):
     """Loads a saved framework.
 
     This function sets :class:`Parser` (as a combination of both
@@ -453,6 +508,8 @@ def load_framework(sniffer, filterset_index=0, codestring=None,
         Observable codestring to be loaded
     folder : str (default 'analysis')
         folder under which filterset_index is search for
+    lazy_results : bool {False, True}
+        whether to return also handles to stored results
 
     Returns
     -------
@@ -464,6 +521,11 @@ def load_framework(sniffer, filterset_index=0, codestring=None,
     conditions : list of :class:`FilterSet` instances
         the various conditions defined in files
 
+    When lazy_results is True, a fourth item is returned:
+    results : dict
+        keys are 'master' and repr of each condition, values are
+        :class:`ResultHandle` instances; arrays are read only when accessed
+
     See also
     --------
     :class:`Sniffer`
@@ -478,73 +540,184 @@ def load_framework(sniffer, filterset_index=0, codestring=None,
     fset = eval(fnode.data.representation)
     parser.fset = fset
     obs, cset = None, None
+    results = {}
     if codestring is not None:
         onode = sniffer.get_obs_node(codestring, filterset_index,
                                      folder=folder)
         obs = eval(onode.data.representation)
         selections = []
-        for nid in onode.fpointer:
-            node = sniffer._tree.get_node(nid)
-            rep = node.data.representation
-            if node.data.label != 'master' and rep is not None:
+        for cnode, onode in sniffer._iter_conditions(fnode, codestring):
+            rep = cnode.data.representation
+            if cnode.data.index == 0:
+                key = 'master'
+            else:
                 selections.append(eval(rep))
+                key = rep
+            results[key] = ResultHandle(onode.data.path)
         cset = selections
+    if lazy_results:
+        return parser, obs, cset, results
     return parser, obs, cset
 
 
-class SniffFolder(object):
-    """Excludes experiment root file that is parsed in Sniffer"""
+class ResultHandle(object):
+    """Lazy access to result files stored in an observable folder
+
+    Arrays are loaded only when accessed: binary .npy files are
+    memory-mapped, text .tsv files are read in full. When a result has been
+    exported under both formats, the binary file is used.
+
+    Parameters
+    ----------
+    path : str
+        absolute path to observable folder
+    """
 
     def __init__(self, path):
+        self.path = path
+        self._arrays = {}
+        return
+
+    def _files(self):
+        files = {}
+        if not os.path.isdir(self.path):
+            raise MissingFolderError(self.path)
+        for item in os.listdir(self.path):
+            name, ext = os.path.splitext(item)
+            if ext in ('.npy', '.npz', '.tsv'):
+                # binary files come first
+                if name not in files or ext != '.tsv':
+                    files[name] = os.path.join(self.path, item)
+        return files
+
+    @property
+    def names(self):
+        """List of stored results, e.g. 'onepoint', 'autocorr'"""
+        return sorted(self._files().keys())
+
+    def __contains__(self, name):
+        return name in self._files()
+
+    def __getitem__(self, name):
+        if name in self._arrays:
+            return self._arrays[name]
+        files = self._files()
+        if name not in files:
+            raise MissingFileError(os.path.join(self.path, name))
+        fname = files[name]
+        ext = os.path.splitext(fname)[1]
+        if ext == '.npy':
+            arr = binary.load_array(fname, lazy=True)
+        elif ext == '.npz':
+            with np.load(fname) as data:
+                arr = {key: data[key] for key in data.files}
+        else:
+            arr = _read_tsv(fname, name)
+        self._arrays[name] = arr
+        return arr
+
+    def __repr__(self):
+        return 'ResultHandle({})'.format(repr(self.path))
+
+
+def _read_tsv(fname, name):
+    """Read result text file, as written by tuna.stats modules"""
+    with open(fname, 'r') as f:
+        first = f.readline()
+    if name == 'times':
+        times = []
+        with open(fname, 'r') as f:
+            for line in f.readlines():
+                times.append(np.array(line.rstrip().split('\t')[1:],
+                                      dtype=float))
+        return times
+    try:
+        float(first.split('\t')[0])
+    except ValueError:
+        # one column per field, named in header
+        return np.genfromtxt(fname, delimiter='\t', dtype=None, names=True)
+    dtype = int if name.startswith('count') else float
+    return np.genfromtxt(fname, delimiter='\t', dtype=dtype)
+
+
+class SniffFolder(object):
+    """Folder of the analysis tree
+
+    Parameters
+    ----------
+    path : str
+        absolute path to folder
+    level : int (default None)
+        when None, level is guessed from folder label
+    index : int (default None)
+        filterset or condition index, when level is given
+    """
+
+    def __init__(self, path, level=None, index=None):
         self.path = path
         parent, label = os.path.split(path)
         self.label = label
-        self.level = None  # exp, analysis, filterset, obs, condition
-        self.representation = None
-        self.human = None
+        self.level = level  # exp, analysis, filterset, condition, obs
+        self.index = index
+        self._description = None
         self._contains = []  # sub-folders to explore
-        self._sniff()  # will check what kind of folder this is representing
+        if level is None or level in (EXPERIMENT, ANALYSIS):
+            self._sniff()  # will check what kind of folder this is representing
+        elif level == OBSERVABLE:
+            self.codestring = self.label
         return
 
     def _sniff(self):
         """Snif according to label.
         """
         fpattern = re.compile('filterset_(\d+)')
-        opattern = re.compile('T([a-z])(\d*[\.,]*\d*)M([a-z\-]+)J(\d+)')
         cpattern = re.compile('condition_(\d+)')
         # parse files under path, get only directories
-        self._contains = [item for item in os.listdir(self.path)
-                          if os.path.isdir(os.path.join(self.path, item))]
-        fname = None
-        self.level = None  # default
-        if self.label in ['analysis', 'master']:
-            if self.label == 'analysis':
-                self.level = ANALYSIS
-            elif self.label == 'master':
-                self.level = CONDITION
+        self._contains = sorted([item for item in os.listdir(self.path)
+                                 if os.path.isdir(os.path.join(self.path, item))])
+        if self.level is not None:
             return
+        if self.label == 'analysis':
+            self.level = ANALYSIS
+        elif self.label == 'master':
+            self.level = CONDITION
+            self.index = 0
         elif fpattern.match(self.label):
             self.level = FILTERSET
             sindex, = fpattern.match(self.label).groups()
             self.index = int(sindex)
-            fname = os.path.join(self.path, self.label + '.txt')
-        elif opattern.search(self.label):
-            self.level = OBSERVABLE
-            self.codestring = self.label
-            fname = os.path.join(self.path, 'observable.txt')
         elif cpattern.match(self.label):
             self.level = CONDITION
             sindex, = cpattern.match(self.label).groups()
             self.index = int(sindex)
-            fname = os.path.join(self.path, self.label + '.txt')
-
-        if fname is not None:
-            self.representation, self.human = _read_first_remaining(fname)
         return
 
+    def _describe(self):
+        """Read description file only when needed"""
+        if self._description is None:
+            rep, human = None, None
+            if self.level in (FILTERSET, CONDITION, OBSERVABLE):
+                fname = os.path.join(self.path, self.label + '.txt')
+                # master condition and bivariate folders have no description
+                if os.path.exists(fname):
+                    rep, human = _read_first_remaining(fname)
+            self._description = (rep, human)
+        return self._description
+
+    @property
+    def representation(self):
+        return self._describe()[0]
+
+    @property
+    def human(self):
+        return self._describe()[1]
+
 
 def _add_children_nodes(tree, parent):
-    """Iteratively add filterset sniffers
+    """Iteratively add filterset, condition and observable nodes
+
+    Sub-folders are listed and their label is parsed; observable folders are
+    the sub-folders of condition folders.
 
     Parameters
     ----------
@@ -553,21 +726,50 @@ def _add_children_nodes(tree, parent):
     parent : :class:`treelib.Node` instance
         parent node (usually analysis node) to which filterset nodes will be
         associated
-
-    Yields
-    ------
-    fnode : :class:`treelib.Node` instance
-        child node to parent, containing
     """
+    expected = parent.data.level + 1
     for item in parent.data._contains:
         path = os.path.join(parent.data.path, item)
-        fold = SniffFolder(path)
+        if expected == OBSERVABLE:
+            fold = SniffFolder(path, level=OBSERVABLE)
+        else:
+            fold = SniffFolder(path)
+            if fold.level != expected:
+                continue
         node = treelib.Node(tag=fold.label, data=fold)
         tree.add_node(node, parent=parent.identifier)
         _add_children_nodes(tree, node)
     return
 
 
+def _add_manifest_nodes(tree, parent, records):
+    """Add filterset, condition and observable nodes from manifest records
+
+    Parameters
+    ----------
+    tree : :class:`treelib.Tree` instance
+    parent : :class:`treelib.Node` instance
+        analysis node
+    records : list of (kind, index, relative path)
+        as returned by :func:`tuna.io.text.read_manifest`
+    """
+    levels = {'filterset': FILTERSET, 'condition': CONDITION,
+              'observable': OBSERVABLE}
+    nids = {'': parent.identifier}
+    for kind, index, relpath in records:
+        up, _ = relpath.rpartition('/')[::2]
+        if up not in nids:
+            continue  # parent folder has been removed
+        path = os.path.join(parent.data.path, *relpath.split('/'))
+        if not os.path.isdir(path):
+            continue
+        fold = SniffFolder(path, level=levels[kind], index=index)
+        node = treelib.Node(tag=fold.label, data=fold)
+        tree.add_node(node, parent=nids[up])
+        nids[relpath] = node.identifier
+    return
+
+
 def _read_first_remaining(filename):
     """Get first line of file, and remaining content as couple.
 
@@ -8,6 +8,7 @@ from __future__ import print_function
 import os
 import re
 import glob
+import itertools
 
 import numpy as np
 import pandas as pd
@@ -94,7 +95,7 @@ def get_file(label, folder):
     filename : str
         absolute path to file
     """
-    accepted_extensions = ['', '.txt', '.tsv']
+    accepted_extensions = ['', '.txt', '.tsv', '.npy']
     for ext in accepted_extensions:
         fn = os.path.join(folder, label + ext)
         if os.path.exists(fn):
@@ -104,11 +105,34 @@ def get_file(label, folder):
     return fn
 
 
+def get_container_mtimes(exp):
+    """Gets modification times of container files of a text experiment
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+
+    Returns
+    -------
+    dict
+        keys are container labels, values are modification times (seconds
+        since epoch); empty when experiment is not stored as text files
+    """
+    mtimes = {}
+    if exp.filetype != 'text':
+        return mtimes
+    folder = os.path.join(exp.abspath, 'containers')
+    for label in exp.containers:
+        mtimes[label] = os.path.getmtime(get_file(label, folder))
+    return mtimes
+
+
 def get_array(fname, datatype, delimiter='\t'):
     """Returns Numpy structured array from text file
 
     Text file must be tab separated value and its columns must match the
-    experiment descriptor file.
+    experiment descriptor file. Binary .npy container files (see
+    :mod:`tuna.simu.writer`) are loaded directly.
 
     Parameters
     ----------
@@ -120,11 +144,97 @@ def get_array(fname, datatype, delimiter='\t'):
     -------
     numpy array
     """
+    if fname.endswith('.npy'):
+        return np.load(fname)
     # big array of all cells
     arr = np.genfromtxt(fname, dtype=datatype, delimiter=delimiter)
     return arr
 
 
+def get_columns(fname, datatype, names, delimiter='\t'):
+    """Returns Numpy structured array of selected columns from text file
+
+    Only requested columns are parsed, which is much faster than reading the
+    whole file when only a few columns are needed (e.g. time values).
+
+    Parameters
+    ----------
+    fname : str
+        absolute path to text file to read
+    datatype : Numpy readable datatype
+        datatype of the whole file (as returned by datatype_parser)
+    names : list of str
+        labels of columns to read
+    delimiter : str
+
+    Returns
+    -------
+    numpy array
+        with columns 'names' only
+    """
+    labels = [label for label, dtype in datatype]
+    indices = [labels.index(name) for name in names]
+    sub_dtype = [datatype[index] for index in indices]
+    if fname.endswith('.npy'):
+        arr = np.load(fname, mmap_mode='r')
+        sub = np.zeros(len(arr), dtype=sub_dtype)
+        for name in names:
+            sub[name] = arr[name]
+        return sub
+    try:
+        df = pd.read_csv(fname, sep=delimiter, header=None, usecols=indices,
+                         comment='#', engine='c')
+    except pd.errors.EmptyDataError:
+        return np.zeros(0, dtype=sub_dtype)
+    arr = np.zeros(len(df), dtype=sub_dtype)
+    for index, name in zip(indices, names):
+        arr[name] = df[index].values
+    return arr
+
+
+def write_array(fname, arr, fmt, delimiter='\t', chunksize=65536):
+    """Write structured array as a text file, one row per line
+
+    Output is the same as :func:`numpy.savetxt`, but rows are formatted by
+    chunks, with a single string formatting operation per chunk.
+
+    Parameters
+    ----------
+    fname : str
+        absolute path to text file to write
+    arr : numpy structured array
+    fmt : list of str
+        format of each column (see :func:`tuna.base.container.get_text_format`)
+    delimiter : str
+    chunksize : int
+        number of rows formatted at once
+    """
+    row = delimiter.join(fmt) + '\n'
+    with open(fname, 'w') as f:
+        for start in range(0, len(arr), chunksize):
+            rows = arr[start:start + chunksize].tolist()
+            values = tuple(itertools.chain.from_iterable(rows))
+            f.write((row * len(rows)) % values)
+    return
+
+
+def write_descriptor(fname, datatype, sep=','):
+    """Write descriptor file, to be read by :func:`datatype_parser`
+
+    Parameters
+    ----------
+    fname : str
+        absolute path to descriptor file
+    datatype : list of couples ('label', type)
+    sep : str
+        column separator
+    """
+    with open(fname, 'w') as f:
+        for key, value in datatype:
+            f.write(str(key) + sep + str(value) + '\n')
+    return
+
+
 def datatype_parser(descriptor_file, sep=',', comment='!'):
     """Return Numpy datatype from descriptor file.
 
@@ -302,6 +412,7 @@ def _get_item_path(folder, item, kind='filterset', write=True):
             text_file = os.path.join(path, basename + '.txt')
             with open(text_file, 'w') as f:
                 f.write('{}\n\n{}'.format(repr(item), str(item)))
+            register_folder(path, kind=kind, index=index)
     return index, path
 
 
@@ -323,6 +434,7 @@ def get_condition_path(filter_path, condition, write=True):
         path = os.path.join(filter_path, 'master')
         if write and not os.path.exists(path):
             os.makedirs(path)
+            register_folder(path, kind='condition', index=0)
         return 0, path
     else:
         return _get_item_path(filter_path, condition, kind='condition',
@@ -342,6 +454,47 @@ def get_observable_path(condition_path, obs, write=True):
                                                   str(obs),
                                                   obs.as_latex_string(),
                                                   obs.as_string_table()))
+        register_folder(path, kind='observable')
+    return path
+
+
+def get_window_label(window):
+    """Folder name of results restricted in time, None when not restricted
+
+    Parameters
+    ----------
+    window : tuple (tmin, tmax, decimation), or None
+        first and last evaluation times, and decimation of evaluation grid
+    """
+    if window is None:
+        return None
+    tmin, tmax, decimation = window
+    return 'window_{:g}_{:g}_dec{:d}'.format(tmin, tmax, int(decimation))
+
+
+def get_window_path(obs_path, labels, write=True):
+    """Subfolder of observable path for results restricted in time
+
+    Parameters
+    ----------
+    obs_path : str
+        observable (or couple of observables) folder
+    labels : list of str or None
+        window labels (see :func:`get_window_label`) of each observable;
+        when all are None, results are not restricted and obs_path is
+        returned
+
+    Returns
+    -------
+    str
+    """
+    if all(label is None for label in labels):
+        return obs_path
+    basename = '---'.join([label if label is not None else 'ALL'
+                           for label in labels])
+    path = os.path.join(obs_path, basename)
+    if write and not os.path.exists(path):
+        os.makedirs(path)
     return path
 
 
@@ -353,8 +506,141 @@ def get_biobservable_path(condition_path, obss, write=True):
     if write and not os.path.exists(path):
         os.makedirs(path)
         # no writing of text dile description since univariate analysis did it
+        register_folder(path, kind='observable')
     return path
 
+
+# %% ANALYSIS MANIFEST
+# The manifest is a small tab-separated file at the analysis root that lists
+# every filterset, condition and observable folder, so that the analysis tree
+# can be inspected without listing and parsing each directory.
+
+MANIFEST_BASENAME = 'manifest.tsv'
+MANIFEST_DEPTHS = {'filterset': 1, 'condition': 2, 'observable': 3}
+
+
+def _scan_analysis(analysis_path):
+    """Walk analysis folder and returns list of manifest records"""
+    fpattern = re.compile('filterset_(\d+)')
+    cpattern = re.compile('condition_(\d+)')
+    records = []
+
+    def subfolders(path):
+        return sorted([item for item in os.listdir(path)
+                       if os.path.isdir(os.path.join(path, item))])
+
+    for fitem in subfolders(analysis_path):
+        m = fpattern.match(fitem)
+        if not m:
+            continue
+        records.append(('filterset', int(m.group(1)), fitem))
+        fpath = os.path.join(analysis_path, fitem)
+        for citem in subfolders(fpath):
+            if citem == 'master':
+                index = 0
+            else:
+                m = cpattern.match(citem)
+                if not m:
+                    continue
+                index = int(m.group(1))
+            crel = '/'.join([fitem, citem])
+            records.append(('condition', index, crel))
+            for oitem in subfolders(os.path.join(fpath, citem)):
+                records.append(('observable', None, '/'.join([crel, oitem])))
+    return records
+
+
+def _write_manifest_line(f, kind, index, relpath):
+    sindex = '' if index is None else '{:d}'.format(index)
+    f.write('{}\t{}\t{}\n'.format(kind, sindex, relpath))
+    return
+
+
+def build_manifest(analysis_path):
+    """Write manifest from scratch by walking the analysis folder
+
+    Parameters
+    ----------
+    analysis_path : str
+        absolute path to analysis folder
+
+    Returns
+    -------
+    list of records (kind, index, relative path)
+    """
+    records = _scan_analysis(analysis_path)
+    with open(os.path.join(analysis_path, MANIFEST_BASENAME), 'w') as f:
+        f.write('kind\tindex\tpath\n')
+        for record in records:
+            _write_manifest_line(f, *record)
+    return records
+
+
+def read_manifest(analysis_path):
+    """Read manifest of analysis folder
+
+    Parameters
+    ----------
+    analysis_path : str
+        absolute path to analysis folder
+
+    Returns
+    -------
+    list of records (kind, index, relative path)
+        kind is one of 'filterset', 'condition', 'observable'; index is None
+        for observables, 0 for 'master' condition; relative path uses '/'
+
+    Raises
+    ------
+    :exception:`MissingFileError` when no manifest has been written
+    """
+    fname = os.path.join(analysis_path, MANIFEST_BASENAME)
+    if not os.path.exists(fname):
+        raise MissingFileError(fname)
+    records = []
+    seen = set()
+    with open(fname, 'r') as f:
+        f.readline()  # header
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            kind, sindex, relpath = line.split('\t')
+            if relpath in seen:
+                continue
+            seen.add(relpath)
+            index = int(sindex) if sindex else None
+            records.append((kind, index, relpath))
+    return records
+
+
+def register_folder(path, kind='filterset', index=None):
+    """Add newly created analysis folder to manifest
+
+    When the manifest does not exist yet, it is built by walking the
+    analysis folder (that includes the new folder).
+
+    Parameters
+    ----------
+    path : str
+        absolute path to created folder
+    kind : str {'filterset', 'condition', 'observable'}
+    index : int (default None)
+        filterset or condition index
+    """
+    parts = []
+    analysis_path = path
+    for _ in range(MANIFEST_DEPTHS[kind]):
+        analysis_path, item = os.path.split(analysis_path)
+        parts.insert(0, item)
+    fname = os.path.join(analysis_path, MANIFEST_BASENAME)
+    if not os.path.exists(fname):
+        build_manifest(analysis_path)
+        return
+    with open(fname, 'a') as f:
+        _write_manifest_line(f, kind, index, '/'.join(parts))
+    return
+
 #def find_filterset_path(analysis_path, fset):
 #    """Returns path corresponding to filterset.
 #
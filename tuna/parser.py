@@ -18,6 +18,7 @@ import numpy as np
 import warnings
 
 from tuna.filters.main import FilterSet
+from tuna.filters.planning import ContainerPlan
 
 from tuna.base.experiment import Experiment
 from tuna.base.container import ParsingContainerError
@@ -34,9 +35,11 @@ class Parser(object):
         this is the set of filters used to read/build data, used for
         for iterators
         (usually, only .cell_filter and .container_filter are used)
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        activated by stats API functions called with this parser
     """
 
-    def __init__(self, exp=None, filter_set=None):
+    def __init__(self, exp=None, filter_set=None, profiler=None):
         if exp is None:
             print('Use parser.load_experiment() to load from path to file')
         else:
@@ -52,6 +55,7 @@ class Parser(object):
         else:
             raise TypeError('filter_set is not a FilterSet instance')
         self._sample_list = []  # used for small sample visualization
+        self.profiler = profiler
         return
 
     # GETTING/SETTING EXPERIMENT
@@ -412,7 +416,8 @@ class Parser(object):
         msg += self.info_samples()
         return msg
 
-    def iter_containers(self, mode='all', size=None, shuffle=False):
+    def iter_containers(self, mode='all', size=None, shuffle=False,
+                        labels=None):
         """Iterate through valid containers.
 
         If mode 'all' is chosen, then the iterator browses all files,
@@ -428,6 +433,8 @@ class Parser(object):
         size : int (default None), number of containers to be parsed
         shuffle : bool (default False)
             whether to randomize ordering of containers
+        labels : list of str (default None)
+            restrict iteration to containers with these labels (mode='all')
 
         Yields
         ------
@@ -436,13 +443,19 @@ class Parser(object):
         """
         exp = self.experiment
         if mode == 'all':
+            # metadata and time extent checks are performed before reading
+            plan = ContainerPlan(self.fset, exp)
+            labels = plan.select(labels)
             for container in exp.iter_container(read=True, build=True,
                                                 prefilt=self.fset.cell_filter,
                                                 extend_observables=True,
                                                 report_NaNs=True,
                                                 size=size,
-                                                shuffle=shuffle):
-                if self.fset.container_filter(container):
+                                                shuffle=shuffle,
+                                                labels=labels):
+                if plan.active and plan.metadata_check:
+                    yield container  # container filter already evaluated
+                elif self.fset.container_filter(container):
                     yield container
         elif mode == 'samples':
             count = 0
@@ -455,7 +468,8 @@ class Parser(object):
                         break
         return
 
-    def iter_colonies(self, mode='all', size=None, shuffle=False):
+    def iter_colonies(self, mode='all', size=None, shuffle=False,
+                      labels=None):
         """Iterate through valid colonies.
 
         Parameters
@@ -467,6 +481,8 @@ class Parser(object):
             limit the number of colonies to size. Works only in mode='all'
         shuffle : bool (default False)
             whether to shuffle the ordering of colonies when mode='all'
+        labels : list of str (default None)
+            restrict iteration to containers with these labels (mode='all')
 
         Yields
         ------
@@ -478,7 +494,8 @@ class Parser(object):
             if size is not None:
                 count = 0  # count colonies
                 for container in self.iter_containers(mode='all',
-                                                      shuffle=shuffle):
+                                                      shuffle=shuffle,
+                                                      labels=labels):
                     for colony in container.iter_colonies(filt=colfilt,
                                                           shuffle=shuffle):
                         yield colony
@@ -489,7 +506,8 @@ class Parser(object):
                         break
             else:
                 for container in self.iter_containers(mode='all',
-                                                      shuffle=shuffle):
+                                                      shuffle=shuffle,
+                                                      labels=labels):
                     for colony in container.iter_colonies(filt=colfilt,
                                                           shuffle=shuffle):
                         yield colony
@@ -504,7 +522,8 @@ class Parser(object):
                         break
         return
 
-    def iter_lineages(self, mode='all', size=None, shuffle=False):
+    def iter_lineages(self, mode='all', size=None, shuffle=False,
+                      labels=None):
         """Iterate through valid lineages.
 
         Parameters
@@ -516,6 +535,8 @@ class Parser(object):
             limit the number of lineages to size. Works only in mode='all'
         shuffle : bool (default False)
             whether to shuffle the ordering of lineages when mode='all'
+        labels : list of str (default None)
+            restrict iteration to containers with these labels (mode='all')
 
         Yields
         ------
@@ -525,7 +546,8 @@ class Parser(object):
         if mode == 'all':
             if size is not None:
                 count = 0
-                for colony in self.iter_colonies(mode='all', shuffle=shuffle):
+                for colony in self.iter_colonies(mode='all', shuffle=shuffle,
+                                                 labels=labels):
                     for lineage in colony.iter_lineages(filt=self.fset.lineage_filter,
                                                         shuffle=shuffle):
                         yield lineage
@@ -535,7 +557,8 @@ class Parser(object):
                     if count >= size:
                         break
             else:
-                for colony in self.iter_colonies(mode='all', shuffle=shuffle):
+                for colony in self.iter_colonies(mode='all', shuffle=shuffle,
+                                                 labels=labels):
                     for lineage in colony.iter_lineages(filt=self.fset.lineage_filter,
                                                         shuffle=shuffle):
                         yield lineage
@@ -10,7 +10,7 @@ import re
 
 import matplotlib.transforms as transforms
 
-from tuna.stats.single import Univariate
+from tuna.stats.single import Univariate, UnivariateIOError
 
 
 def add_data_statistics(axes, parser, obs, conditions,
@@ -34,7 +34,11 @@ def add_data_statistics(axes, parser, obs, conditions,
     fill_std matplotlib.collections.PolyCollection
     """
     single = Univariate(obs, parser=parser, cset=conditions)
-    single.import_from_text()
+    # binary results are read lazily: two-point matrices are not loaded
+    try:
+        single.import_from_binary()
+    except UnivariateIOError:
+        single.import_from_text()
     item = single[condition_label]
     tt = item.time
     mm = item.average
@@ -0,0 +1,295 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+profiling.py module
+~~~~~~~~~~~~~~~~~~~
+
+Opt-in instrumentation of the analysis pipeline.
+
+Pipeline steps are enclosed in named stages (see :data:`STAGES`), that are
+recorded by the active :class:`Profiler` instance, if any. When no profiler
+is active, entering a stage costs a function call and an empty context
+manager.
+
+A profiler is activated as a context manager, or for the duration of a
+stats API call, by passing it as the `profiler` keyword argument, or as the
+`profiler` attribute of the :class:`Parser` instance:
+
+>>> profiler = Profiler()
+>>> univ = compute_univariate_dynamics(parser, obs, profiler=profiler)
+>>> with profiler:
+...     for lineage in parser.iter_lineages():
+...         ts = lineage.get_timeseries(obs)
+>>> print(profiler.summary())
+>>> profiler.export_text(parser)
+
+Stages may be nested (e.g. 'local_rate' is timed within 'observable'): the
+'seconds' column reports inclusive times, 'self_seconds' excludes time
+spent in nested stages.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+from tuna.io import text
+
+# stages recorded within tuna
+STAGES = ('read',  # reading container data
+          'build',  # building cells, filiation, trees
+          'prefilter',  # filtering cells before trees are built
+          'decompose',  # decomposing trees onto lineages
+          'observable',  # building timeseries of lineages
+          'local_rate',  # local fits (within 'observable')
+          'conditions',  # evaluating conditions (within 'observable')
+          'accumulate',  # updating statistics from timeseries
+          'interpolate',  # evaluating timeseries (within 'accumulate')
+          )
+
+COLUMNS = ['calls', 'seconds', 'self_seconds', 'bytes']
+
+# stack of active profilers; the last one records stages
+_ACTIVE = []
+
+
+class _NullStage(object):
+    "Context manager that does nothing"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullStage()
+
+
+def _resident_bytes():
+    """Resident memory of current process, in bytes (None if unavailable)
+
+    Read from /proc/self/statm (Linux), otherwise the peak resident size
+    given by resource.getrusage is used.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak  # bytes
+    return peak * 1024  # kilobytes
+
+
+def stage(name):
+    """Context manager recording stage name in active profiler, if any
+
+    Parameters
+    ----------
+    name : str
+        stage name
+
+    Examples
+    --------
+    >>> with stage('read'):
+    ...     arr = text.get_array(fname, datatype)
+    """
+    if not _ACTIVE:
+        return _NULL
+    return _Stage(_ACTIVE[-1], name)
+
+
+def using(profiler):
+    """Context manager activating profiler (no-op when profiler is None)"""
+    if profiler is None:
+        return _NULL
+    return profiler
+
+
+class _Stage(object):
+    "Timed section, recorded in profiler on exit"
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.child_time = 0.
+        return
+
+    def __enter__(self):
+        profiler = self.profiler
+        profiler._open.append(self)
+        if profiler._memory:
+            self.start_bytes = profiler._get_bytes()
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = timeit.default_timer() - self.start
+        profiler = self.profiler
+        if profiler._memory:
+            allocated = profiler._get_bytes() - self.start_bytes
+        else:
+            allocated = 0
+        profiler._open.pop()
+        if profiler._open:
+            profiler._open[-1].child_time += elapsed
+        profiler._add(self.name, elapsed, elapsed - self.child_time,
+                      allocated)
+        return False
+
+
+class Profiler(object):
+    """Collects wall time, number of calls, and allocated bytes per stage
+
+    Parameters
+    ----------
+    memory : bool (default False)
+        whether to record memory allocated in each stage; tracing slows
+        down computations
+
+    Attributes
+    ----------
+    memory_source : str, or None
+        'tracemalloc' (python 3), 'resident' (python 2 fallback), or None
+        when memory is not recorded
+
+    Notes
+    -----
+    With tracemalloc, allocated bytes are the net increase of memory traced
+    during each stage (memory released within a stage is not counted).
+
+    Without tracemalloc (python 2), bytes are the change of resident memory
+    of the process (see :func:`_resident_bytes`), which is only approximate:
+    it has page granularity, includes memory kept by the allocator and
+    by other threads, and, where /proc is not available, only increases of
+    the peak resident size are seen.
+    """
+
+    def __init__(self, memory=False):
+        self.memory_source = None
+        if memory:
+            if tracemalloc is not None:
+                self.memory_source = 'tracemalloc'
+            elif _resident_bytes() is not None:
+                self.memory_source = 'resident'
+            else:
+                warnings.warn('Memory cannot be recorded: requires '
+                              'tracemalloc (python 3), /proc or resource')
+                memory = False
+        self.memory = memory
+        self._memory = False  # whether tracing is on
+        self._records = {}
+        self._order = []
+        self._open = []
+        self._depth = 0
+        self._started_tracing = False
+        return
+
+    def __enter__(self):
+        if self._depth == 0:
+            _ACTIVE.append(self)
+            if self.memory_source == 'tracemalloc':
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+            self._memory = self.memory
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            _ACTIVE.remove(self)
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+            self._memory = False
+        return False
+
+    def stage(self, name):
+        """Context manager recording stage name in this profiler"""
+        return _Stage(self, name)
+
+    def _get_bytes(self):
+        if self.memory_source == 'tracemalloc':
+            return tracemalloc.get_traced_memory()[0]
+        return _resident_bytes()
+
+    def _add(self, name, elapsed, self_elapsed, allocated):
+        if name not in self._records:
+            self._order.append(name)
+            self._records[name] = [0, 0., 0., 0]
+        record = self._records[name]
+        record[0] += 1
+        record[1] += elapsed
+        record[2] += self_elapsed
+        record[3] += allocated
+        return
+
+    def reset(self):
+        """Forget recorded stages"""
+        self._records = {}
+        self._order = []
+        return
+
+    def summary(self):
+        """Table of recorded stages
+
+        Returns
+        -------
+        pandas.DataFrame
+            indexed by stage name (in order of first completion), with columns
+            'calls', 'seconds' (inclusive), 'self_seconds' (exclusive of
+            nested stages), 'bytes' (NaN when memory is not traced)
+        """
+        rows = [self._records[name] for name in self._order]
+        df = pd.DataFrame(rows, columns=COLUMNS,
+                          index=pd.Index(self._order, name='stage'))
+        df['calls'] = df['calls'].astype(int)
+        if not self.memory:
+            df['bytes'] = np.nan
+        return df
+
+    def export_text(self, exp, analysis_folder=None, basename='profile.tsv'):
+        """Write summary table in analysis folder
+
+        Parameters
+        ----------
+        exp : :class:`Experiment` or :class:`Parser` instance
+        analysis_folder : str (default None)
+            user defined analysis folder, see
+            :func:`tuna.io.text.get_analysis_path`
+        basename : str
+
+        Returns
+        -------
+        fname : str
+            absolute path to written file
+        """
+        exp = getattr(exp, 'experiment', exp)
+        path = text.get_analysis_path(exp, user_abspath=analysis_folder,
+                                      write=True)
+        fname = os.path.join(path, basename)
+        self.summary().to_csv(fname, sep='\t')
+        return fname
@@ -114,10 +114,21 @@ class DivisionParams(object):
                         ('minimum', minimum)]
         return
 
-    def rv(self):
+    def rv(self, size=None, rng=None):
+        """Random cell cycle duration(s)
+
+        Parameters
+        ----------
+        size : int (default None)
+            number of values to draw, None for a single float
+        rng : numpy.random.RandomState instance (default None)
+            random stream to draw from, None for global numpy state
+        """
+        if rng is None:
+            rng = np.random
         theta = self.std**2 / (self.mean - self.minimum)
         k = (self.std / theta)**2 + 1.
-        val = self.minimum + np.random.gamma(k, scale=theta)
+        val = self.minimum + rng.gamma(k, scale=theta, size=size)
         return val
 
     def __str__(self):
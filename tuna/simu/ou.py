@@ -8,18 +8,31 @@ from __future__ import print_function
 
 import numpy as np
 import pandas as pd
+from scipy.signal import lfilter
 
+import os
 import datetime
 import uuid
+import multiprocessing
 
-from tuna.base.experiment import Experiment
-from tuna.base.container import Container
+from tuna.base.experiment import Experiment, imap_bounded
+from tuna.base.container import Container, get_text_format
 #from tuna.base.metadata import Metadata
 from tuna.base.colony import Colony
+from tuna.io import text
 
 from tuna.simu.main import Ecoli, SimuParams, DivisionParams
 
 
+# columns of simulated data
+SIMU_DATATYPE = [('time', 'f8'),
+                 ('ou', 'f8'),
+                 ('ou_int', 'f8'),
+                 ('exp_ou_int', 'f8'),
+                 ('cellID', 'u4'),
+                 ('parentID', 'u4')]
+
+
 class OUSimulation(Experiment):
     """Equivalent of Experiment class for simulation.
 
@@ -37,10 +50,22 @@ class OUSimulation(Experiment):
         sets the division timing process
     ouParams : OUParams instance
         set the parameters for the Ornstein Uhlenbeck process
+    batched : bool (default True)
+        whether containers are simulated generation by generation (see
+        :func:`ou_generations`), or recursively cell by cell (see
+        :func:`ou_tree`)
+    seed : int (default None)
+        master seed; each container gets an independent random stream
+        derived from it and from its index (see
+        :func:`container_random_state`), so that a given seed yields the
+        same containers whatever the order or the number of processes used.
+        When None, a seed is drawn from the global numpy random state (and
+        stored in .seed), so that np.random.seed controls simulations
     """
 
     def __init__(self, label=None,
-                 simuParams=None, divisionParams=None, ouParams=None):
+                 simuParams=None, divisionParams=None, ouParams=None,
+                 batched=True, seed=None):
         today = datetime.datetime.today()
         self.date = today
         if simuParams is None:
@@ -58,12 +83,11 @@ class OUSimulation(Experiment):
             self._label = label
         self.abspath = '{}'.format(hex(id(self)))  # Experiment compatibility
         self.filetype = 'simu'
-        self.datatype = [('time', 'f8'),
-                         ('ou', 'f8'),
-                         ('ou_int', 'f8'),
-                         ('exp_ou_int', 'f8'),
-                         ('cellID', 'u2'),
-                         ('parentID', 'u2')]
+        self.datatype = SIMU_DATATYPE[:]
+        self.batched = batched
+        if seed is None:
+            seed = np.random.randint(2**31)
+        self.seed = seed
 
         self.containers = []  # there are no file
         self.simuParams = simuParams
@@ -79,6 +103,7 @@ class OUSimulation(Experiment):
         content = []
         content += [('label', self.label)]
         content += [('date', self.date.strftime('%Y-%m-%d'))]
+        content += [('seed', self.seed)]
 
         content += self.simuParams.content
         content += self.divisionParams.content
@@ -111,18 +136,86 @@ class OUSimulation(Experiment):
                )
         return msg
 
+    def get_random_state(self, index):
+        """Random stream of container with given index"""
+        return container_random_state(self.seed, index)
+
     def iter_container(self, size=None,
                        read=True, build=True,  # useless options
                        prefilt=None,  # only used for compatibility
                        extend_observables=True,  # idem
                        report_NaNs=True,  # idem
-                       shuffle=False):  # idem
+                       shuffle=False,  # idem
+                       labels=None,  # idem
+                       processes=1):
+        """Iterate over simulated containers
+
+        Parameters
+        ----------
+        size : int (default None)
+            number of containers, None for simuParams.nbr_container
+        processes : int (default 1)
+            when larger than 1, containers are simulated concurrently in a
+            pool of processes (batched simulation only), and yielded in
+            order; data does not depend on the number of processes
+
+        Yields
+        ------
+        :class:`OUContainer` instances
+        """
         if size is None:
             size = self.simuParams.nbr_container
+        kwargs = dict(simuParams=self.simuParams,
+                      divisionParams=self.divisionParams,
+                      ouParams=self.ouParams,
+                      batched=self.batched)
+        if processes > 1:
+            for arrays in self.iter_arrays(size=size, processes=processes):
+                yield OUContainer(self, arrays=arrays, **kwargs)
+            return
         for index in range(size):
-            yield OUContainer(self, simuParams=self.simuParams,
-                              divisionParams=self.divisionParams,
-                              ouParams=self.ouParams)
+            yield OUContainer(self, rng=self.get_random_state(index),
+                              **kwargs)
+        return
+
+    def iter_arrays(self, size=None, processes=1):
+        """Iterate over data and genealogy arrays of simulated containers
+
+        No :class:`OUContainer`, :class:`Colony` or :class:`Ecoli` instance
+        is created (batched simulation only).
+
+        Parameters
+        ----------
+        size : int (default None)
+            number of containers, None for simuParams.nbr_container
+        processes : int (default 1)
+            number of processes in which containers are simulated; arrays
+            are yielded in container order, and at most one container per
+            process is simulated ahead of the consumer (see
+            :func:`imap_bounded`)
+
+        Yields
+        ------
+        (data, genealogy) couples, see :func:`ou_generations`
+        """
+        if not self.batched:
+            raise ValueError('Array simulation must be batched')
+        if size is None:
+            size = self.simuParams.nbr_container
+        args = [(self.ouParams, self.divisionParams, self.simuParams,
+                 self.datatype, self.seed, index) for index in range(size)]
+        if processes > 1:
+            pool = multiprocessing.Pool(processes)
+            try:
+                for arrays in imap_bounded(pool, _simulate_arrays, args,
+                                           processes):
+                    yield arrays
+            finally:
+                pool.terminate()
+                pool.join()
+            return
+        for item in args:
+            yield _simulate_arrays(item)
         return
 
 
@@ -130,25 +223,46 @@ class OUContainer(Container):
     "subclassed from Container to get all methods, only __init__ changes"
 
     def __init__(self, simu, label=None, simuParams=None,
-                 divisionParams=None, ouParams=None):
+                 divisionParams=None, ouParams=None, batched=True,
+                 rng=None, arrays=None):
         """Runs the simulation upon call.
 
         Argument
         --------
         sample -- int, number of colonies simulated in the container
+        batched -- bool, whether to simulate generation by generation; in
+            this case, data is stored in .data and .genealogy arrays, and
+            Colony/Ecoli instances are built when .trees or .cells are
+            accessed
+        rng -- numpy.random.RandomState instance, random stream of this
+            container (default None: global numpy state)
+        arrays -- couple (data, genealogy) of an already simulated batched
+            container (default None)
         """
         self.exp = simu  # Container compatibility
         self.abspath = '{}'.format(hex(id(self)))  # Container compatibility
         self.filetype = 'simulations'
         self.datatype = simu.datatype
         self.metadata = simu.metadata
+        self.period = simuParams.interval
+        self._reset_condition_masks()
 
         if label is not None:
             self.label = label
         else:
             self.label = str(uuid.uuid1())[:8]
-        self.cells = []
-        self.trees = []
+        self._cells = None
+        self._trees = None
+        self.data = None
+        self.genealogy = None
+        if arrays is not None:
+            self.data, self.genealogy = arrays
+            return
+        if batched:
+            arrays = simulate_arrays(ouParams, divisionParams, simuParams,
+                                     datatype=self.datatype, rng=rng)
+            self.data, self.genealogy = arrays
+            return
         nodes = []
         trees = []
         count = 0
@@ -157,7 +271,8 @@ class OUContainer(Container):
                                     divisionParams, count=count+1,
                                     tstart=simuParams.start,
                                     tstop=simuParams.stop,
-                                    dt=simuParams.interval)
+                                    dt=simuParams.interval,
+                                    rng=rng)
             colony.container = self
             trees.append(colony)
             for node in colony.all_nodes():
@@ -166,6 +281,45 @@ class OUContainer(Container):
         self.cells = nodes
         return
 
+    def _build_colonies(self):
+        "Build Colony and Ecoli instances from simulated arrays"
+        self._trees, self._cells = build_colonies(self.data, self.genealogy,
+                                                  container=self)
+        return
+
+    @property
+    def trees(self):
+        if self._trees is None and self.genealogy is not None:
+            self._build_colonies()
+        return self._trees
+
+    @trees.setter
+    def trees(self, value):
+        self._trees = value
+
+    @property
+    def cells(self):
+        if self._cells is None and self.genealogy is not None:
+            self._build_colonies()
+        return self._cells
+
+    @cells.setter
+    def cells(self, value):
+        self._cells = value
+
+    def write_raw_text(self, path='.'):
+        """Write data to text files.
+
+        Simulated array is written directly when colonies have not been
+        built.
+        """
+        if self._cells is None and self.data is not None:
+            fn = os.path.join(path, self.label + '.txt')
+            text.write_array(fn, self.data, get_text_format(self.datatype),
+                             delimiter='\t')
+            return
+        return Container.write_raw_text(self, path=path)
+
 
 class OUParams(object):
     """Class to store Ornstein-Uhlenbeck parameters.
@@ -198,7 +352,7 @@ class OUsteps(object):
     Parameters
     ----------
     params -- set of parameters for OU process, stored in OUParams instance
-    dt -- float, time interval for update.
+    dt -- float, or array of floats, time interval for update.
     
     Attributes
     ----------
@@ -206,6 +360,13 @@ class OUsteps(object):
     sigma : float
     sigma_y : float
     kappa : float
+    sigma_cond : float
+        standard deviation of Y update, conditioned on X update
+
+    Notes
+    -----
+    For very small dt, variances computed with the formulas below may get
+    slightly negative through round-off errors; they are set to 0.
 
     See also
     --------
@@ -220,14 +381,17 @@ class OUsteps(object):
         self.mu = mu
         sx2 = c/(2. * k) * (1. - np.exp(- 2. * k * dt))
         sy2 = c/(k**3) * (k * dt - 2. * (1.-mu) + 0.5 * (1.-mu**2))
+        sy2 = np.maximum(sy2, 0.)
         kappa = c * (1.-mu)**2 / (2. * k**2)
         self.sigma = np.sqrt(sx2)
         self.sigma_y = np.sqrt(sy2)
         self.kappa = kappa
+        self.sigma_cond = np.sqrt(np.maximum(self.sigma_y**2 -
+                                             kappa**2/self.sigma**2, 0.))
         return
 
 
-def ou_track(params, dt=1., steps=10, start=0., y_start=1.):
+def ou_track(params, dt=1., steps=10, start=0., y_start=1., rng=None):
     """Sample OU process X(t) and its integral Y(t).
 
     Beware that X(t) is the zero mean Ornstein-Uhlenbeck process.
@@ -243,6 +407,8 @@ def ou_track(params, dt=1., steps=10, start=0., y_start=1.):
         value of OU process at initial step (step 0)
     y_start : float
         value of integrated OU process at initial step (step 0)
+    rng : numpy.random.RandomState instance (default None)
+        random stream to draw from, None for global numpy state
 
     Returns
     -------
@@ -279,7 +445,9 @@ def ou_track(params, dt=1., steps=10, start=0., y_start=1.):
     xs = np.zeros(steps+1, dtype='f8')
     ys = np.zeros(steps+1, dtype='f8')
 
-    ns = np.random.normal(0., 1., size=(steps, 2))
+    if rng is None:
+        rng = np.random
+    ns = rng.normal(0., 1., size=(steps, 2))
     xs[0] = start
     ys[0] = y_start
 
@@ -289,19 +457,23 @@ def ou_track(params, dt=1., steps=10, start=0., y_start=1.):
     mu = ou.mu
 
     sigma_x = ou.sigma
-    sigma_y = ou.sigma_y
+    sigma_cond = ou.sigma_cond
     kappa = ou.kappa
 
-    for i, (n1, n2) in enumerate(ns, start=1):
-        # Gillespie update
-        xs[i] = xs[i-1] * mu + sigma_x * n1
-        ys[i] = ys[i-1] + (xs[i-1] * (1.-mu)/k +
-                           np.sqrt((sigma_y)**2 - (kappa**2/sigma_x**2)) * n2 +
-                           kappa/sigma_x * n1)
+    n1 = ns[:, 0]
+    n2 = ns[:, 1]
+    # Gillespie update, X: linear recursion xs[i] = mu * xs[i-1] + noise,
+    # initial condition set through filter state
+    xs[1:] = lfilter([1.], [1., -mu], sigma_x * n1, zi=[mu * start])[0]
+    # Y: cumulative sum of increments (sequential, as step by step update)
+    ys[1:] = (xs[:-1] * (1.-mu)/k +
+              sigma_cond * n2 +
+              kappa/sigma_x * n1)
+    ys = np.cumsum(ys)
     return xs, ys
 
 
-def root_cell(ouparams, divparams, identifier=None, tstart=0.):
+def root_cell(ouparams, divparams, identifier=None, tstart=0., rng=None):
     """Set state for root cell, that initialize a sample.
 
     Parameters
@@ -310,9 +482,13 @@ def root_cell(ouparams, divparams, identifier=None, tstart=0.):
         store OU parameters: target, spring, noise
     divparams : DivisionParams instance
         store information to generate random cell cycle duration
+    rng : numpy.random.RandomState instance (default None)
+        random stream to draw from, None for global numpy state
     """
-    age_root = np.random.uniform()
-    lifetime_root = divparams.rv()
+    if rng is None:
+        rng = np.random
+    age_root = rng.uniform()
+    lifetime_root = divparams.rv(rng=rng)
     birth_root = tstart - age_root * lifetime_root
 
     root = Ecoli(identifier=identifier, parent=None,
@@ -321,14 +497,15 @@ def root_cell(ouparams, divparams, identifier=None, tstart=0.):
     # start with OU equilibrium sample
     equilibrium_mean = ouparams.target
     equilibrium_std = np.sqrt(ouparams.noise / (2. * ouparams.spring))
-    root.birth_value = (np.random.normal(loc=equilibrium_mean,
-                                        scale=equilibrium_std),
+    root.birth_value = (rng.normal(loc=equilibrium_mean,
+                                   scale=equilibrium_std),
                         np.log(1.))
 
     return root
 
 
-def ou_tree(ouparams, divparams, count=None, tstart=0., tstop=300., dt=5.):
+def ou_tree(ouparams, divparams, count=None, tstart=0., tstop=300., dt=5.,
+            rng=None):
     """Generates recursively OU process on dividing cells.
 
     Arguments
@@ -342,6 +519,8 @@ def ou_tree(ouparams, divparams, count=None, tstart=0., tstop=300., dt=5.):
     tstart -- float, time at which simulation starts
     tstop -- float, time at which simulation stops
     dt -- float, time interval at which value of OU process are recorded
+    rng -- numpy.random.RandomState instance, random stream (default None:
+        global numpy state)
 
     Returns
     -------
@@ -352,12 +531,14 @@ def ou_tree(ouparams, divparams, count=None, tstart=0., tstop=300., dt=5.):
         rootid = str(count)  # labeling by integers (exported as strings)
     else:
         rootid = None  # automatic labeling
-    root = root_cell(ouparams, divparams, identifier=rootid, tstart=tstart)
+    root = root_cell(ouparams, divparams, identifier=rootid, tstart=tstart,
+                     rng=rng)
     tree = Colony()
     tree.add_node(root)
     count = add_recursive_branch(root, tree, count=count,
                                  tstart=tstart, tstop=tstop, dt=dt,
-                                 ouparams=ouparams, divparams=divparams)
+                                 ouparams=ouparams, divparams=divparams,
+                                 rng=rng)
 
     return tree, count
 
@@ -365,7 +546,8 @@ def ou_tree(ouparams, divparams, count=None, tstart=0., tstop=300., dt=5.):
 def add_recursive_branch(ecoli, tree, count=None,
                          tstart=0., tstop=300., dt=5.,
                          ouparams=OUParams(),
-                         divparams=DivisionParams()):
+                         divparams=DivisionParams(),
+                         rng=None):
     """Main function for generating the tree and simulated process.
     """
     x_start, y_start = ecoli.birth_value
@@ -382,7 +564,7 @@ def add_recursive_branch(ecoli, tree, count=None,
             return identifier
     else:
         ecoli.tag = ecoli.identifier
-        idtype = 'u2'
+        idtype = 'u4'
 
         # in this case, identifier is a string made from integer
         def store_id(identifier):
@@ -411,14 +593,16 @@ def add_recursive_branch(ecoli, tree, count=None,
                             dt=rec_times[0]-t_birth,
                             steps=1,
                             start=x_start-ouparams.target,
-                            y_start=y_start)
+                            y_start=y_start,
+                            rng=rng)
         first_x = xs[-1]
         first_y = ys[-1]
         # record values
         (xs, ys) = ou_track(ouparams,
                             dt=dt, steps=len(rec_times) - 1,
                             start=first_x,
-                            y_start=first_y)
+                            y_start=first_y,
+                            rng=rng)
         x_rec_values = xs + ouparams.target
         y_rec_values = ys + ouparams.target * (rec_times - t_birth)
         length_like_values = np.exp(y_rec_values)
@@ -460,14 +644,15 @@ def add_recursive_branch(ecoli, tree, count=None,
                         dt=last_dt,
                         steps=1,
                         start=last_x,
-                        y_start=last_y)
+                        y_start=last_y,
+                        rng=rng)
     ecoli.division_value = (xs[-1] + ouparams.target,
                             ys[-1] + ouparams.target * (t_div - t_birth))
 
     # create two daughter cells if time has not reached tmax
     if t_div < tstop:
         for i in range(2):
-            lt = divparams.rv()
+            lt = divparams.rv(rng=rng)
             if count is not None:
                 count += 1
                 newid = str(count)
@@ -481,6 +666,285 @@ def add_recursive_branch(ecoli, tree, count=None,
             count = add_recursive_branch(necoli, tree, count=count,
                                          tstart=tstart, tstop=tstop, dt=dt,
                                          ouparams=ouparams,
-                                         divparams=divparams)
+                                         divparams=divparams,
+                                         rng=rng)
 
     return count  # this is the last taken integer + 1
+
+
+# %% GENERATION-BATCHED SIMULATION
+
+# one row per simulated cell (genealogy), used to build Ecoli on demand;
+# start and stop are row bounds of cell data in container-level array
+GENEALOGY_DTYPE = [('cellID', 'u4'),
+                   ('parentID', 'u4'),
+                   ('birth_time', 'f8'),
+                   ('division_time', 'f8'),
+                   ('birth_ou', 'f8'),
+                   ('birth_ou_int', 'f8'),
+                   ('division_ou', 'f8'),
+                   ('division_ou_int', 'f8'),
+                   ('start', 'i8'),
+                   ('stop', 'i8')]
+
+
+def _recording_counts(births, divisions, tstart, tstop, dt):
+    """First recording times and number of recordings in each cell cycle
+
+    Recording times of a cell are np.arange(first, min(division, tstop), dt)
+    """
+    first = tstart + (np.floor((births - tstart)/dt) + 1.) * dt
+    first = np.maximum(tstart, first)  # selection for root cells
+    stop = np.minimum(divisions, tstop)
+    counts = np.ceil((stop - first)/dt)
+    counts = np.where(counts > 0, counts, 0).astype(int)
+    return first, counts
+
+
+def ou_generations(ouparams, divparams, nbr_colony=1, count=0,
+                   tstart=0., tstop=300., dt=5.,
+                   datatype=None, rng=None):
+    """Generates OU process on dividing cells, one generation at a time.
+
+    All colonies are grown breadth-first: lifetimes of every cell of a given
+    generation are drawn at once, then OU values are computed for all cells
+    of a generation with array operations. Values are written in a single,
+    preallocated, container-level structured array.
+
+    Parameters
+    ----------
+    ouparams : OUParams instance
+    divparams : DivisionParams instance
+    nbr_colony : int
+        number of colonies (root cells)
+    count : int
+        last cell label used; cells are labelled count+1, count+2, ...
+        (breadth-first)
+    tstart : float
+        time at which simulation starts
+    tstop : float
+        time at which simulation stops
+    dt : float
+        time interval at which value of OU process are recorded
+    datatype : list of couples (default None)
+        dtype of container-level array, with columns 'time', 'ou', 'ou_int',
+        'exp_ou_int', 'cellID', 'parentID' (default: OUSimulation datatype)
+    rng : numpy.random.RandomState instance (default None)
+        random stream to draw from, None for global numpy state
+
+    Returns
+    -------
+    data : numpy structured array
+        recorded values, cell by cell (breadth-first), time ordered
+    genealogy : numpy structured array
+        one row per cell, see GENEALOGY_DTYPE
+    count : int
+        last cell label used
+
+    Notes
+    -----
+    Distribution is identical to :func:`ou_tree`, but random numbers are
+    drawn in a different order, and cells are labelled breadth-first.
+    """
+    if datatype is None:
+        datatype = SIMU_DATATYPE
+    if rng is None:
+        rng = np.random
+    # genealogy: lifetimes do not depend on OU process
+    ages = rng.uniform(size=nbr_colony)
+    lifetimes = divparams.rv(size=nbr_colony, rng=rng)
+    births = [tstart - ages * lifetimes]
+    divisions = [births[0] + lifetimes]
+    parents = [-np.ones(nbr_colony, dtype=int)]  # position of parent cell
+    offset = 0
+    while True:
+        dividing = np.flatnonzero(divisions[-1] < tstop) + offset
+        offset += len(divisions[-1])
+        if len(dividing) == 0:
+            break
+        parent = np.repeat(dividing, 2)  # two daughter cells
+        birth = np.concatenate(divisions)[parent]
+        parents.append(parent)
+        births.append(birth)
+        divisions.append(birth + divparams.rv(size=len(parent), rng=rng))
+    sizes = [len(item) for item in parents]
+    bounds = np.concatenate([[0], np.cumsum(sizes)])  # generation bounds
+    parents = np.concatenate(parents)
+    births = np.concatenate(births)
+    divisions = np.concatenate(divisions)
+    ncells = len(births)
+
+    genealogy = np.zeros(ncells, dtype=GENEALOGY_DTYPE)
+    genealogy['cellID'] = np.arange(count + 1, count + 1 + ncells)
+    has_parent = parents >= 0
+    genealogy['parentID'][has_parent] = genealogy['cellID'][parents[has_parent]]
+    genealogy['birth_time'] = births
+    genealogy['division_time'] = divisions
+
+    first, counts = _recording_counts(births, divisions, tstart, tstop, dt)
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    genealogy['start'] = starts
+    genealogy['stop'] = stops
+
+    # preallocated container array
+    data = np.zeros(stops[-1] if ncells else 0, dtype=datatype)
+    data['cellID'] = np.repeat(genealogy['cellID'], counts)
+    data['parentID'] = np.repeat(genealogy['parentID'], counts)
+
+    k = ouparams.spring
+    target = ouparams.target
+    # root cells start with OU equilibrium sample
+    roots = slice(bounds[0], bounds[1])
+    equilibrium_std = np.sqrt(ouparams.noise / (2. * ouparams.spring))
+    genealogy['birth_ou'][roots] = rng.normal(loc=target,
+                                              scale=equilibrium_std,
+                                              size=bounds[1])
+    genealogy['birth_ou_int'][roots] = np.log(1.)
+
+    for gen_start, gen_stop in zip(bounds[:-1], bounds[1:]):
+        cells = np.arange(gen_start, gen_stop)
+        if gen_start > 0:
+            # symmetric division
+            pars = parents[cells]
+            genealogy['birth_ou'][cells] = genealogy['division_ou'][pars]
+            genealogy['birth_ou_int'][cells] = (
+                genealogy['division_ou_int'][pars] - np.log(2.))
+        n_rec = counts[cells]
+        t_birth = births[cells]
+        t_div = divisions[cells]
+        t_first = first[cells]
+        t_last = t_first + (n_rec - 1) * dt
+        # time steps: birth to first recording, recording interval,
+        # last recording to division (birth to division without recording)
+        nsteps = n_rec + 1
+        steps = np.ones((len(cells), np.amax(nsteps))) * dt
+        steps[:, 0] = np.where(n_rec > 0, t_first - t_birth, t_div - t_birth)
+        last = n_rec > 0
+        steps[last, n_rec[last]] = t_div[last] - t_last[last]
+        ou = OUsteps(ouparams, dt=steps)
+        mu = ou.mu
+        sigma_x = ou.sigma
+        drift = (1. - mu)/k
+        sigma_y = ou.sigma_cond
+        cross = ou.kappa/sigma_x
+        ns = rng.normal(0., 1., size=steps.shape + (2, ))
+
+        xs = genealogy['birth_ou'][cells] - target
+        ys = genealogy['birth_ou_int'][cells].copy()
+        for step in range(steps.shape[1]):
+            n1 = ns[:, step, 0]
+            n2 = ns[:, step, 1]
+            new_xs = mu[:, step] * xs + sigma_x[:, step] * n1
+            new_ys = ys + (xs * drift[:, step] + sigma_y[:, step] * n2 +
+                           cross[:, step] * n1)
+            active = step < nsteps
+            xs = np.where(active, new_xs, xs)
+            ys = np.where(active, new_ys, ys)
+            # record values
+            rec = step < n_rec
+            rows = starts[cells[rec]] + step
+            times = t_first[rec] + step * dt
+            data['time'][rows] = times
+            data['ou'][rows] = xs[rec] + target
+            data['ou_int'][rows] = ys[rec] + target * (times - t_birth[rec])
+        genealogy['division_ou'][cells] = xs + target
+        genealogy['division_ou_int'][cells] = ys + target * (t_div - t_birth)
+    data['exp_ou_int'] = np.exp(data['ou_int'])
+    return data, genealogy, count + ncells
+
+
+def build_colonies(data, genealogy, container=None):
+    """Build Colony and Ecoli instances from generation-batched simulation
+
+    Parameters
+    ----------
+    data : numpy structured array
+        container-level array of recorded values
+    genealogy : numpy structured array
+        one row per cell, parents before daughters (see GENEALOGY_DTYPE)
+    container : OUContainer instance (default None)
+
+    Returns
+    -------
+    trees : list of Colony instances
+    cells : list of Ecoli instances
+    """
+    trees = []
+    cells = []
+    tree_of = {}
+    ecoli_of = {}
+    for row in genealogy:
+        cid = str(row['cellID'])
+        pid = str(row['parentID'])
+        parent = ecoli_of.get(pid, None) if row['parentID'] > 0 else None
+        lifetime = row['division_time'] - row['birth_time']
+        ecoli = Ecoli(identifier=cid, parent=parent,
+                      birth_time=row['birth_time'], lifetime=lifetime)
+        ecoli.container = container
+        ecoli.birth_time = row['birth_time']
+        ecoli.division_time = row['division_time']
+        ecoli.tag = cid
+        ecoli.birth_value = (row['birth_ou'], row['birth_ou_int'])
+        ecoli.division_value = (row['division_ou'], row['division_ou_int'])
+        ecoli.data = data[row['start']:row['stop']]
+        ecoli.rec_times = ecoli.data['time']
+        if parent is None:
+            tree = Colony(container=container)
+            tree.add_node(ecoli)
+            trees.append(tree)
+        else:
+            parent.childs = ecoli
+            tree = tree_of[pid]
+            tree.add_node(ecoli, parent=pid)
+        tree_of[cid] = tree
+        ecoli_of[cid] = ecoli
+        cells.append(ecoli)
+    return trees, cells
+
+
+def container_random_state(seed, index):
+    """Independent random stream for container index, derived from seed
+
+    Parameters
+    ----------
+    seed : int
+        master seed (non negative)
+    index : int
+        container index
+
+    Returns
+    -------
+    numpy.random.RandomState instance
+        seeded with the 32-bit words of seed, their number, and index
+    """
+    words = []
+    seed = int(seed)
+    while True:
+        words.append(seed & 0xffffffff)
+        seed >>= 32
+        if seed == 0:
+            break
+    return np.random.RandomState(words + [len(words), index])
+
+
+def simulate_arrays(ouparams, divparams, simuparams, datatype=None, rng=None):
+    """Data and genealogy arrays of one batched simulated container"""
+    data, genealogy, _ = ou_generations(
+        ouparams, divparams,
+        nbr_colony=simuparams.nbr_colony_per_container,
+        count=0,
+        tstart=simuparams.start,
+        tstop=simuparams.stop,
+        dt=simuparams.interval,
+        datatype=datatype,
+        rng=rng)
+    return data, genealogy
+
+
+def _simulate_arrays(args):
+    "Worker function for simulations in a process pool"
+    ouparams, divparams, simuparams, datatype, seed, index = args
+    return simulate_arrays(ouparams, divparams, simuparams,
+                           datatype=datatype,
+                           rng=container_random_state(seed, index))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+simu/writer.py module
+~~~~~~~~~~~~~~~~~~~~~
+
+Streaming export of simulations to disk.
+
+Containers are simulated one after the other (or in a pool of processes),
+and their data array is written directly to disk: no :class:`OUContainer`,
+:class:`Colony` nor :class:`Ecoli` instance is created, and only one
+container is held in memory at a time (in a pool, one per worker process,
+plus the one being written).
+
+Output is an experiment folder, with 'descriptor.csv' and 'metadata.csv'
+files, and container data in one of the following formats:
+
+    * 'text': tab separated values, one file per container in containers/
+    * 'npy': binary Numpy files, one file per container in containers/
+    * 'h5': a single HDF5 file, one table per container under /lineages,
+      with the layout, compression and indexing of
+      :meth:`Experiment.h5_export`
+
+'text' and 'npy' experiment folders can be loaded with
+:class:`Experiment` / :class:`Parser`.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import warnings
+
+import numpy as np
+import tables
+
+from tuna.base.container import get_text_format
+from tuna.base.experiment import H5_COMPLIBS, _write_h5_table
+from tuna.io import text, binary
+from tuna.simu.main import SimuParams, DivisionParams
+from tuna.simu.ou import OUParams, OUSimulation
+
+FORMATS = ('text', 'npy', 'h5')
+
+
+def container_labels(size):
+    """Labels of simulated containers, padded to sort as they are simulated
+    """
+    width = len(str(size))
+    return ['container_{:0{}d}'.format(index, width)
+            for index in range(1, size + 1)]
+
+
+def write_simulation(simu, path='.', fmt='text', size=None, processes=1,
+                     complib='blosc', complevel=5):
+    """Simulate and write containers, one at a time
+
+    Parameters
+    ----------
+    simu : :class:`OUSimulation` instance
+        batched simulation
+    path : str
+        parent directory of experiment folder (named after simu.label)
+    fmt : str {'text', 'npy', 'h5'}
+        format of container data
+    size : int (default None)
+        number of containers, None for simu.simuParams.nbr_container
+    processes : int (default 1)
+        number of processes in which containers are simulated
+    complib : str {'blosc', 'zlib'}
+        compression library of 'h5' format
+    complevel : int (default 5)
+        compression level of 'h5' format, 0 for none
+
+    Returns
+    -------
+    exp_path : str
+        absolute path to experiment folder
+    """
+    if fmt not in FORMATS:
+        raise ValueError('fmt must be one of {}'.format(FORMATS))
+    if complib not in H5_COMPLIBS:
+        raise ValueError('complib must be one of {}'.format(H5_COMPLIBS))
+    if size is None:
+        size = simu.simuParams.nbr_container
+    abspath = os.path.abspath(os.path.expanduser(path))
+    exp_path = os.path.join(abspath, simu.label)
+    if not os.path.exists(exp_path):
+        os.makedirs(exp_path)
+    simu.metadata.to_csv(os.path.join(exp_path, 'metadata.csv'), index=False)
+    text.write_descriptor(os.path.join(exp_path, 'descriptor.csv'),
+                          simu.datatype)
+    labels = container_labels(size)
+    arrays = simu.iter_arrays(size=size, processes=processes)
+    if fmt == 'h5':
+        filters = tables.Filters(complevel=complevel, complib=complib,
+                                 shuffle=True)
+        _write_h5(simu, exp_path, labels, arrays, filters)
+        return exp_path
+    data_path = os.path.join(exp_path, 'containers')
+    if os.path.exists(data_path):
+        msg = ("Container files already exists.\n"
+               "They will be erased before proceeding.")
+        warnings.warn(msg)
+        shutil.rmtree(data_path)
+    os.makedirs(data_path)
+    text_fmt = get_text_format(simu.datatype)
+    for label, (data, genealogy) in zip(labels, arrays):
+        if fmt == 'text':
+            fn = os.path.join(data_path, label + '.txt')
+            text.write_array(fn, data, text_fmt, delimiter='\t')
+        else:
+            binary.save_array(os.path.join(data_path, label + '.npy'), data)
+    return exp_path
+
+
+def _write_h5(simu, exp_path, labels, arrays, filters):
+    "Write container arrays as tables of a single HDF5 file"
+    fn = os.path.join(exp_path, simu.label + '.h5')
+    h5file = tables.open_file(fn, mode='w', title='Experiment file',
+                              filters=filters)
+    try:
+        for key, value in simu.metadata.loc[simu.label].iteritems():
+            h5file.root._v_attrs.__setattr__(key, value)
+        lineages = h5file.create_group(h5file.root, 'lineages',
+                                       'Microscopy data flat containers')
+        for label, (data, genealogy) in zip(labels, arrays):
+            _write_h5_table(h5file, lineages, label, data,
+                            'Cells from container {}'.format(label))
+    finally:
+        h5file.close()
+    return
+
+
+def generate_experiment(path='.', label='synthetic', nbr_container=10,
+                        nbr_colony=2, generations=4, period=5., fmt='text',
+                        seed=0, processes=1):
+    """Generate a synthetic experiment of given size
+
+    Cells grow exponentially, with an Ornstein-Uhlenbeck growth rate
+    fluctuating around log(2)/60 (parameters used in scripts/simurun.py),
+    and divide every 60 (+/- 6) time units.
+
+    Parameters
+    ----------
+    path : str
+        parent directory of experiment folder
+    label : str
+        experiment label (name of experiment folder)
+    nbr_container : int
+        number of containers
+    nbr_colony : int
+        number of colonies per container
+    generations : int
+        duration of simulation, in average interdivision times; each colony
+        counts about 2 ** (generations + 1) cells
+    period : float
+        time interval between acquisitions
+    fmt : str {'text', 'npy', 'h5'}
+        format of container data, see :func:`write_simulation`
+    seed : int
+        master seed: the same seed generates the same experiment
+    processes : int (default 1)
+        number of processes in which containers are simulated
+
+    Returns
+    -------
+    exp_path : str
+        absolute path to experiment folder
+    """
+    divparams = DivisionParams(mean=60., std=6., minimum=period)
+    target = np.log(2.)/60.
+    spring = 1./30.
+    ouparams = OUParams(target=target, spring=spring,
+                        noise=2. * spring * (target/10.)**2)
+    simuparams = SimuParams(nbr_container=nbr_container,
+                            nbr_colony_per_container=nbr_colony,
+                            start=0., stop=generations * divparams.mean,
+                            interval=period)
+    simu = OUSimulation(label=label, simuParams=simuparams,
+                        divisionParams=divparams, ouParams=ouparams,
+                        seed=seed)
+    return write_simulation(simu, path=path, fmt=fmt, processes=processes)
@@ -5,7 +5,12 @@ This module sets up api functions for dynamical correlation analysis.
 """
 from __future__ import print_function
 
+import inspect
+import hashlib
+import warnings
+import functools
 import numpy as np
+import pandas as pd
 
 from tuna.stats.utils import (iter_timeseries_,
                               iter_timeseries_2,
@@ -14,6 +19,10 @@ from tuna.stats.utils import (iter_timeseries_,
 from tuna.stats.single import (Univariate, StationaryUnivariate,
                                UnivariateIOError, StationaryUnivariateIOError)
 from tuna.stats.two import Bivariate, StationaryBivariate
+from tuna.io import text
+from tuna import profiling
+from tuna.stats.progress import make_progress
+from tuna.stats.checkpoint import make_checkpoint
 from tuna.stats.compute import (set_dynamics,
                                 set_stationary_autocorrelation,
                                 set_crosscorrelation,
@@ -24,9 +33,129 @@ MIN_INTERDIVISION_TIME = 5.  # World record is set by Vibrio natriegens
 # See R.G.Eagon, J. Bact. vol 83, pp 736-737 (1962)
 
 
+def _profiled(func):
+    """Runs API function with profiler activated
+
+    Profiler is given by the `profiler` keyword argument, or is the
+    `profiler` attribute of the parser (first argument, or parser of the
+    univariate given as first argument; positional or keyword).
+    """
+    try:
+        first_name = inspect.getfullargspec(func).args[0]
+    except AttributeError:  # Python 2
+        first_name = inspect.getargspec(func).args[0]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = kwargs.pop('profiler', None)
+        if profiler is None:
+            first = args[0] if args else kwargs.get(first_name)
+            parser = getattr(first, 'parser', first)
+            profiler = getattr(parser, 'profiler', None)
+        with profiling.using(profiler):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _checkpoint_key(name, *items):
+    "Describes a computation, to identify its checkpoint"
+    return '\n'.join([name] + [repr(item) for item in items])
+
+
+def _averages_key(univ):
+    """Digest of univariate averages, on which records of engines depend
+
+    Checkpoints written before univariate results were recomputed are then
+    ignored.
+    """
+    digest = hashlib.md5()
+    for label in univ._condition_labels:
+        average = np.ascontiguousarray(univ[label].average, dtype='f8')
+        digest.update(average.tobytes())
+    return digest.hexdigest()
+
+
+def _region_key(region, options):
+    "Describes region and options of stationary computations"
+    return (region.name, region.tmin, region.tmax, options.as_string_code())
+
+
 # %% SINGLE DYNAMIC ONBSERVABLE
 
-def compute_univariate_dynamics(parser, obs, cset=[], size=None):
+def _get_eval_times(parser, obs, region=None, tmin=None, tmax=None,
+                    decimation=1):
+    """Returns region and evaluation times for statistics of dynamics
+
+    Evaluation times are taken on the grid defined by the 'ALL' region
+    lower bound and the experiment period (times decimation), within region
+    bounds, possibly restricted further by tmin, tmax. For generation
+    timing ('g'), evaluation times are generation indices, and tmin, tmax,
+    decimation are ignored.
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    obs : :class:`Observable` instance
+    region : str, or region as returned by :meth:`Regions.get` (default None)
+        region label or region; None stands for 'ALL'
+    tmin : float (default None)
+    tmax : float (default None)
+    decimation : int (default 1)
+        evaluation times are spaced by decimation periods
+
+    Returns
+    -------
+    (region, eval_times, window)
+    window : couple of floats, or None
+        (tmin, tmax) time window where lineages contribute to statistics,
+        with a margin of one evaluation step; None when evaluation times are
+        not restricted
+    """
+    regs = Regions(parser.experiment)
+    whole = regs.get('ALL')
+    if region is None:
+        region = whole
+    elif not isinstance(region, pd.Series):
+        region = regs.get(region)
+    if obs.timing == 'g':
+        n_max = (whole.tmax - whole.tmin)/MIN_INTERDIVISION_TIME
+        return region, np.arange(-n_max, n_max + 1, 1), None
+    if int(decimation) != decimation or decimation < 1:
+        raise ValueError('decimation must be a positive integer')
+    period = parser.experiment.period
+    step = period * int(decimation)
+    lower = max(whole.tmin, region.tmin)
+    upper = min(whole.tmax, region.tmax)
+    if tmin is not None:
+        lower = max(lower, tmin)
+    if tmax is not None:
+        upper = min(upper, tmax)
+    if upper < lower:
+        raise ValueError('Time window [{}, {}] is empty'.format(lower, upper))
+    if lower == whole.tmin and upper == whole.tmax and decimation == 1:
+        eval_times = np.arange(whole.tmin, whole.tmax + period, period)
+        window = None
+    else:
+        # stay on the grid of frames
+        start = whole.tmin + np.ceil((lower - whole.tmin)/step - 1.e-9) * step
+        eval_times = np.arange(start, upper + 1.e-9 * step, step)
+        window = (eval_times[0] - step, eval_times[-1] + step)
+    return region, eval_times, window
+
+
+def _get_window(eval_times, window, decimation=1):
+    """Identifies restricted evaluation times, None for the full grid"""
+    if window is None:
+        return None
+    return (float(eval_times[0]), float(eval_times[-1]), int(decimation))
+
+
+@_profiled
+def compute_univariate_dynamics(parser, obs, cset=[], size=None,
+                                accumulator='sums', precision='double',
+                                compensated=False, region=None, tmin=None,
+                                tmax=None, decimation=1, progress=None,
+                                checkpoint=None):
     """Computes one-point and two-point functions of statistical analysis.
 
     This functions handles conditions and time-window binning:
@@ -43,39 +172,176 @@ def compute_univariate_dynamics(parser, obs, cset=[], size=None):
     cset : list of :class:`FilterSet` instances
     size : int (default None)
         limit the iterator to size Lineage instances (used for testing)
+    accumulator : str {'sums', 'welford'}
+        how statistics are accumulated, see
+        :func:`tuna.stats.compute.set_dynamics`
+    precision : str {'double', 'single'}
+        'single' stores timeseries values and accumulated statistics as
+        float32, and counts as uint32, to reduce memory usage
+    compensated : bool {False, True}
+        whether to use Kahan compensated summation ('sums' accumulator)
+    region : str or region (default None)
+        region label, or region as returned by :meth:`Regions.get`, to which
+        evaluation times are restricted; None stands for 'ALL'
+    tmin : float (default None)
+        restrict further evaluation times to be larger than tmin
+    tmax : float (default None)
+        restrict further evaluation times to be smaller than tmax
+    decimation : int (default 1)
+        evaluation times are spaced by decimation times the experiment period
     binsize : float
         size of binning windows for time values
     decimals : int
         number of decimals to use for binning time values
     max_exponent : int
         maximal time value must be less than 10 to the max_exponent value
+    progress : bool, callable, or :class:`Progress` instance (default None)
+        reports containers, lineages and frames processed, rates and ETA;
+        True prints reports, a callable receives them (see
+        :mod:`tuna.stats.progress`)
+    checkpoint : bool or float (default None)
+        when given, accumulated records and processed containers are saved
+        in the analysis folder, at most every `checkpoint` seconds (True
+        for every 600 seconds), and a new call resumes from last save (see
+        :mod:`tuna.stats.checkpoint`); requires size=None
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        records time spent in each stage of the computation; default is
+        the profiler attribute of the parser, if any
 
     Returns
     -------
     Univariate instance
+
+    Notes
+    -----
+    When evaluation times are restricted, lineages whose time extent does
+    not overlap the evaluation window are skipped before their observable
+    values are computed. Exported results are stored in a subfolder of the
+    observable folder named after first and last evaluation times and
+    decimation (see :func:`tuna.io.text.get_window_label`): they do not
+    overwrite results of the default computation.
     """
-    regs = Regions(parser.experiment)
-    region = regs.get('ALL')
-    if obs.timing != 'g':
-        period = parser.experiment.period
-        tmin = region.tmin
-        tmax = region.tmax
-    else:
-        period = 1
-        n_max = (region.tmax - region.tmin)/MIN_INTERDIVISION_TIME
-        tmin = - n_max
-        tmax = n_max
-    eval_times = np.arange(tmin, tmax + period, period)
+    region, eval_times, window = _get_eval_times(parser, obs, region=region,
+                                                 tmin=tmin, tmax=tmax,
+                                                 decimation=decimation)
     # initialize Univariate and each of its item
-    univ = Univariate(obs, cset, parser, region, eval_times)  # empty
+    univ = Univariate(obs, cset, parser, region, eval_times,
+                      window=_get_window(eval_times, window, decimation))
+    key = _checkpoint_key('dynamics', obs, cset, eval_times.tolist(),
+                          accumulator, precision, compensated)
+    ckpt = make_checkpoint(checkpoint, parser, key, size=size)
+    labels = ckpt.remaining() if ckpt is not None else None
     # Set iterator over TimeSeries
-    timeseries = iter_timeseries_(parser, obs, cset, size=size)
+    timeseries = iter_timeseries_(parser, obs, cset, size=size, labels=labels,
+                                  precision=precision, window=window,
+                                  progress=make_progress(progress, parser,
+                                                         size=size,
+                                                         labels=labels),
+                                  checkpoint=ckpt)
+    # record containers before parsing: any later change will be noticed
+    if size is None and window is None:
+        processed = text.get_container_mtimes(parser.experiment)
+    else:
+        processed = {}  # partial parsing cannot be updated
     # call the master function performing computation
-    set_dynamics(timeseries, univ, eval_times)
+    set_dynamics(timeseries, univ, eval_times, accumulator=accumulator,
+                 precision=precision, compensated=compensated,
+                 checkpoint=ckpt)
+    univ.processed = processed
+    if ckpt is not None:
+        ckpt.clear()
     return univ
 
 
-def initialize_univariate(parser, obs, cset=[]):
+@_profiled
+def update_univariate_dynamics(parser, obs, cset=[], accumulator='sums',
+                               precision='double', compensated=False,
+                               analysis_folder=None):
+    """Updates exported statistics of dynamics with new containers.
+
+    Partial states of accumulators, and labels of containers that have been
+    processed, are read from the analysis folder. Only containers that have
+    been added since are parsed, and their contribution is merged with
+    stored partial states. Results are exported before returning.
+
+    When no previous computation is found, or when processed containers have
+    been modified or removed since (their previous contribution cannot be
+    substracted from stored partial states), statistics are computed from
+    scratch.
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    obs : :class:`Observable` instance
+    cset : list of :class:`FilterSet` instances
+    accumulator : str {'sums', 'welford'}
+        used only when statistics are computed from scratch
+    precision : str {'double', 'single'}
+        used only when statistics are computed from scratch, otherwise the
+        precision of stored partial states is kept
+    compensated : bool {False, True}
+        used only when statistics are computed from scratch
+    analysis_folder : str (default None)
+        Path to the analysis folder; default is 'analysis' subfolder in
+        experiment folder
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        records time spent in each stage of the computation; default is
+        the profiler attribute of the parser, if any
+
+    Returns
+    -------
+    Univariate instance
+    """
+    univ = initialize_univariate(parser, obs, cset)
+    try:
+        univ.import_from_text(analysis_folder)
+        univ.import_state(analysis_folder)
+    except UnivariateIOError:
+        univ = compute_univariate_dynamics(parser, obs, cset,
+                                           accumulator=accumulator,
+                                           precision=precision,
+                                           compensated=compensated)
+        univ.export_text(analysis_folder)
+        return univ
+    current = text.get_container_mtimes(parser.experiment)
+    outdated = []
+    size = len(univ.eval_times)
+    # stored results must match current evaluation times
+    mismatch = (univ.master.accumulator.size != size or
+                len(univ.master.onepoint) != size or
+                univ.master.autocorr.shape != (size, size))
+    if mismatch:
+        outdated = list(univ.processed.keys())
+    for label, mtime in univ.processed.items():
+        if label not in current or abs(current[label] - mtime) > 1.e-3:
+            outdated.append(label)
+    if outdated or mismatch:
+        msg = ('Containers {} have been modified or removed, or time range '
+               'has changed, since last computation: '
+               'computing from scratch.'.format(outdated))
+        warnings.warn(msg)
+        univ = compute_univariate_dynamics(parser, obs, cset,
+                                           accumulator=accumulator,
+                                           precision=precision,
+                                           compensated=compensated)
+        univ.export_text(analysis_folder)
+        return univ
+    new = [label for label in current if label not in univ.processed]
+    if not new:
+        return univ
+    accumulators = {lab: univ[lab].accumulator
+                    for lab in univ._condition_labels}
+    timeseries = iter_timeseries_(parser, obs, cset, labels=new,
+                                  precision=univ.master.accumulator.precision)
+    set_dynamics(timeseries, univ, univ.eval_times, accumulator=accumulators)
+    for label in new:
+        univ.processed[label] = current[label]
+    univ.export_text(analysis_folder)
+    return univ
+
+
+def initialize_univariate(parser, obs, cset=[], region=None, tmin=None,
+                          tmax=None, decimation=1):
     """Initialize an empty Univariate instance.
 
     Parameters
@@ -83,26 +349,22 @@ def initialize_univariate(parser, obs, cset=[]):
     parser : :class:`Parser` instance
     obs : :class:`Observable` instance
     cset : sequence of :class:`FilterSet` instances
+    region, tmin, tmax, decimation :
+        restriction of evaluation times, see
+        :func:`compute_univariate_dynamics`; results computed with the same
+        restriction are imported from the same folder
 
     Returns
     -------
     :class:`Univariate` instance
         initialized, nothing computed yet
     """
-    regs = Regions(parser.experiment)
-    region = regs.get('ALL')
-    if obs.timing != 'g':
-        period = parser.experiment.period
-        tmin = region.tmin
-        tmax = region.tmax
-    else:
-        period = 1
-        n_max = (region.tmax - region.tmin)/MIN_INTERDIVISION_TIME
-        tmin = - n_max
-        tmax = n_max
-    eval_times = np.arange(tmin, tmax + period, period)
+    region, eval_times, window = _get_eval_times(parser, obs, region=region,
+                                                 tmin=tmin, tmax=tmax,
+                                                 decimation=decimation)
     univ = Univariate(obs, parser=parser, cset=cset, region=region,
-                      eval_times=eval_times)
+                      eval_times=eval_times,
+                      window=_get_window(eval_times, window, decimation))
     return univ
 
 
@@ -149,7 +411,9 @@ def _update_univariate_from_stationary(univ, stat):
     return
 
 
-def compute_stationary_univariate(univ, region, options, size=None):
+@_profiled
+def compute_stationary_univariate(univ, region, options, size=None,
+                                  progress=None, checkpoint=None):
     """Computes stationary autocorrelation. API level.
 
     Parameters
@@ -170,19 +434,45 @@ def compute_stationary_univariate(univ, region, options, size=None):
             use locally is local statistics are sufficient.
     size : int (default None)
         limit number of parsed Lineages
+    progress : bool, callable, or :class:`Progress` instance (default None)
+        reports containers, lineages and frames processed, rates and ETA;
+        True prints reports, a callable receives them (see
+        :mod:`tuna.stats.progress`)
+    checkpoint : bool or float (default None)
+        when given, accumulated records and processed containers are saved
+        in the analysis folder, at most every `checkpoint` seconds (True
+        for every 600 seconds), and a new call resumes from last save (see
+        :mod:`tuna.stats.checkpoint`); requires size=None
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        records time spent in each stage of the computation; default is
+        the profiler attribute of the parser, if any
 
     """
     _check_params(region, options)
     # initialize StationaryUnivariate
     stationary = StationaryUnivariate(univ, region, options)
+    key = _checkpoint_key('stationary', univ.obs, univ.cset,
+                          univ.eval_times.tolist(),
+                          _region_key(region, options), _averages_key(univ))
+    ckpt = make_checkpoint(checkpoint, univ.parser, key, size=size)
+    labels = ckpt.remaining() if ckpt is not None else None
     # Set iterator over TimeSeries
-    timeseries = iter_timeseries_(univ.parser, univ.obs, univ.cset, size=size)
+    timeseries = iter_timeseries_(univ.parser, univ.obs, univ.cset, size=size,
+                                  labels=labels,
+                                  progress=make_progress(progress,
+                                                         univ.parser,
+                                                         size=size,
+                                                         labels=labels),
+                                  checkpoint=ckpt)
     # call the function performing computation and updating stationary
     set_stationary_autocorrelation(timeseries, univ, stationary,
                                    tmin=region.tmin, tmax=region.tmax,
                                    adjust_mean=options.adjust_mean,
-                                   disjoint=options.disjoint)
+                                   disjoint=options.disjoint,
+                                   checkpoint=ckpt)
     _update_univariate_from_stationary(univ, stationary)
+    if ckpt is not None:
+        ckpt.clear()
     return stationary
 
 
@@ -214,7 +504,31 @@ def initialize_bivariate(row_univariate, col_univariate):
     return two
 
 
-def compute_bivariate(row_univariate, col_univariate, size=None):
+def _check_observables(obs1, obs2):
+    """Check that the two observables can be cross-correlated"""
+    # check that the two observables are either two dynamics mode, either zero
+    if obs1.mode != obs2.mode:
+        if obs1.mode == 'dynamics' or obs2.mode == 'dynamics':
+            msg = ('Cannot mix time-lapse and cell-cycle observables:\n'
+                   'Here obs1.mode = {} and obs2.mode = {}'.format(obs1.mode,
+                                                                   obs2.mode))
+            raise TypeError(msg)
+        elif obs1.timing == 'g':
+            if obs2.timing != 'g':
+                msg = ('If one observable is evaluated in generation time, '
+                       'the other one must be as well in generation time.')
+                raise TypeError(msg)
+        elif obs2.timing == 'g':
+            if obs1.timing != 'g':
+                msg = ('If one observable is evaluated in generation time, '
+                       'the other one must be as well in generation time.')
+                raise TypeError(msg)
+    return
+
+
+@_profiled
+def compute_bivariate(row_univariate, col_univariate, size=None,
+                      progress=None, checkpoint=None):
     """Computes cross-correlation between observables defiend in univs.
 
     This functions handles conditions and time-window binning:
@@ -229,6 +543,18 @@ def compute_bivariate(row_univariate, col_univariate, size=None):
     univs : couple of Univariate instances
     size : int (default None)
         limit the iterator to size Lineage instances (used for testing)
+    progress : bool, callable, or :class:`Progress` instance (default None)
+        reports containers, lineages and frames processed, rates and ETA;
+        True prints reports, a callable receives them (see
+        :mod:`tuna.stats.progress`)
+    checkpoint : bool or float (default None)
+        when given, accumulated records and processed containers are saved
+        in the analysis folder, at most every `checkpoint` seconds (True
+        for every 600 seconds), and a new call resumes from last save (see
+        :mod:`tuna.stats.checkpoint`); requires size=None
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        records time spent in each stage of the computation; default is
+        the profiler attribute of the parser, if any
 
     Returns
     -------
@@ -238,35 +564,87 @@ def compute_bivariate(row_univariate, col_univariate, size=None):
     s1, s2 = univs
     obs1 = s1.obs
     obs2 = s2.obs
-    # check that the two observables are either two dynamics mode, either zero
-    if obs1.mode != obs2.mode:
-        if obs1.mode == 'dynamics' or obs2.mode == 'dynamics':
-            msg = ('Cannot mix time-lapse and cell-cycle observables:\n'
-                   'Here obs1.mode = {} and obs2.mode = {}'.format(obs1.mode,
-                                                                   obs2.mode))
-            raise TypeError(msg)
-        elif obs1.timing == 'g':
-            if obs2.timing != 'g':
-                msg = ('If one observable is evaluated in generation time, '
-                       'the other one must be as well in generation time.')
-                raise TypeError(msg)
-        elif obs2.timing == 'g':
-            if obs1.timing != 'g':
-                msg = ('If one observable is evaluated in generation time, '
-                       'the other one must be as well in generation time.')
-                raise TypeError(msg)
+    _check_observables(obs1, obs2)
     # initialize Univariate and each of its item
     two = Bivariate(row_univariate, col_univariate)  # empty
     parser = two.parser
     cset = two.cset
-    timeseries = iter_timeseries_2(parser, obs1, obs2, cset, size=size)
+    key = _checkpoint_key('bivariate', obs1, obs2, cset,
+                          s1.eval_times.tolist(), s2.eval_times.tolist(),
+                          _averages_key(s1), _averages_key(s2))
+    ckpt = make_checkpoint(checkpoint, parser, key, size=size)
+    labels = ckpt.remaining() if ckpt is not None else None
+    timeseries = iter_timeseries_2(parser, obs1, obs2, cset, size=size,
+                                   labels=labels,
+                                   progress=make_progress(progress, parser,
+                                                          size=size,
+                                                          labels=labels),
+                                   checkpoint=ckpt)
     # call the master function performing computation
-    set_crosscorrelation(timeseries, row_univariate, col_univariate, two)
+    set_crosscorrelation(timeseries, row_univariate, col_univariate, two,
+                         checkpoint=ckpt)
     # update conditioned univ cross-correlation
     _update_univariate_from_bivariate(univs, two)
+    if ckpt is not None:
+        ckpt.clear()
     return two
 
 
+@_profiled
+def compute_joint_bivariate(parser, row_obs, col_obs, cset=[], size=None):
+    """Computes both univariates and their cross-correlation jointly.
+
+    Experiment is parsed only once: both observables are evaluated for each
+    lineage, and the couples of :class:`TimeSeries` are cached in memory.
+    Univariate statistics are computed from the cached couples, and the
+    cross-correlation, that requires average values, is computed in a second
+    pass over the cache instead of a new parsing of the experiment.
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    row_obs : :class:`Observable` instance
+        first observable (rows of cross-correlation matrices)
+    col_obs : :class:`Observable` instance
+        second observable (columns of cross-correlation matrices)
+    cset : list of :class:`FilterSet` instances
+    size : int (default None)
+        limit the iterator to size Lineage instances (used for testing)
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        records time spent in each stage of the computation; default is
+        the profiler attribute of the parser, if any
+
+    Returns
+    -------
+    row_univariate, col_univariate, bivariate
+    row_univariate : :class:`Univariate` instance
+    col_univariate : :class:`Univariate` instance
+    bivariate : :class:`Bivariate` instance
+    """
+    _check_observables(row_obs, col_obs)
+    row_univariate = initialize_univariate(parser, row_obs, cset)
+    col_univariate = initialize_univariate(parser, col_obs, cset)
+    # record containers before parsing: any later change will be noticed
+    if size is None:
+        processed = text.get_container_mtimes(parser.experiment)
+    else:
+        processed = {}  # partial parsing cannot be updated
+    # single parsing of the experiment
+    cached = list(iter_timeseries_2(parser, row_obs, col_obs, cset,
+                                    size=size))
+    set_dynamics((row_ts for row_ts, col_ts in cached), row_univariate,
+                 row_univariate.eval_times)
+    set_dynamics((col_ts for row_ts, col_ts in cached), col_univariate,
+                 col_univariate.eval_times)
+    row_univariate.processed = dict(processed)
+    col_univariate.processed = dict(processed)
+    # second pass on cached timeseries, using average values
+    two = Bivariate(row_univariate, col_univariate)  # empty
+    set_crosscorrelation(cached, row_univariate, col_univariate, two)
+    _update_univariate_from_bivariate((row_univariate, col_univariate), two)
+    return row_univariate, col_univariate, two
+
+
 def _update_univariate_from_stationary_bivariate(univs, stwo):
     for cdt_lab in stwo._condition_labels:
         cdt_two = stwo[cdt_lab]
@@ -297,11 +675,35 @@ def initialize_stationary_bivariate(row_univariate, col_univariate,
     return stwo
 
 
+@_profiled
 def compute_stationary_bivariate(row_univariate, col_univariate,
-                                 region, options, size=None):
+                                 region, options, size=None, engine='direct',
+                                 checkpoint=None):
     """Computes stationary cross-correlation function from couple of univs
 
     Need to compute stationary univariates as well.
+
+    Parameters
+    ----------
+    row_univariate : :class:`Univariate` instance
+    col_univariate : :class:`Univariate` instance
+    region : :class:`pandas.Series` instance
+        must have following attributes: 'name', 'tmin', 'tmax'
+    options : :class:`CompuParams` instance
+    size : int (default None)
+        limit number of parsed Lineages
+    engine : str {'direct', 'fft'}
+        computation engine, see
+        :func:`tuna.stats.compute.set_stationary_crosscorrelation`
+    checkpoint : bool or float (default None)
+        when given, accumulated records and processed containers are saved
+        in the analysis folder, at most every `checkpoint` seconds (True
+        for every 600 seconds), and a new call resumes from last save (see
+        :mod:`tuna.stats.checkpoint`); requires size=None;
+        stationary univariates are checkpointed as well
+    profiler : :class:`tuna.profiling.Profiler` instance (default None)
+        records time spent in each stage of the computation; default is
+        the profiler attribute of the parser, if any
     """
     s1, s2 = row_univariate, col_univariate
     obs1 = s1.obs
@@ -313,19 +715,30 @@ def compute_stationary_bivariate(row_univariate, col_univariate,
             suniv = initialize_stationary_univariate(univ, region, options)
             suniv.import_from_text()
         except StationaryUnivariateIOError:
-            suniv = compute_stationary_univariate(univ, region, options)
+            suniv = compute_stationary_univariate(univ, region, options,
+                                                  checkpoint=checkpoint)
             suniv.export_text()
         _update_univariate_from_stationary(univ, suniv)
     sbivar = StationaryBivariate(row_univariate, col_univariate,
                                  region, options)
     parser = sbivar.parser
     cset = sbivar.cset
-    timeseries = iter_timeseries_2(parser, obs1, obs2, cset, size=size)
+    key = _checkpoint_key('stationary_bivariate', obs1, obs2, cset,
+                          s1.eval_times.tolist(),
+                          _region_key(region, options), engine,
+                          _averages_key(s1), _averages_key(s2))
+    ckpt = make_checkpoint(checkpoint, parser, key, size=size)
+    labels = ckpt.remaining() if ckpt is not None else None
+    timeseries = iter_timeseries_2(parser, obs1, obs2, cset, size=size,
+                                   labels=labels, checkpoint=ckpt)
     set_stationary_crosscorrelation(timeseries, row_univariate, col_univariate,
                                     sbivar,
                                     tmin=region.tmin, tmax=region.tmax,
                                     adjust_mean=options.adjust_mean,
-                                    disjoint=options.disjoint)
+                                    disjoint=options.disjoint,
+                                    engine=engine, checkpoint=ckpt)
     # update conditioned univ stationary cross-correlation
     _update_univariate_from_stationary_bivariate(univs, sbivar)
+    if ckpt is not None:
+        ckpt.clear()
     return sbivar
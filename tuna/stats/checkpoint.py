@@ -0,0 +1,306 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+stats module
+~~~~~~~~~~~~
+
+checkpoint.py
+-------------
+
+Resumable computations: checkpointing of accumulator records.
+
+Computation engines of :mod:`tuna.stats.compute` update, for each condition,
+a record of accumulated values (arrays, or accumulator instances) while
+browsing lineages container after container. A :class:`Checkpoint` instance
+regularly saves these records, together with the list of containers whose
+lineages have all been accumulated, in the analysis folder. When the same
+computation is called again, records are restored from the last checkpoint
+and only remaining containers are parsed. The checkpoint file is removed
+when computation completes.
+
+Stats API functions accept a `checkpoint` argument:
+
+>>> stwo = compute_stationary_bivariate(univ1, univ2, region, options,
+...                                     checkpoint=600.)
+
+saves records at most every 600 seconds (at container boundaries), and
+resumes from last saved records if a previous call was interrupted.
+
+A checkpoint is identified by a key describing the computation
+(observables, conditions, region, options, univariate averages...):
+checkpoints of other computations are ignored, as well as checkpoints for
+which a processed container file has been modified since.
+
+Records and the list of processed containers are small, and rewritten at
+each save. Dataframes collected by engines grow with the number of
+processed containers: each save only writes the rows collected since the
+previous save, as a new chunk file, so that the cost of checkpointing does
+not grow with progress.
+"""
+from __future__ import print_function
+
+import os
+import glob
+import hashlib
+import pickle
+import timeit
+import warnings
+
+import pandas as pd
+
+from tuna.io import text
+
+DEFAULT_INTERVAL = 600.  # seconds
+
+
+def get_checkpoint_path(exp, write=False):
+    """Folder where checkpoints are stored, within analysis folder
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+    write : bool (default False)
+        whether to create folder when missing
+
+    Returns
+    -------
+    str
+    """
+    path = os.path.join(text.get_analysis_path(exp, write=write),
+                        'checkpoints')
+    if write and not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+
+class Checkpoint(object):
+    """Saves and restores records of a computation, container per container
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    key : str
+        description of computation; checkpoints with another key are ignored
+    interval : float (default 600.)
+        minimal time, in seconds, between two saves; 0 saves after each
+        container
+
+    Notes
+    -----
+    Usage by computation engines:
+
+    * :meth:`remaining` gives the labels of containers to be parsed,
+    * :meth:`attach` restores saved records in the dict of records used by
+      the engine, and registers it (with the list of dataframes, if any),
+    * :meth:`visit` is called for each lineage: when a new container is
+      reached, previous one has been fully accumulated,
+    * :meth:`clear` removes checkpoint file at the end of computation.
+    """
+
+    def __init__(self, parser, key, interval=DEFAULT_INTERVAL):
+        self.parser = parser
+        self.key = key
+        self.interval = interval
+        exp = parser.experiment
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        self.fname = os.path.join(get_checkpoint_path(exp), digest + '.pkl')
+        self.processed = []  # labels of fully accumulated containers
+        self.records = None  # records restored from file
+        self.dataframe = None  # dataframe restored from chunk files
+        self.chunks = []  # basenames of saved dataframe chunks
+        self._records = None  # records updated by engine
+        self._frames = None
+        self._saved = 0  # number of engine frames written in chunks
+        self._current = None
+        self._last = None
+        self.load()
+        return
+
+    def load(self):
+        """Read last checkpoint, if any, valid for this computation
+
+        Returns
+        -------
+        bool
+            whether a checkpoint has been loaded
+        """
+        if not os.path.exists(self.fname):
+            return False
+        try:
+            with open(self.fname, 'rb') as f:
+                content = pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError) as err:
+            warnings.warn('Checkpoint {} cannot be read ({}): '
+                          'it is ignored'.format(self.fname, err))
+            return False
+        if content['key'] != self.key:
+            return False
+        mtimes = text.get_container_mtimes(self.parser.experiment)
+        for label, mtime in content['mtimes'].items():
+            if mtimes.get(label) != mtime:
+                warnings.warn('Container {} changed since checkpoint: '
+                              'checkpoint is ignored'.format(label))
+                return False
+        path = os.path.dirname(self.fname)
+        frames = []
+        try:
+            for basename in content['chunks']:
+                with open(os.path.join(path, basename), 'rb') as f:
+                    frames.append(pickle.load(f))
+        except (IOError, EOFError, pickle.UnpicklingError) as err:
+            warnings.warn('Checkpoint chunk cannot be read ({}): '
+                          'checkpoint is ignored'.format(err))
+            return False
+        self.processed = content['processed']
+        self.records = content['records']
+        self.chunks = list(content['chunks'])
+        if frames:
+            self.dataframe = pd.concat(frames, ignore_index=True)
+        return True
+
+    def remaining(self):
+        """Labels of containers that are not processed yet
+
+        Returns
+        -------
+        list of str, or None when no container has been processed
+        """
+        if not self.processed:
+            return None
+        return [label for label in self.parser.experiment.containers
+                if label not in self.processed]
+
+    def attach(self, records, frames=None):
+        """Restore saved records, and register records to be saved
+
+        Parameters
+        ----------
+        records : dict
+            keys are condition labels, values are records updated by the
+            engine (replaced by restored ones, when a checkpoint is loaded)
+        frames : list of :class:`pandas.DataFrame` instances (default None)
+            dataframes collected by the engine (restored dataframe is
+            appended first); the engine only appends to this list
+        """
+        if self.records is not None:
+            records.update(self.records)
+        if frames is not None and self.dataframe is not None:
+            frames.append(self.dataframe)
+        self._records = records
+        self._frames = frames
+        self._saved = len(frames) if frames is not None else 0
+        self._last = timeit.default_timer()
+        return
+
+    def visit(self, lineage):
+        """Mark previous container as processed when lineage starts a new one
+
+        Parameters
+        ----------
+        lineage : :class:`Lineage` instance
+        """
+        label = lineage.colony.container.label
+        if label != self._current:
+            if self._current is not None:
+                self.done(self._current)
+            self._current = label
+        return
+
+    def done(self, label):
+        """Mark container as processed, save when interval is elapsed"""
+        self.processed.append(label)
+        now = timeit.default_timer()
+        if self._last is None or now - self._last >= self.interval:
+            self.save()
+        return
+
+    def save(self):
+        """Write records and processed containers in checkpoint file
+
+        Dataframes collected since last save are written first, in a new
+        chunk file. Files are first written under a temporary name, then
+        renamed, so that an interruption while writing does not corrupt
+        last checkpoint (chunks are referenced by checkpoint file only once
+        they are complete).
+        """
+        if self._records is None:
+            return
+        path = os.path.dirname(self.fname)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        if self._frames and len(self._frames) > self._saved:
+            chunk = pd.concat(self._frames[self._saved:], ignore_index=True)
+            root, ext = os.path.splitext(os.path.basename(self.fname))
+            basename = '{}.{:d}{}'.format(root, len(self.chunks), ext)
+            _dump(chunk, os.path.join(path, basename))
+            self.chunks.append(basename)
+            self._saved = len(self._frames)
+        mtimes = text.get_container_mtimes(self.parser.experiment)
+        content = {'key': self.key,
+                   'processed': list(self.processed),
+                   'mtimes': dict((label, mtimes[label])
+                                  for label in self.processed
+                                  if label in mtimes),
+                   'records': self._records,
+                   'chunks': list(self.chunks)}
+        _dump(content, self.fname)
+        self._last = timeit.default_timer()
+        return
+
+    def clear(self):
+        """Remove checkpoint and chunk files (computation is complete)"""
+        if os.path.exists(self.fname):
+            os.remove(self.fname)
+        root, ext = os.path.splitext(self.fname)
+        for fname in glob.glob('{}.*{}'.format(root, ext)):
+            os.remove(fname)
+        self.processed = []
+        self.records = None
+        self.dataframe = None
+        self.chunks = []
+        self._saved = 0
+        self._current = None
+        return
+
+
+def _dump(content, fname):
+    "Pickle content in fname, through a temporary file"
+    tmp = fname + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(content, f, protocol=2)
+    if os.path.exists(fname):
+        os.remove(fname)  # rename does not overwrite on Windows
+    os.rename(tmp, fname)
+    return
+
+
+def make_checkpoint(checkpoint, parser, key, size=None):
+    """Checkpoint instance from the `checkpoint` argument of API functions
+
+    Parameters
+    ----------
+    checkpoint : None, bool, or float
+        None or False: no checkpointing; True: default interval; float:
+        interval, in seconds, between two saves
+    parser : :class:`Parser` instance
+    key : str
+        description of computation
+    size : int (default None)
+        limit on the number of lineages: partial computations cannot be
+        checkpointed
+
+    Returns
+    -------
+    :class:`Checkpoint` instance, or None
+    """
+    if checkpoint is None or checkpoint is False:
+        return None
+    if size is not None:
+        raise ValueError('computations limited in size cannot be '
+                         'checkpointed')
+    if checkpoint is True:
+        return Checkpoint(parser, key)
+    return Checkpoint(parser, key, interval=float(checkpoint))
@@ -7,17 +7,339 @@ from __future__ import print_function
 
 import numpy as np
 import pandas as pd
-from scipy.linalg import toeplitz, triu
 from scipy.interpolate import interp1d
 
+from tuna import profiling
+
+
+# engines available for stationary cross-correlation
+ENGINES = ('direct', 'fft')
+
+# storage types (values, counts) for accumulators
+PRECISIONS = {'double': (np.float64, np.int64),
+              'single': (np.float32, np.uint32)}
+
+
+def _get_types(precision):
+    """Returns storage types (values, counts) for given precision"""
+    if precision not in PRECISIONS:
+        raise ValueError('precision must be one of '
+                         '{}'.format(sorted(PRECISIONS.keys())))
+    return PRECISIONS[precision]
+
+
+def _get_precision(arr):
+    """Returns precision label matching storage type of arr"""
+    for precision, (ftype, itype) in PRECISIONS.items():
+        if arr.dtype == ftype:
+            return precision
+    return 'double'
+
+
+def _kahan_add(total, error, index, values):
+    """Compensated summation of values into total[index].
+
+    error stores the low-order part lost in total, with opposite sign: the
+    compensated sum is total - error.
+    """
+    y = values - error[index]
+    t = total[index] + y
+    error[index] = (t - total[index]) - y
+    total[index] = t
+    return
+
 
 # %% Single observable computation of the statistics of dynamics
-def set_dynamics(iter_timeseries, single, eval_times):
+class SumsAccumulator(object):
+    """Accumulates raw sums of values and of products of values.
+
+    One-point estimates are computed from sums of values, two-point estimates
+    from sums of products, and centered quantities are obtained at the end by
+    substracting products of averages. Fast, but may lose precision when
+    values are large compared to their fluctuations.
+
+    Parameters
+    ----------
+    size : int
+        number of evaluation times
+    precision : str {'double', 'single'}
+        'double' stores sums as float64 and counts as int64;
+        'single' stores sums as float32 and counts as uint32, which halves
+        memory usage of the two-point matrices
+    compensated : bool {False, True}
+        whether to use Kahan compensated summation, that limits round-off
+        errors (mostly useful in single precision); it needs an extra array
+        for each sum
+    """
+    kind = 'sums'
+    _state_keys = ('ones', 'count_ones', 'twos', 'count_twos')
+    _error_keys = ('ones_err', 'twos_err')
+
+    def __init__(self, size, precision='double', compensated=False):
+        self.size = size
+        self.precision = precision
+        self.compensated = compensated
+        self.dtype, self.itype = _get_types(precision)
+        self.ones = np.zeros(size, dtype=self.dtype)
+        self.count_ones = np.zeros(size, dtype=self.itype)
+        self.twos = np.zeros((size, size), dtype=self.dtype)
+        self.count_twos = np.zeros((size, size), dtype=self.itype)
+        if compensated:
+            self.ones_err = np.zeros(size, dtype=self.dtype)
+            self.twos_err = np.zeros((size, size), dtype=self.dtype)
+        return
+
+    def get_state(self):
+        """Partial state, as a dict of arrays (see from_state)"""
+        keys = self._state_keys
+        if self.compensated:
+            keys = keys + self._error_keys
+        return {key: getattr(self, key) for key in keys}
+
+    @classmethod
+    def from_state(cls, state):
+        """Build accumulator from a partial state (see get_state)"""
+        compensated = 'ones_err' in state
+        acc = cls(len(state['count_ones']),
+                  precision=_get_precision(np.asarray(state['ones'])),
+                  compensated=compensated)
+        keys = cls._state_keys
+        if compensated:
+            keys = keys + cls._error_keys
+        for key in keys:
+            setattr(acc, key, np.array(state[key]))
+        return acc
+
+    def add(self, arr):
+        """Add a sample evaluated at each time (NaNs where not evaluated)"""
+        index = np.flatnonzero(np.logical_not(np.isnan(arr)))
+        if len(index) == 0:
+            return
+        values = arr[index].astype(self.dtype)
+        sub = np.ix_(index, index)
+        if self.compensated:
+            _kahan_add(self.ones, self.ones_err, index, values)
+            _kahan_add(self.twos, self.twos_err, sub, np.outer(values, values))
+        else:
+            self.ones[index] += values
+            self.twos[sub] += np.outer(values, values)
+        self.count_ones[index] += 1
+        self.count_twos[sub] += 1
+        return
+
+    def merge(self, other):
+        """Merge partial sums stored in other, another SumsAccumulator"""
+        for key in ('ones', 'twos'):
+            total = getattr(self, key)
+            values = getattr(other, key)
+            if other.compensated:
+                values = values - getattr(other, key + '_err')
+            if self.compensated:
+                _kahan_add(total, getattr(self, key + '_err'), Ellipsis,
+                           values.astype(self.dtype))
+            else:
+                total += values
+        self.count_ones += other.count_ones.astype(self.itype)
+        self.count_twos += other.count_twos.astype(self.itype)
+        return
+
+    def finalize(self):
+        """Compute estimates.
+
+        Returns
+        -------
+        count_one, mean, count_two, autocov
+        count_one : 1d ndarray of ints
+        mean : 1d ndarray
+            average values (NaN where no sample)
+        count_two : 2d ndarray of ints
+        autocov : 2d ndarray
+            auto-covariance matrix (NaN where no sample), stored with
+            accumulator precision
+        """
+        ones, twos = self.ones, self.twos
+        if self.compensated:
+            ones = ones - self.ones_err
+            twos = twos - self.twos_err
+        count_one = self.count_ones
+        mean = np.zeros(self.size)
+        ok = count_one > 0
+        mean[ok] = ones[ok]/count_one[ok]
+        mean[np.logical_not(ok)] = np.nan
+
+        count_two = self.count_twos
+        outer = np.zeros((self.size, self.size), dtype=self.dtype)
+        ok = count_two > 0
+        outer[ok] = twos[ok]/count_two[ok]
+        outer[np.logical_not(ok)] = np.nan
+        # correct for mean
+        stored_mean = mean.astype(self.dtype)
+        autocov = outer - np.outer(stored_mean, stored_mean)
+        return count_one, mean, count_two, autocov
+
+
+class WelfordAccumulator(object):
+    """Accumulates centered moments with Welford updates.
+
+    For each couple of times (i, j), the average of values at time i over
+    samples that are evaluated at both times is stored, together with the sum
+    of products of deviations from these averages (co-moment). Partial states
+    are merged with Chan et al. pairwise formula, so that results do not
+    depend on how samples are split between accumulators.
+
+    Parameters
+    ----------
+    size : int
+        number of evaluation times
+    precision : str {'double', 'single'}
+        storage types, see :class:`SumsAccumulator`
+
+    Notes
+    -----
+    Estimates are the same as the ones of :class:`SumsAccumulator`: the
+    auto-covariance is the average of products minus the product of
+    one-point averages. It is computed as
+
+    .. math::
+
+       C_{ij}/n_{ij} + (p_{ij} - m_i) p_{ji} + m_i (p_{ji} - m_j)
+
+    where :math:`p_{ij}` is the average at time :math:`t_i` over samples
+    evaluated at both times, and :math:`m_i` is the one-point average, which
+    avoids cancellation errors for large valued observables.
+    """
+    kind = 'welford'
+    _state_keys = ('count_ones', 'means', 'count_twos', 'pair_means',
+                   'comoments')
+
+    def __init__(self, size, precision='double'):
+        self.size = size
+        self.precision = precision
+        self.compensated = False  # updates do not accumulate large sums
+        self.dtype, self.itype = _get_types(precision)
+        self.count_ones = np.zeros(size, dtype=self.itype)
+        self.means = np.zeros(size, dtype=self.dtype)
+        self.count_twos = np.zeros((size, size), dtype=self.itype)
+        self.pair_means = np.zeros((size, size), dtype=self.dtype)
+        self.comoments = np.zeros((size, size), dtype=self.dtype)
+        return
+
+    def get_state(self):
+        """Partial state, as a dict of arrays (see from_state)"""
+        return {key: getattr(self, key) for key in self._state_keys}
+
+    @classmethod
+    def from_state(cls, state):
+        """Build accumulator from a partial state (see get_state)"""
+        acc = cls(len(state['count_ones']),
+                  precision=_get_precision(np.asarray(state['means'])))
+        for key in cls._state_keys:
+            setattr(acc, key, np.array(state[key]))
+        return acc
+
+    def add(self, arr):
+        """Add a sample evaluated at each time (NaNs where not evaluated)"""
+        index = np.flatnonzero(np.logical_not(np.isnan(arr)))
+        if len(index) == 0:
+            return
+        values = arr[index].astype(self.dtype)
+        counts = self.count_ones[index] + 1
+        self.means[index] += (values - self.means[index])/counts
+        self.count_ones[index] = counts
+        sub = np.ix_(index, index)
+        counts = self.count_twos[sub] + 1
+        old = self.pair_means[sub]
+        delta = values[:, np.newaxis] - old
+        new = old + delta/counts
+        self.comoments[sub] += delta * (values[np.newaxis, :] - new.T)
+        self.pair_means[sub] = new
+        self.count_twos[sub] = counts
+        return
+
+    def merge(self, other):
+        """Merge partial state stored in other, another WelfordAccumulator"""
+        counts = self.count_ones + other.count_ones
+        ok = counts > 0
+        delta = other.means - self.means
+        self.means[ok] += delta[ok] * other.count_ones[ok]/counts[ok]
+        self.count_ones = counts.astype(self.itype)
+
+        counts = self.count_twos + other.count_twos
+        ok = counts > 0
+        delta = other.pair_means - self.pair_means
+        weight = np.zeros((self.size, self.size), dtype=self.dtype)
+        weight[ok] = (self.count_twos[ok].astype(float) *
+                      other.count_twos[ok]/counts[ok])
+        self.comoments += other.comoments + delta * delta.T * weight
+        self.pair_means[ok] += (delta[ok] *
+                                other.count_twos[ok]/counts[ok])
+        self.count_twos = counts.astype(self.itype)
+        return
+
+    def finalize(self):
+        """Compute estimates.
+
+        Returns
+        -------
+        count_one, mean, count_two, autocov
+        count_one : 1d ndarray of ints
+        mean : 1d ndarray
+            average values (NaN where no sample)
+        count_two : 2d ndarray of ints
+        autocov : 2d ndarray
+            auto-covariance matrix (NaN where no sample), stored with
+            accumulator precision
+        """
+        count_one = self.count_ones
+        mean = np.array(self.means, dtype=float)
+        mean[count_one == 0] = np.nan
+
+        count_two = self.count_twos
+        ok = count_two > 0
+        pm = self.pair_means
+        stored_mean = mean.astype(self.dtype)
+        row_mean = stored_mean[:, np.newaxis]
+        col_mean = stored_mean[np.newaxis, :]
+        autocov = np.zeros((self.size, self.size), dtype=self.dtype)
+        correction = (pm - row_mean) * pm.T + row_mean * (pm.T - col_mean)
+        autocov[ok] = self.comoments[ok]/count_two[ok] + correction[ok]
+        autocov[np.logical_not(ok)] = np.nan
+        return count_one, mean, count_two, autocov
+
+
+# accumulators available for the statistics of dynamics
+ACCUMULATORS = {'sums': SumsAccumulator,
+                'welford': WelfordAccumulator}
+
+
+def load_accumulator(kind, state):
+    """Build accumulator of given kind from a partial state.
+
+    Parameters
+    ----------
+    kind : str {'sums', 'welford'}
+    state : dict
+        partial state, as returned by the accumulator get_state method
+
+    Returns
+    -------
+    :class:`SumsAccumulator` or :class:`WelfordAccumulator` instance
+    """
+    if kind not in ACCUMULATORS:
+        raise ValueError('accumulator must be one of '
+                         '{}'.format(sorted(ACCUMULATORS.keys())))
+    return ACCUMULATORS[kind].from_state(state)
+
+
+def set_dynamics(iter_timeseries, single, eval_times, accumulator='sums',
+                 precision='double', compensated=False, checkpoint=None):
     """Central function that perform computations.
 
-    It first defines dictionaries where rounded times are keys and values are
-    iteratively updated. Then dictionaries are read to produce arrays that fill
-    Univariate single instance.
+    It first defines accumulators, one for each condition, that are
+    iteratively updated. Then accumulators are read to produce arrays that fill
+    Univariate single instance. Accumulators are kept as the .accumulator
+    attribute of each UnivariateConditioned instance, so that computation
+    can be resumed later.
 
     Parameters
     ----------
@@ -25,6 +347,20 @@ def set_dynamics(iter_timeseries, single, eval_times):
     single : initialized Univariate instance
     eval_times : 1d ndarray
         times at which statistics are computed
+    accumulator : str {'sums', 'welford'}, or dict
+        'sums' accumulates raw sums of values and products (fast);
+        'welford' accumulates centered moments (numerically stable), see
+        :class:`WelfordAccumulator`;
+        a dict maps each condition label to an accumulator instance holding
+        a partial state, to be updated with new timeseries
+    precision : str {'double', 'single'}
+        storage types of accumulators: 'single' uses float32 values and
+        uint32 counts, see :class:`SumsAccumulator`
+    compensated : bool {False, True}
+        whether to use Kahan compensated summation ('sums' accumulator only)
+    checkpoint : :class:`tuna.stats.checkpoint.Checkpoint` instance
+        (default None) saves records regularly, and restores them when
+        resuming an interrupted computation
 
     Notes
     -----
@@ -50,56 +386,57 @@ def set_dynamics(iter_timeseries, single, eval_times):
     UnivariateConditioned instances, one for each condition, plus one
     for the unconditioned data ('master').
     """
+    if isinstance(accumulator, dict):
+        for condition_lab in single._condition_labels:
+            if condition_lab not in accumulator:
+                raise ValueError('No accumulator for condition '
+                                 '{}'.format(condition_lab))
+    elif accumulator not in ACCUMULATORS:
+        raise ValueError('accumulator must be one of '
+                         '{}'.format(sorted(ACCUMULATORS.keys())))
+    else:
+        _get_types(precision)  # check precision before parsing
+        options = {'precision': precision}
+        if compensated:
+            if accumulator != 'sums':
+                raise ValueError('compensated summation is available for '
+                                 "'sums' accumulator only")
+            options['compensated'] = True
     if single.region.name == 'ALL':
         tmin = None
         tmax = None
     else:
         tmin = single.region.tmin
         tmax = single.region.tmax
-    # compute statistics and register in dictionaries
-    # 'all' refers to unconditioned statistics
-    records = {}
-    # add counters for each condition
+    # compute statistics and register in accumulators
+    # 'master' refers to unconditioned statistics
+    accumulators = {}
     for condition_lab in single._condition_labels:
-        rec = {}
-        rec['ones'] = np.zeros(len(eval_times))
-        rec['count_ones'] = np.zeros(len(eval_times), dtype=int)
-        rec['twos'] = np.zeros((len(eval_times), len(eval_times)))
-        rec['count_twos'] = np.zeros((len(eval_times), len(eval_times)),
-                                     dtype=int)
-        records[condition_lab] = rec
+        if isinstance(accumulator, dict):
+            accumulators[condition_lab] = accumulator[condition_lab]
+        else:
+            acc = ACCUMULATORS[accumulator](len(eval_times), **options)
+            accumulators[condition_lab] = acc
+    if checkpoint is not None:
+        checkpoint.attach(accumulators)
     for ts in iter_timeseries:
-        # loop over registered conditions in TimeSeries instance
-        for condition_lab in ts.selections.keys():
-            local = ts.use_condition(condition_label=condition_lab,
-                                     sharp_tleft=tmin, sharp_tright=tmax)
-            if len(local) == 0:
-                continue
-            t, v = map(np.array, zip(*local))
-            update(t, v, eval_times, records[condition_lab])
-
-    # read individual counters and build results as 1d and 2d arrays
-    for ic, condition_lab in enumerate(single._condition_labels):
-        # average values
-        one = records[condition_lab]['ones']
-        count_one = records[condition_lab]['count_ones']
-
-        mean = np.zeros_like(one)
-        ok = np.where(np.logical_not(count_one == 0))
-        mean[ok] = one[ok]/count_one[ok]
-        mean[count_one == 0] = np.nan
-
-        # matrix of covariances
-        two = records[condition_lab]['twos']
-        count_two = records[condition_lab]['count_twos']
-
-        outer = np.zeros_like(two)
-        ok = np.where(np.logical_not(count_two == 0))
-        outer[ok] = two[ok]/count_two[ok]
-        outer[count_two == 0] = np.nan
-        # correct for mean
-        mouter = np.outer(mean, mean)
-        autocov = outer - mouter
+        with profiling.stage('accumulate'):
+            # loop over registered conditions in TimeSeries instance
+            for condition_lab in ts.selections.keys():
+                local = ts.use_condition(condition_label=condition_lab,
+                                         sharp_tleft=tmin, sharp_tright=tmax)
+                if len(local) == 0:
+                    continue
+                t, v = map(np.array, zip(*local))
+                with profiling.stage('interpolate'):
+                    arr = _evaluate(t, v, eval_times)
+                if arr is not None:
+                    accumulators[condition_lab].add(arr)
+
+    # read individual accumulators and build results as 1d and 2d arrays
+    for condition_lab in single._condition_labels:
+        acc = accumulators[condition_lab]
+        count_one, mean, count_two, autocov = acc.finalize()
 
         array = np.zeros(len(eval_times), dtype=[('time', 'f8'),
                                                  ('count', 'u8'),
@@ -115,11 +452,12 @@ def set_dynamics(iter_timeseries, single, eval_times):
         conditioned_single = single._items[condition_lab]
         # associate data
         conditioned_single.bind(array, count_two, autocov)
+        conditioned_single.accumulator = acc
     return
 
 
-def update(time_array, value_array, eval_times, rec):
-    """Update counters one and two.
+def _evaluate(time_array, value_array, eval_times):
+    """Evaluate timeseries at eval_times by linear interpolation.
 
     Parameters
     ----------
@@ -128,20 +466,23 @@ def update(time_array, value_array, eval_times, rec):
     value_array : 1d ndarray
         array of values, same size as time_array
     eval_times : 1d ndarray
-        times at which functions are evaluated by interpolation method
-    rec: dict
-        dictionary that stores arrays to count and save one-, and two-point
-        estimates, and that are updated with 't, val' timeseries sample.
+        times at which values are evaluated
+
+    Returns
+    -------
+    1d ndarray or None
+        NaNs are reported where evaluation is not possible; None is returned
+        when no value can be evaluated
     """
     # impossible to interpolate if less than 2 points
     if len(time_array) == 0:
-        return
+        return None
     # clean NaNs from values
     ok = np.where(np.logical_not(np.isnan(value_array)))
     t = time_array[ok]
     val = value_array[ok]
     if len(t) == 0:
-        return
+        return None
     if len(t) == 1:
         tt = t[0]
         ok = np.where(eval_times == tt)
@@ -154,6 +495,27 @@ def update(time_array, value_array, eval_times, rec):
         arr = f(eval_times)
     # check whether it's not all NaNs
     if np.all(np.isnan(arr)):
+        return None
+    return arr
+
+
+def update(time_array, value_array, eval_times, rec):
+    """Update counters one and two.
+
+    Parameters
+    ----------
+    time_array : 1d ndarray
+        array of times
+    value_array : 1d ndarray
+        array of values, same size as time_array
+    eval_times : 1d ndarray
+        times at which functions are evaluated by interpolation method
+    rec: dict
+        dictionary that stores arrays to count and save one-, and two-point
+        estimates, and that are updated with 't, val' timeseries sample.
+    """
+    arr = _evaluate(time_array, value_array, eval_times)
+    if arr is None:
         return
     # find where it's not NaNs
     ok = np.where(np.logical_not(np.isnan(arr)))
@@ -174,7 +536,7 @@ def update(time_array, value_array, eval_times, rec):
 # %% Computation of the stationary autocorrelation function
 def set_stationary_autocorrelation(iter_timeseries, univariate, stationary,
                                    tmin=None, tmax=None, adjust_mean='global',
-                                   disjoint=True):
+                                   disjoint=True, checkpoint=None):
     """Computes autocorrelation for stationary processes.
 
     Using univariate and parsing iter_timeseries, it computes autocorrelation
@@ -198,6 +560,9 @@ def set_stationary_autocorrelation(iter_timeseries, univariate, stationary,
         how to substract average values: globally, or locally;
         use globally when local statistics are not sufficient,
         use locally is local statistics are sufficient.
+    checkpoint : :class:`tuna.stats.checkpoint.Checkpoint` instance
+        (default None) saves records regularly, and restores them when
+        resuming an interrupted computation
     """
     recs = {}  # one record per condition (including 'master")
 
@@ -234,25 +599,28 @@ def set_stationary_autocorrelation(iter_timeseries, univariate, stationary,
     # store values
     df = None
     dfs = []
+    if checkpoint is not None:
+        checkpoint.attach(recs, dfs)
     # loop through timeseries
     for ts in iter_timeseries:
-        df = ts.to_dataframe()
-        df = df[np.logical_and(df.time >= tmin, df.time <= tmax)]
-        # reindex for concatenating
+        with profiling.stage('accumulate'):
+            df = ts.to_dataframe()
+            df = df[np.logical_and(df.time >= tmin, df.time <= tmax)]
+            # reindex for concatenating
 #        if dfs:
 #            df.set_index([range(dfs[-1].index[-1] + 1, dfs[-1].index[-1] + 1 + len(df))])
-        dfs.append(df)
-        for condition_lab in ts.selections.keys():
-            local = ts.use_condition(condition_label=condition_lab)
-            if len(local) == 0:
-                continue
-            t, v = map(np.array, zip(*local))
-            # get only times within valid window
-            boo = np.logical_and(t >= tmin, t <= tmax)
-            rec = recs[condition_lab]  # this is where results are recorded
-            local_mean = local_means[condition_lab]  # local means
-            # update correlation
-            update_stationary(t[boo], v[boo], eval_times, local_mean, rec, disjoint)
+            dfs.append(df)
+            for condition_lab in ts.selections.keys():
+                local = ts.use_condition(condition_label=condition_lab)
+                if len(local) == 0:
+                    continue
+                t, v = map(np.array, zip(*local))
+                # get only times within valid window
+                boo = np.logical_and(t >= tmin, t <= tmax)
+                rec = recs[condition_lab]  # this is where results are recorded
+                local_mean = local_means[condition_lab]  # local means
+                # update correlation
+                update_stationary(t[boo], v[boo], eval_times, local_mean, rec, disjoint)
 
     df = pd.concat(dfs, ignore_index=True)
     stationary.dataframe = df
@@ -351,7 +719,8 @@ def update_stationary(time_array, value_array, eval_times, local_mean, record,
 # %% CROSS-CORRELATIONS
 
 # UPDATING CROSS-CORRELATION COMPUTATION
-def set_crosscorrelation(iter_timeseries, row_univ, col_univ, two):
+def set_crosscorrelation(iter_timeseries, row_univ, col_univ, two,
+                         checkpoint=None):
     """Central function that computes cross-correlation matrix.
 
     It first defines dictionaries where rounded times are keys and values are
@@ -367,6 +736,9 @@ def set_crosscorrelation(iter_timeseries, row_univ, col_univ, two):
     col_univ : :class:`Univariate` instance
         univariate instance corresponding to the second observable :math:`y`
     two : TwoObservable instance
+    checkpoint : :class:`tuna.stats.checkpoint.Checkpoint` instance
+        (default None) saves records regularly, and restores them when
+        resuming an interrupted computation
 
     Notes
     -----
@@ -406,21 +778,24 @@ def set_crosscorrelation(iter_timeseries, row_univ, col_univ, two):
         rec['cross'] = np.zeros((len(row_eval_times), len(col_eval_times)))
         rec['square'] = np.zeros((len(row_eval_times), len(col_eval_times)))
         records[condition_lab] = rec
+    if checkpoint is not None:
+        checkpoint.attach(records)
 
     for row_ts, col_ts in iter_timeseries:
-        # loop over registered conditions in TimeSeries instance
-        for condition_lab in cdt_labs:
-            row_local = row_ts.use_condition(condition_label=condition_lab,
-                                             sharp_tleft=row_univ.region.tmin,
-                                             sharp_tright=row_univ.region.tmax)
-            col_local = col_ts.use_condition(condition_label=condition_lab,
-                                             sharp_tleft=col_univ.region.tmin,
-                                             sharp_tright=col_univ.region.tmax)
-            rec = records[condition_lab]
-            row_mean = means[condition_lab]['row']
-            col_mean = means[condition_lab]['col']
-            update_2(row_local, col_local, row_eval_times, col_eval_times,
-                     row_mean, col_mean, rec)
+        with profiling.stage('accumulate'):
+            # loop over registered conditions in TimeSeries instance
+            for condition_lab in cdt_labs:
+                row_local = row_ts.use_condition(condition_label=condition_lab,
+                                                 sharp_tleft=row_univ.region.tmin,
+                                                 sharp_tright=row_univ.region.tmax)
+                col_local = col_ts.use_condition(condition_label=condition_lab,
+                                                 sharp_tleft=col_univ.region.tmin,
+                                                 sharp_tright=col_univ.region.tmax)
+                rec = records[condition_lab]
+                row_mean = means[condition_lab]['row']
+                col_mean = means[condition_lab]['col']
+                update_2(row_local, col_local, row_eval_times, col_eval_times,
+                         row_mean, col_mean, rec)
 
     # read individual counters and build results as 2d arrays
     for ic, condition_lab in enumerate(cdt_labs):
@@ -521,8 +896,45 @@ def set_stationary_crosscorrelation(iter_timeseries,
                                     row_univariate, col_univariate, stationary,
                                     tmin=None, tmax=None,
                                     adjust_mean='global',
-                                    disjoint=True):
-    """MEN AT WORK HERE"""
+                                    disjoint=True, engine='direct',
+                                    checkpoint=None):
+    """Computes cross-correlation for stationary processes.
+
+    Using univariates and parsing iter_timeseries, it computes the
+    cross-correlation function in stationary hypothesis. Result is stored in
+    stationary, a StationaryBivariate instance, for each common condition.
+
+    Parameters
+    ----------
+    iter_timeseries : iterator over couple of TimeSeries instances
+        see utils.iter_timeseries_2
+    row_univariate : :class:`Univariate` instance
+        used to access average values of first observable
+    col_univariate : :class:`Univariate` instance
+        used to access average values of second observable
+    stationary : :class:`StationaryBivariate` instance
+        the one to be filled
+    tmin : float
+        lower bound for stationarity time range
+    tmax : float
+        upper bound for stationarity time range
+    adjust_mean : str {'global', 'local'}
+        how to substract average values: globally, or locally
+    disjoint : bool {True, False}
+        whether to take disjoint time segments to evaluate statistics
+    engine : str {'direct', 'fft'}
+        'direct' sums diagonals of outer products, O(N^2) per lineage;
+        'fft' correlates arrays and validity masks through FFTs,
+        O(N log N) per lineage. The 'fft' engine cannot subsample
+        disjoint segments and requires disjoint=False.
+    checkpoint : :class:`tuna.stats.checkpoint.Checkpoint` instance
+        (default None) saves records regularly, and restores them when
+        resuming an interrupted computation
+    """
+    if engine not in ENGINES:
+        raise ValueError('engine must be one of {}'.format(ENGINES))
+    if engine == 'fft' and disjoint:
+        raise ValueError("engine 'fft' requires disjoint=False")
     # set condition list that match between both single instances
     col_obs = col_univariate.obs
 
@@ -545,8 +957,6 @@ def set_stationary_crosscorrelation(iter_timeseries,
     bwd = eval_times - eval_times[-1]
     fwd = eval_times - eval_times[0]
     time_intervals = np.concatenate([bwd[:-1], fwd])
-    print(eval_times)
-    print(time_intervals)
 
     means = {}
     recs = {}
@@ -563,12 +973,11 @@ def set_stationary_crosscorrelation(iter_timeseries,
             # construct dict of means indexed over indexified times
             local_mean = np.zeros_like(eval_times)
             if adjust_mean == 'local':
-                local_mean = ms[window]
+                local_mean = ms
             elif adjust_mean == 'global':
                 agg_mean = np.nansum(co * ms)/np.nansum(co)
                 local_mean = agg_mean * np.ones(len(eval_times))
             means[cdt_lab][index] = local_mean
-            print(local_mean)
 
         # initialize rec
         recs[cdt_lab] = {'counts': np.zeros(len(time_intervals), dtype=int),
@@ -578,6 +987,8 @@ def set_stationary_crosscorrelation(iter_timeseries,
     # store values
     df = None
     dfs = []
+    if checkpoint is not None:
+        checkpoint.attach(recs, dfs)
 
     # loop through timeseries
     for row_ts, col_ts in iter_timeseries:
@@ -610,9 +1021,13 @@ def set_stationary_crosscorrelation(iter_timeseries,
             row_mean = means[condition_lab]['row']
             col_mean = means[condition_lab]['col']
             # update correlation
-            update_stationary_cross(row_local, col_local, eval_times,
-                                    row_mean, col_mean, rec,
-                                    disjoint=disjoint)
+            if engine == 'fft':
+                update_stationary_cross_fft(row_local, col_local, eval_times,
+                                            row_mean, col_mean, rec)
+            else:
+                update_stationary_cross(row_local, col_local, eval_times,
+                                        row_mean, col_mean, rec,
+                                        disjoint=disjoint)
     df = pd.concat(dfs, ignore_index=True)
     stationary.dataframe = df
 
@@ -643,64 +1058,87 @@ def set_stationary_crosscorrelation(iter_timeseries,
     return
 
 
-def update_stationary_cross(row_timeseries, col_timeseries, eval_times,
-                            row_mean, col_mean, record, disjoint=True):
-    """Update counts and correlation value for stationary cross-correlation
+def _interpolate_centered(timeseries, eval_times, mean):
+    """Evaluate (time, value) couples on eval_times and substract mean.
 
     Parameters
     ----------
+    timeseries : structured array of couples (time, value)
+    eval_times : 1d ndarray
+        times at which timeseries is evaluated by linear interpolation
+    mean : 1d ndarray
+        average values to substract (same length as eval_times)
 
+    Returns
+    -------
+    1d ndarray or None
+        NaNs are reported where evaluation is not possible; None is returned
+        when no value can be evaluated
     """
-    if len(row_timeseries) == 0 or len(col_timeseries) == 0:
-        return
+    if len(timeseries) == 0:
+        return None
     # clean NaNs
-    x, y = map(np.array, zip(*row_timeseries))
-    ok = np.where(np.logical_not(np.isnan(y)))
-    row_ts = row_timeseries[ok]
-    x, y = map(np.array, zip(*col_timeseries))
+    x, y = map(np.array, zip(*timeseries))
     ok = np.where(np.logical_not(np.isnan(y)))
-    col_ts = col_timeseries[ok]
-    if len(row_ts) == 0 or len(col_ts) == 0:
-        return
+    ts = timeseries[ok]
+    if len(ts) == 0:
+        return None
     # length 1 : take only the value if in eval_times
-    if len(row_ts) == 1:
-        t, val = row_ts[0]
+    if len(ts) == 1:
+        t, val = ts[0]
         ok = np.where(eval_times == t)
-        row_arr = np.zeros(len(eval_times))
-        row_arr[:] = np.nan  # all NaNs but one
-        row_arr[ok] = val - row_mean[ok]
+        arr = np.zeros(len(eval_times))
+        arr[:] = np.nan  # all NaNs but one
+        arr[ok] = val - mean[ok]
     else:
-        row_t, row_val = map(np.array, zip(*row_ts))
-        row_f = interp1d(row_t, row_val, kind='linear',
-                         assume_sorted=True,  bounds_error=False)
-        row_arr = row_f(eval_times) - row_mean
+        t, val = map(np.array, zip(*ts))
+        f = interp1d(t, val, kind='linear',
+                     assume_sorted=True, bounds_error=False)
+        arr = f(eval_times) - mean
     # if all NaNs, nothing to do
-    if np.all(np.isnan(row_arr)):
+    if np.all(np.isnan(arr)):
+        return None
+    return arr
+
+
+def _first_valid_index(arr):
+    """Index of first non-NaN value in arr (assumed not to be all NaNs)"""
+    return np.flatnonzero(np.logical_not(np.isnan(arr)))[0]
+
+
+def update_stationary_cross(row_timeseries, col_timeseries, eval_times,
+                            row_mean, col_mean, record, disjoint=True):
+    """Update counts and correlation value for stationary cross-correlation
+
+    Direct method: diagonals of the outer product between evaluated row and
+    column arrays are summed, which costs O(N^2) for N evaluation times.
+
+    Parameters
+    ----------
+    row_timeseries : structured array of couples (time, value)
+        corresponding to first ('row') observable
+    col_timeseries : structured array of couples (time, value)
+        corresponding to second ('column') observable
+    eval_times : 1d ndarray
+        times at which both timeseries are evaluated
+    row_mean : 1d ndarray
+        average values for row observable (same length as eval_times)
+    col_mean : 1d ndarray
+        average values for col observable (same length as eval_times)
+    record : dict
+        keys are 'counts', 'first', 'second'; values are 1d ndarrays of length
+        2*len(eval_times) - 1, indexed by time intervals -n, ..., 0, ..., n
+    disjoint : bool {True, False}
+        whether to take disjoint time segments to evaluate statistics
+    """
+    row_arr = _interpolate_centered(row_timeseries, eval_times, row_mean)
+    if row_arr is None:
         return
-    if len(col_ts) == 1:
-        t, val = col_ts[0]
-        ok = np.where(eval_times == t)
-        col_arr = np.zeros(len(eval_times))
-        col_arr[:] = np.nan  # all NaNs but one
-        col_arr[ok] = val - col_mean[ok]
-    else:
-        col_t, col_val = map(np.array, zip(*col_ts))
-        col_f = interp1d(col_t, col_val, kind='linear',
-                         assume_sorted=True, bounds_error=False)
-        col_arr = col_f(eval_times) - col_mean
-    # if all NaNs, nothing to do
-    if np.all(np.isnan(col_arr)):
+    col_arr = _interpolate_centered(col_timeseries, eval_times, col_mean)
+    if col_arr is None:
         return
-    # get row first index for which non-nan value
-    for row_offset in range(len(row_arr)):
-        if not np.isnan(row_arr[row_offset]):
-            break
-    # get column first index for which non-nan value
-    for col_offset in range(len(col_arr)):
-        if not np.isnan(col_arr[col_offset]):
-            break
     # find non-nan square matrix
-    offset = np.amax([row_offset, col_offset])
+    offset = max(_first_valid_index(row_arr), _first_valid_index(col_arr))
     outer = np.outer(row_arr, col_arr)
     # eval_times : 0, 1, ..., n
     # time_intervals : -n, -n+1, ..., -1, 0, 1, ..., n
@@ -720,6 +1158,72 @@ def update_stationary_cross(row_timeseries, col_timeseries, eval_times,
     return
 
 
+def _fft_crosscorrelate(row_arr, col_arr):
+    """Sums of row_arr[i] * col_arr[i + k] for k = -n, ..., n.
+
+    Arrays must have the same length n + 1, and must not contain NaNs.
+    Correlation is computed through real FFTs with zero-padding, in
+    O(n log n) operations.
+    """
+    size = len(row_arr)
+    nfft = 1
+    while nfft < 2 * size - 1:
+        nfft *= 2
+    row_fft = np.fft.rfft(row_arr, nfft)
+    col_fft = np.fft.rfft(col_arr, nfft)
+    corr = np.fft.irfft(np.conj(row_fft) * col_fft, nfft)
+    # negative lags are wrapped at the end
+    return np.concatenate([corr[nfft - size + 1:], corr[:size]])
+
+
+def update_stationary_cross_fft(row_timeseries, col_timeseries, eval_times,
+                                row_mean, col_mean, record):
+    """Update counts and correlation value using FFT correlations
+
+    Same result as :func:`update_stationary_cross` with disjoint=False,
+    within float tolerance, at a O(N log N) cost for N evaluation times.
+    Validity counts are obtained by correlating masks of non-NaN values,
+    first and second moments by correlating NaN-zeroed (squared) arrays.
+
+    Parameters
+    ----------
+    row_timeseries : structured array of couples (time, value)
+        corresponding to first ('row') observable
+    col_timeseries : structured array of couples (time, value)
+        corresponding to second ('column') observable
+    eval_times : 1d ndarray
+        times at which both timeseries are evaluated
+    row_mean : 1d ndarray
+        average values for row observable (same length as eval_times)
+    col_mean : 1d ndarray
+        average values for col observable (same length as eval_times)
+    record : dict
+        keys are 'counts', 'first', 'second'; values are 1d ndarrays of length
+        2*len(eval_times) - 1, indexed by time intervals -n, ..., 0, ..., n
+    """
+    row_arr = _interpolate_centered(row_timeseries, eval_times, row_mean)
+    if row_arr is None:
+        return
+    col_arr = _interpolate_centered(col_timeseries, eval_times, col_mean)
+    if col_arr is None:
+        return
+    # the direct method discards pairs whose lower index is below the first
+    # index where both arrays have been evaluated: do the same
+    offset = max(_first_valid_index(row_arr), _first_valid_index(col_arr))
+    row_mask = np.logical_not(np.isnan(row_arr))
+    col_mask = np.logical_not(np.isnan(col_arr))
+    row_mask[:offset] = False
+    col_mask[:offset] = False
+    row_vals = np.where(row_mask, row_arr, 0.)
+    col_vals = np.where(col_mask, col_arr, 0.)
+    counts = _fft_crosscorrelate(row_mask.astype(float),
+                                 col_mask.astype(float))
+    record['counts'] += np.rint(counts).astype(int)
+    record['first'] += _fft_crosscorrelate(row_vals, col_vals)
+    record['second'] += _fft_crosscorrelate(row_vals**2, col_vals**2)
+    return
+
+
 def get_stat_from_dynamics(singlecdt, tmin=None, tmax=None):
     """Computes stationary autocorrelation vector from autocorr matrix.
 
@@ -773,16 +1277,18 @@ def get_stat_from_dynamics(singlecdt, tmin=None, tmax=None):
     cts = cts[sl, sl]
     # how many time-points
     nframes = len(times)
-    all_counts = np.zeros(nframes, dtype=np.int)
-    res = np.zeros(nframes, dtype=np.float)
-    dts = np.zeros(nframes, dtype=np.float)
-    col = np.zeros(nframes, dtype=np.int16)
-    col[-1] = 1  # initialisation
+    all_counts = np.zeros(nframes, dtype=int)
+    res = np.zeros(nframes, dtype=float)
+    # k-th upper diagonals store samples separated by time interval k
     for k in range(nframes):
-        col[k] = 1
-        col[k-1] -= 1
-        forward = triu(toeplitz(col))
-        all_counts[k] = np.sum(forward * cts)
-        res[k] = np.sum(forward * cts * autocorr)/all_counts[k]
-        dts[k] = times[k] - times[0]
+        diag_counts = np.diagonal(cts, offset=k)
+        diag_autocorr = np.diagonal(autocorr, offset=k)
+        all_counts[k] = np.sum(diag_counts)
+        # entries without samples do not contribute (autocorr is NaN there)
+        ok = diag_counts > 0
+        if all_counts[k] > 0:
+            res[k] = np.sum(diag_counts[ok] * diag_autocorr[ok])/all_counts[k]
+        else:
+            res[k] = np.nan
+    dts = times - times[0]
     return dts, all_counts, res
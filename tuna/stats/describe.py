@@ -9,181 +9,228 @@ stats module
 
 describe.py
 -----------
+
+Counting cells, trees and lineages of an experiment under several filter
+sets.
+
+Each container is read once. Its trees are stored as a :class:`Forest`
+(parent arrays), cell attributes used by filters are collected once in a
+:class:`CellTable`, and every filter set is evaluated as a vectorized mask
+over cells. Histograms are computed from the filtered forests without
+copying nor modifying containers. Containers can be processed in parallel.
+
+Counts are reported as a tidy table (one row per filter set, object, size).
 """
+from __future__ import print_function
 
-from copy import deepcopy
+import multiprocessing
+import numpy as np
+import pandas as pd
 
-from ..core import Container
+from tuna.base.experiment import Experiment
+from tuna.base.forest import Forest
+from tuna.filters.main import FilterSet, FilterAND
+from tuna.filters.compiled import CellTable, compile_cell_filter
 
-from .. import filters
-from ..io import fancy
+# counted objects, and size used for histograms
+WHATS = ('cell', 'tree', 'lineage')  # number of frames, depth, number of cells
+COLUMNS = ['filterset', 'what', 'size', 'count']
 
 
-def cell_count(container):
-    """Count the number of cells in container.
+def _as_filterset(filt):
+    "Cell filters are embedded in a FilterSet"
+    if isinstance(filt, FilterSet):
+        return filt
+    return FilterSet(filtercell=filt)
 
-    Argument
-    --------
-    container -- Container instance
 
-    Returns
-    -------
-    counter -- dictionary
-       key: number of frames
-       value: number od cells having `key` frames
-    """
-    cells = [node for tree in container.trees for node in tree.all_nodes()]
-    counter = {}
-    for ce in cells:
-        if ce.data is None:
-            size = 0
-        else:
-            size = len(ce.data)
-        if size in counter.keys():
-            counter[size] += 1
-        else:
-            counter[size] = 1
-    return counter
-
-
-def tree_count(container):
-    """Count the number of trees in container.
-
-    Argument
-    --------
-    container -- Container instance
+def _histogram(values):
+    values, counts = np.unique(np.asarray(values, dtype=int),
+                               return_counts=True)
+    return zip(values, counts)
+
+
+def count_container(container, fsets, exonerate_root=True):
+    """Count cells, trees and lineages of container under each filter set
+
+    Parameters
+    ----------
+    container : :class:`Container` instance
+        trees must be built
+    fsets : list of :class:`FilterSet` instances
+        cell and container filters are used
+    exonerate_root : bool (default True)
+        whether root cells are kept without being tested
 
     Returns
     -------
-    counter -- dictionary
-       key: tree depth
-       value: number of trees having depth `key`
+    records : list of tuples (filterset index, what, size, count)
+        what is one of 'cell' (size: number of frames), 'tree' (size: tree
+        depth), 'lineage' (size: number of cells in lineage, for a random
+        independent decomposition)
     """
-    counter = {}
-    for tr in container.trees:
-        size = tr.depth()
-        if size in counter.keys():
-            counter[size] += 1
-        else:
-            counter[size] = 1
-    return counter
+    forest = Forest.from_trees(container.trees)
+    table = CellTable(forest.cells, container=container)
+    n_frames = table.column('n_frames')
+    records = []
+    for index, fset in enumerate(fsets):
+        if not fset.container_filter(container):
+            continue
+        keep = compile_cell_filter(fset.cell_filter).evaluate(table)
+        if exonerate_root:
+            keep[forest.get_roots()] = True
+        filtered = forest.filtered(keep)
+        sizes = {'cell': n_frames[keep],
+                 'tree': filtered.get_tree_depths(),
+                 'lineage': filtered.get_lineage_sizes()}
+        for what in WHATS:
+            for size, count in _histogram(sizes[what]):
+                records.append((index, what, int(size), int(count)))
+    return records
+
+
+# worker state, set once per process
+_WORKER = {}
+
+
+def _init_worker(path, filetype, fsets, exonerate_root):
+    _WORKER['exp'] = Experiment(path, filetype=filetype)
+    _WORKER['fsets'] = fsets
+    _WORKER['exonerate_root'] = exonerate_root
+    return
+
 
+def _count_label(label):
+    container = _WORKER['exp'].get_container(label, read=True, build=True)
+    return count_container(container, _WORKER['fsets'],
+                           exonerate_root=_WORKER['exonerate_root'])
 
-def lineage_count(container):
-    """Count the number of independent lineages in container.
 
-    Argument
-    --------
-    container -- Container instance
+def count_experiment(exp, fsets, size=None, processes=1,
+                     exonerate_root=True):
+    """Count cells, trees and lineages in experiment under each filter set
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+    fsets : list of :class:`FilterSet` or cell filter instances
+    size : int (default None)
+        number of containers to browse, None for all
+    processes : int (default 1)
+        number of worker processes; containers are processed in parallel,
+        each worker reading container files (text experiments only)
+    exonerate_root : bool (default True)
+        whether root cells are kept without being tested
 
     Returns
     -------
-    counter -- dictionary
-       key: number of cells within lineage
-       value: number of lineages having `key` cellsl
+    pandas.DataFrame
+        tidy table with columns 'filterset' (index in fsets), 'what',
+        'size', 'count', summed over containers
+
+    Raises
+    ------
+    ValueError
+        when processes > 1 and experiment is not read from text files
+        (e.g. simulations, whose containers are not stored in files)
     """
-    counter = {}
-    for tree in container.trees:
-        idseqs = tree.decompose()
-        for idseq in idseqs:
-            size = len(idseq)
-            if size in counter.keys():
-                counter[size] += 1
-            else:
-                counter[size] = 1
-    return counter
-
-
-def icount(container, what='cell'):
-    if what == 'cell':
-        func = cell_count
-    elif what == 'tree':
-        func = tree_count
-    elif what == 'lineage':
-        func = lineage_count
-    return func(container)
-
-
-def update_counter(main, add):
-    for key, val in add.items():
-        if key in main.keys():
-            main[key] += val
-        else:
-            main[key] = val
-    return
+    fsets = [_as_filterset(filt) for filt in fsets]
+    records = []
+    if processes > 1:
+        if exp.filetype != 'text':
+            raise ValueError('counting with processes > 1 requires an '
+                             "experiment of filetype 'text', not "
+                             "'{}': use processes=1".format(exp.filetype))
+        labels = exp.containers[:]
+        if size is not None:
+            labels = labels[:size]
+        initargs = (exp.abspath, exp.filetype, fsets, exonerate_root)
+        pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                    initargs=initargs)
+        try:
+            for recs in pool.imap(_count_label, labels):
+                records.extend(recs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for container in exp.iter_container(size=size):
+            records.extend(count_container(container, fsets,
+                                           exonerate_root=exonerate_root))
+    df = pd.DataFrame(records, columns=COLUMNS)
+    df = df.groupby(COLUMNS[:3], as_index=False)['count'].sum()
+    return df
 
 
-def count_container(container, filts):
-    counter = {'cell': [{} for fi in filts],
-               'tree': [{} for fi in filts],
-               'lineage': [{} for fi in filts]
-               }
-    for index, filt in enumerate(filts):
-        fcontainer = deepcopy(container)
-        fcontainer.postfilter(boofunc=filt, exonerate_root=True)
-        for obj, counters in counter.items():
-            update_counter(counters[index], icount(fcontainer, what=obj))
-        del fcontainer
-    return counter
+def summarize(counts, fsets=None):
+    """Total counts of cells, trees and lineages per filter set
 
+    Parameters
+    ----------
+    counts : pandas.DataFrame
+        tidy counts, as returned by :func:`count_experiment`
+    fsets : list of :class:`FilterSet` instances (default None)
+        when given, labels filter sets
 
-def count_experiment(exp, filts, testing=True):
-    """Count lineages and samples.
+    Returns
+    -------
+    pandas.DataFrame
+        indexed by filter set, one column per counted object
     """
-    if testing:
-        upper = 20
-        print 'Counting features in testing mode (looping over {} containers)'.format(upper)
-    else:
-        upper = None
-    counter = {'cell': [{} for fi in filts],
-               'tree': [{} for fi in filts],
-               'lineage': [{} for fi in filts]
-               }
-
-    for ifn, container in enumerate(exp.iter_container(size=upper)):
-        ccount = count_container(container, filts)
-        for obj, counters in ccount.items():
-            for index, cts in enumerate(counters):
-                update_counter(counter[obj][index], cts)
-    return counter
-
-
-def describe(exp, seqfilters=[], testing=True):
-    # setting filter set
-    nofilt = filters.cells.FilterCellAny()
-    filts = [nofilt] + seqfilters
-    if len(seqfilters) > 1:
-        combfilt = filters.cells.FilterAND(seqfilters)
-        filts += [combfilt]
-
-    counter = count_experiment(exp, filts=filts, testing=testing)
-
-    fancy.pst('Counting cells, trees, lineages')
-    for what, count in counter.items():
-        store_tot = []
-        # printing result
-        fancy.title('Counting {}s for each filter'.format(what))
-        for index, filt in enumerate(filts):
-            with fancy.indent(4):
-                fancy.title('{}. filter: {}'.format(index, filt), level=1)
-                mat = [['size', 'count']]
-                tot = 0
-                for key, val in count[index].items():
-                    tot += val
-                    mat.append('{}\t{}'.format(key, val).split('\t'))
-                store_tot.append(tot)
-                mat += [[' ', ' '], ['Total', '{}'.format(tot)]]
-                fancy.table(mat, header=False, col_sep=1, transpose=True)
-
-        # and the totals table
-        with fancy.indent(2):
-            fancy.title('total counts of {}s per filter'.format(what), level=2)
-            mat = [['filter', 'total count']]
-            for index, filt in enumerate(filts):
-                mat.append('{}. {}\t{}'.format(index,
-                                               repr(filt)[:25],
-                                               store_tot[index]
-                                               ).split('\t')
-                           )
-            fancy.table(mat, header=True)
-    return
+    totals = counts.pivot_table(index='filterset', columns='what',
+                                values='count', aggfunc='sum', fill_value=0)
+    totals = totals.reindex(columns=list(WHATS), fill_value=0)
+    if fsets is not None:
+        totals = totals.reindex(range(len(fsets)), fill_value=0)
+        labels = []
+        for fset in fsets:
+            fset = _as_filterset(fset)
+            label = fset.label
+            if label is None:
+                label = str(fset.cell_filter).split('\n')[0]
+            labels.append(label)
+        totals.insert(0, 'label', labels)
+    totals.columns.name = None
+    return totals
+
+
+def describe(exp, seqfilters=[], size=None, processes=1):
+    """Print counts of cells, trees, lineages for each filter
+
+    Parameters
+    ----------
+    exp : :class:`Experiment` instance
+    seqfilters : list of cell filters or :class:`FilterSet` instances
+        an unfiltered count is added first; when several cell filters are
+        given, their combination is added last
+    size : int (default None)
+        number of containers to browse, None for all
+    processes : int (default 1)
+        number of worker processes
+
+    Returns
+    -------
+    counts : pandas.DataFrame
+        tidy counts, see :func:`count_experiment`
+    """
+    fsets = [FilterSet(label='no filter')]
+    fsets += [_as_filterset(filt) for filt in seqfilters]
+    cell_filters = [filt for filt in seqfilters
+                    if not isinstance(filt, FilterSet)]
+    if len(cell_filters) > 1:
+        fsets.append(FilterSet(label='combined filters',
+                               filtercell=FilterAND(cell_filters)))
+    counts = count_experiment(exp, fsets, size=size, processes=processes)
+
+    print('Counting cells, trees, lineages')
+    for what in WHATS:
+        print('\nCounting {}s for each filter (size: {})'.format(
+            what, {'cell': 'frames', 'tree': 'depth',
+                   'lineage': 'cells'}[what]))
+        sub = counts[counts['what'] == what]
+        hist = sub.pivot_table(index='size', columns='filterset',
+                               values='count', aggfunc='sum', fill_value=0)
+        print(hist.to_string())
+    print('\nTotal counts per filter')
+    print(summarize(counts, fsets).to_string())
+    return counts
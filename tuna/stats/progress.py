@@ -0,0 +1,244 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+stats module
+~~~~~~~~~~~~
+
+progress.py
+-----------
+
+Progress and throughput reporting for computations that browse lineages.
+
+A :class:`Progress` instance counts containers, lineages and frames
+processed, and regularly reports counts, rates per second, and estimated
+time of arrival to a callback. Totals are read upfront from the container
+index (see :mod:`tuna.io.index`), that counts rows, cells and lineages of
+each container file without building cells.
+
+Stats API functions accept a `progress` argument:
+
+>>> univ = compute_univariate_dynamics(parser, obs, progress=True)
+
+prints a report line every second;
+
+>>> univ = compute_univariate_dynamics(parser, obs, progress=my_callback)
+
+calls my_callback(report) instead, where report is a dict (see
+:meth:`Progress.report`).
+"""
+from __future__ import print_function
+
+import sys
+import datetime
+import timeit
+
+from tuna.io.index import get_container_index
+
+WHATS = ('containers', 'lineages', 'frames')
+
+
+def get_totals(parser, size=None, labels=None):
+    """Numbers of containers, lineages and frames to be processed
+
+    Totals are computed before filtering: they are upper bounds when
+    filters reject some containers, cells or lineages.
+
+    Parameters
+    ----------
+    parser : :class:`Parser` instance
+    size : int (default None)
+        limit on the number of lineages
+    labels : list of str (default None)
+        labels of containers to be processed (e.g. remaining containers of
+        a resumed computation), None for all
+
+    Returns
+    -------
+    dict
+        keys are 'containers', 'lineages', 'frames'; values are None when
+        unknown
+    """
+    exp = parser.experiment
+    totals = dict.fromkeys(WHATS)
+    if exp.filetype == 'text':
+        index = get_container_index(exp)
+        if labels is not None:
+            index = index[index.index.isin(labels)]
+        totals['containers'] = len(index)
+        totals['frames'] = int(index['nrows'].sum())
+        if not index['nlineages'].isnull().any():
+            totals['lineages'] = int(index['nlineages'].sum())
+    elif labels is not None:
+        totals['containers'] = len(labels)
+    elif hasattr(exp, 'simuParams'):
+        totals['containers'] = exp.simuParams.nbr_container
+    if size is not None:
+        totals['lineages'] = min(size, totals['lineages'] or size)
+        # frames cannot be estimated
+        totals['frames'] = None
+    return totals
+
+
+def print_report(report, stream=None):
+    """Default callback: prints report on a single, updated line"""
+    if stream is None:
+        stream = sys.stderr
+    items = []
+    for what in WHATS:
+        item = '{} {}'.format(what, report[what])
+        if report['total_' + what] is not None:
+            item += '/{}'.format(report['total_' + what])
+        if what != 'containers':
+            item += ' ({:.1f}/s)'.format(report['rate_' + what])
+        items.append(item)
+    if report['eta'] is not None:
+        eta = datetime.timedelta(seconds=int(round(report['eta'])))
+        items.append('ETA {}'.format(eta))
+    elapsed = datetime.timedelta(seconds=int(round(report['elapsed'])))
+    items.append('elapsed {}'.format(elapsed))
+    end = '\n' if report['done'] else ''
+    stream.write('\r' + ' | '.join(items) + end)
+    stream.flush()
+    return
+
+
+class Progress(object):
+    """Counts containers, lineages and frames processed by a computation
+
+    Parameters
+    ----------
+    totals : dict (default None)
+        totals of 'containers', 'lineages', 'frames' (see :func:`get_totals`)
+    callback : callable (default None)
+        called with a report dict (see :meth:`report`); default prints on
+        standard error
+    interval : float (default 1.)
+        minimal time, in seconds, between two reports
+    """
+
+    def __init__(self, totals=None, callback=None, interval=1.):
+        if totals is None:
+            totals = dict.fromkeys(WHATS)
+        self.totals = totals
+        if callback is None:
+            callback = print_report
+        self.callback = callback
+        self.interval = interval
+        self.counts = dict.fromkeys(WHATS, 0)
+        self._container = None
+        self._start = None
+        self._last = None
+        return
+
+    def start(self):
+        """Reset counts and starts timer"""
+        self.counts = dict.fromkeys(WHATS, 0)
+        self._container = None
+        self._start = timeit.default_timer()
+        self._last = self._start
+        return
+
+    def add_lineage(self, lineage):
+        """Count lineage, its frames, and its container when it is new
+
+        Parameters
+        ----------
+        lineage : :class:`Lineage` instance
+        """
+        if self._start is None:
+            self.start()
+        colony = lineage.colony
+        if colony.container is not self._container:
+            self._container = colony.container
+            self.counts['containers'] += 1
+        self.counts['lineages'] += 1
+        frames = 0
+        for cid in lineage.idseq:
+            data = colony.get_node(cid).data
+            if data is not None:
+                frames += len(data)
+        self.counts['frames'] += frames
+        now = timeit.default_timer()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.callback(self.report())
+        return
+
+    def finish(self):
+        """Send final report"""
+        if self._start is None:
+            self.start()
+        self.callback(self.report(done=True))
+        return
+
+    def report(self, done=False):
+        """Current counts, rates and estimated time of arrival
+
+        Returns
+        -------
+        dict
+            'containers', 'lineages', 'frames': counts;
+            'total_<what>': totals (None when unknown);
+            'rate_<what>': counts per second;
+            'elapsed': seconds since start;
+            'fraction': processed fraction (from frames, lineages, or
+            containers, first with known total), None when unknown;
+            'eta': estimated remaining seconds, None when unknown;
+            'done': whether computation is over
+        """
+        elapsed = timeit.default_timer() - self._start
+        report = {'elapsed': elapsed, 'done': done}
+        fraction = None
+        for what in WHATS:
+            count = self.counts[what]
+            total = self.totals.get(what)
+            report[what] = count
+            report['total_' + what] = total
+            report['rate_' + what] = count / elapsed if elapsed > 0 else 0.
+        for what in ('frames', 'lineages', 'containers'):
+            total = self.totals.get(what)
+            if total:
+                fraction = min(float(self.counts[what]) / total, 1.)
+                break
+        report['fraction'] = fraction
+        if done:
+            report['eta'] = 0.
+        elif fraction:
+            report['eta'] = elapsed * (1. - fraction) / fraction
+        else:
+            report['eta'] = None
+        return report
+
+
+def make_progress(progress, parser, size=None, labels=None):
+    """Progress instance from the `progress` argument of stats API functions
+
+    Parameters
+    ----------
+    progress : None, bool, callable, or :class:`Progress` instance
+        None or False: no reporting; True: default printing; callable:
+        callback receiving reports
+    parser : :class:`Parser` instance
+        used to get totals
+    size : int (default None)
+        limit on the number of lineages
+    labels : list of str (default None)
+        labels of containers to be processed, None for all
+
+    Returns
+    -------
+    :class:`Progress` instance, or None
+    """
+    if progress is None or progress is False:
+        return None
+    if isinstance(progress, Progress):
+        if all(value is None for value in progress.totals.values()):
+            progress.totals = get_totals(parser, size=size, labels=labels)
+        return progress
+    totals = get_totals(parser, size=size, labels=labels)
+    if progress is True:
+        return Progress(totals=totals)
+    return Progress(totals=totals, callback=progress)
@@ -30,9 +30,10 @@ import os
 import numpy as np
 import pandas as pd
 import warnings
-from tuna.io import text
+from tuna.io import text, binary
 
 from tuna.stats.utils import Regions, CompuParams
+from tuna.stats.compute import load_accumulator
 
 
 class UnivariateConditioned(object):
@@ -73,6 +74,9 @@ class UnivariateConditioned(object):
     --------
     * definition of tuna.stats.compute.set_dynamics()
     """
+    # two-point matrices may be read from disk only upon access
+    count_two = binary.LazyArray('count_two')
+    autocorr = binary.LazyArray('autocorr')
 
     def __init__(self, univariate, applied_filter=None):
         self.univariate = univariate  # parent object
@@ -85,6 +89,7 @@ class UnivariateConditioned(object):
         self.onepoint = None  # Numpy structured array (time, count, av, sd)
         self.count_two = None  # 2d array
         self.autocorr = None  # 2d array
+        self.accumulator = None  # partial state, see stats.compute
 
         self._keys = ('array', 'count_two', 'autocorr')
         self.stationary = None  # StationaryUnivariateConditioned instance
@@ -128,7 +133,10 @@ class UnivariateConditioned(object):
 
     @property
     def std(self):
-        if self.autocorr is not None:
+        # use one-point array first: no need to read two-point matrix
+        if self.onepoint is not None:
+            return self.onepoint['std_dev']
+        elif self.autocorr is not None:
             return np.sqrt(self.var)
         else:
             return None
@@ -145,7 +153,8 @@ class UnivariateConditioned(object):
                                       write=write)
         index_condition, condition_path = res
         obs_path = text.get_observable_path(condition_path, obs, write=write)
-        return obs_path
+        label = text.get_window_label(self.univariate.window)
+        return text.get_window_path(obs_path, [label, ], write=write)
 
     def write_text(self, path=None):
         """Write arrays to files
@@ -201,6 +210,94 @@ class UnivariateConditioned(object):
             self[key] = array
         return
 
+    def write_binary(self, path=None):
+        """Write arrays to binary .npy files
+
+        Parameters
+        ----------
+        path : str (default None)
+            analysis folder path under which filterset->condition->obs
+            leave to None to canonical analysis path under the experiment
+            analysis folder
+        """
+        obs_path = self._get_obs_path(user_root=path, write=True)
+        binary.save_array(os.path.join(obs_path, 'onepoint.npy'),
+                          self.onepoint)
+        for key in ['count_two', 'autocorr']:
+            binary.save_array(os.path.join(obs_path, key + '.npy'), self[key])
+        return
+
+    def read_binary(self, path=None, lazy=True):
+        """Initialize object by reading binary output.
+
+        Parameters
+        ----------
+        path : str (default None)
+            analysis folder path under which filterset->condition->obs
+        lazy : bool {True, False}
+            when True, two-point matrices are memory-mapped only when they
+            are accessed
+        """
+        obs_path = self._get_obs_path(user_root=path, write=False)
+        item_path = os.path.join(obs_path, 'onepoint.npy')
+        self.onepoint = binary.load_array(item_path, lazy=False)
+        for key in ['count_two', 'autocorr']:
+            item_path = os.path.join(obs_path, key + '.npy')
+            if lazy:
+                binary.defer(self, key, item_path)
+            else:
+                self[key] = binary.load_array(item_path, lazy=False)
+        return
+
+    def remove_binary(self, path=None):
+        """Remove binary .npy files, if any (they no longer match text files)
+        """
+        obs_path = self._get_obs_path(user_root=path, write=True)
+        for key in ['onepoint', 'count_two', 'autocorr']:
+            item_path = os.path.join(obs_path, key + '.npy')
+            if os.path.exists(item_path):
+                os.remove(item_path)
+        return
+
+    def write_accumulator(self, path=None):
+        """Write accumulator partial state to a .npz file
+
+        Parameters
+        ----------
+        path : str (default None)
+            analysis folder path under which filterset->condition->obs
+            leave to None to canonical analysis path under the experiment
+            analysis folder
+        """
+        if self.accumulator is None:
+            return
+        obs_path = self._get_obs_path(user_root=path, write=True)
+        item_path = os.path.join(obs_path, 'accumulator.npz')
+        state = self.accumulator.get_state()
+        np.savez(item_path, kind=self.accumulator.kind, **state)
+        return
+
+    def read_accumulator(self, path=None):
+        """Set accumulator from its partial state stored in .npz file"""
+        obs_path = self._get_obs_path(user_root=path, write=False)
+        item_path = os.path.join(obs_path, 'accumulator.npz')
+        if not os.path.exists(item_path):
+            raise text.MissingFileError(item_path)
+        with np.load(item_path) as data:
+            state = {key: data[key] for key in data.files if key != 'kind'}
+            kind = str(data['kind'])
+        self.accumulator = load_accumulator(kind, state)
+        return
+
+    def remove_accumulator(self, path=None):
+        """Remove stored partial state, if any (it no longer matches arrays)
+        """
+        obs_path = self._get_obs_path(user_root=path, write=True)
+        item_path = os.path.join(obs_path, 'accumulator.npz')
+        if os.path.exists(item_path):
+            os.remove(item_path)
+        return
+
     def __setitem__(self, key, val):
         if key not in self._keys:
             msg = 'key "{}" is not valid.'.format(key)
@@ -307,22 +404,35 @@ class Univariate(object):
         fset attribute)
     region : object
         with tmin and tmax attributes
-    period : float
+    eval_times : 1d array
+        evaluation times
+    window : tuple (tmin, tmax, decimation) (default None)
+        when evaluation times are restricted (time window, decimation),
+        first and last evaluation times and decimation: results are
+        exported in a subfolder of the observable folder, named after window
+        (see :func:`tuna.io.text.get_window_label`), so that they do not
+        overwrite results on the full evaluation grid
 
     Attributes
     ----------
     _items : dictionary
         keys are condition labels, values are
         class:`UnivariateConditioned` instances.
+    processed : dict
+        keys are labels of containers that have been processed, values are
+        modification times of container files when they were processed
     """
 
-    def __init__(self, obs, cset=[], parser=None, region=None, eval_times=None):
+    def __init__(self, obs, cset=[], parser=None, region=None, eval_times=None,
+                 window=None):
         self.obs = obs
         self.parser = parser
         self.exp = parser.experiment
         self.cset = cset
         self.region = region
         self.eval_times = eval_times
+        self.window = window
+        self.processed = {}
         # create as many nodes as there are conditions in cset
         self._items = {}
         self._condition_labels = []
@@ -382,6 +492,10 @@ class Univariate(object):
     def export_text(self, analysis_folder=None):
         """Export results to text files.
 
+        Binary files exported previously for the same observable and
+        conditions are removed, so that readers trying binary files first
+        do not load outdated results.
+
         Parameters
         ----------
         analysis_folder : str (default None)
@@ -400,9 +514,119 @@ class Univariate(object):
 #        text_file = os.path.join(filter_path, basename)
 #        with open(text_file, 'w') as f:
 #            f.write(repr(self.indexify))
-        # write each condition
+        # write each condition; binary files of previous exports would
+        # shadow text files upon reading
         for key, val in self._items.items():
             val.write_text(analysis_folder)
+            val.remove_binary(analysis_folder)
+        # write partial states to resume computations
+        if self.processed:
+            self.export_state(analysis_folder)
+        else:
+            self.remove_state(analysis_folder)
+        return
+
+    def export_binary(self, analysis_folder=None):
+        """Export results to binary .npy files.
+
+        Files are written with the same folder layout as text files, and
+        can be memory-mapped upon reading.
+
+        Parameters
+        ----------
+        analysis_folder : str (default None)
+            Path to the analysis folder; default is 'analysis' subfolder in
+            experiment folder
+        """
+        for key, val in self._items.items():
+            val.write_binary(analysis_folder)
+        # write partial states to resume computations
+        if self.processed:
+            self.export_state(analysis_folder)
+        else:
+            self.remove_state(analysis_folder)
+        return
+
+    def import_from_binary(self, analysis_folder=None, lazy=True):
+        """Set instance from binary .npy files.
+
+        Parameters
+        ----------
+        analysis_folder : str (default None)
+            Path to the analysis folder; default is 'analysis' subfolder in
+            experiment folder
+        lazy : bool {True, False}
+            when True, two-point matrices are memory-mapped only when they
+            are accessed
+
+        Raises
+        ------
+        UnivariateIOError
+            when any of the folder/file is not found
+        """
+        try:
+            for key, val in self._items.items():
+                val.read_binary(analysis_folder, lazy=lazy)
+        except (text.MissingFileError, text.MissingFolderError) as missing:
+            raise UnivariateIOError(missing)
+        return
+
+    def _get_processed_path(self, analysis_folder=None, write=False):
+        obs_path = self.master._get_obs_path(user_root=analysis_folder,
+                                             write=write)
+        return os.path.join(obs_path, 'processed_containers.tsv')
+
+    def export_state(self, analysis_folder=None):
+        """Export accumulator partial states and processed containers.
+
+        Parameters
+        ----------
+        analysis_folder : str (default None)
+            Path to the analysis folder; default is 'analysis' subfolder in
+            experiment folder
+        """
+        for key, val in self._items.items():
+            val.write_accumulator(analysis_folder)
+        text_file = self._get_processed_path(analysis_folder, write=True)
+        labels = sorted(self.processed.keys())
+        df = pd.DataFrame({'label': labels,
+                           'mtime': [self.processed[lab] for lab in labels]},
+                          columns=['label', 'mtime'])
+        df.to_csv(text_file, sep='\t', index=False, float_format='%.6f')
+        return
+
+    def remove_state(self, analysis_folder=None):
+        """Remove stored partial states and processed containers.
+
+        Partial states previously exported do not match results computed
+        on part of the experiment (restricted time window, limited size):
+        they are removed so that these results cannot be updated.
+        """
+        for key, val in self._items.items():
+            val.remove_accumulator(analysis_folder)
+        text_file = self._get_processed_path(analysis_folder, write=True)
+        if os.path.exists(text_file):
+            os.remove(text_file)
+        return
+
+    def import_state(self, analysis_folder=None):
+        """Import accumulator partial states and processed containers.
+
+        Raises
+        ------
+        UnivariateIOError
+            when any of the files is not found
+        """
+        try:
+            for key, val in self._items.items():
+                val.read_accumulator(analysis_folder)
+            text_file = self._get_processed_path(analysis_folder)
+        except (text.MissingFileError, text.MissingFolderError) as missing:
+            raise UnivariateIOError(missing)
+        if not os.path.exists(text_file):
+            raise UnivariateIOError('Missing file {}'.format(text_file))
+        df = pd.read_csv(text_file, sep='\t', dtype={'label': str})
+        self.processed = dict(zip(df['label'], df['mtime']))
         return
 
     def import_from_text(self, analysis_folder=None):
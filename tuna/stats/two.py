@@ -9,7 +9,7 @@ import numpy as np
 import os
 import pandas as pd
 
-from tuna.io import text
+from tuna.io import text, binary
 
 
 class BivariateConditioned(object):
@@ -24,6 +24,11 @@ class BivariateConditioned(object):
         matrices refers to the indices of first and second item respectively.
     applied_filter : :class:`FilterSet` instance
     """
+    # matrices may be read from disk only upon access
+    counts = binary.LazyArray('counts')
+    cross = binary.LazyArray('cross')
+    std_dev = binary.LazyArray('std_dev')
+
     def __init__(self, bivariate, applied_filter=None):
         self.bivariate = bivariate
         self.applied_filter = applied_filter
@@ -51,7 +56,9 @@ class BivariateConditioned(object):
                                       write=write)
         index_condition, condition_path = res
         obs_path = text.get_biobservable_path(condition_path, obs, write=write)
-        return obs_path
+        labels = [text.get_window_label(uni.window)
+                  for uni in self.bivariate.univariates]
+        return text.get_window_path(obs_path, labels, write=write)
 
     def write_text(self, path='.'):
         # export under text files
@@ -107,6 +114,54 @@ class BivariateConditioned(object):
         self.std_dev = arr
         pass
 
+    def write_binary(self, path=None):
+        """Write arrays to binary .npy files"""
+        obs_path = self._get_obs_path(user_root=path, write=True)
+        item_path = os.path.join(obs_path, 'times.npz')
+        np.savez(item_path, row=self.times[0], column=self.times[1])
+        for key, basename in [('counts', 'count_cross'),
+                              ('cross', 'cross'),
+                              ('std_dev', 'std_dev')]:
+            item_path = os.path.join(obs_path, basename + '.npy')
+            binary.save_array(item_path, getattr(self, key))
+        return
+
+    def remove_binary(self, path=None):
+        """Remove binary files, if any (they no longer match text files)"""
+        obs_path = self._get_obs_path(user_root=path, write=True)
+        for basename in ['times.npz', 'count_cross.npy', 'cross.npy',
+                         'std_dev.npy']:
+            item_path = os.path.join(obs_path, basename)
+            if os.path.exists(item_path):
+                os.remove(item_path)
+        return
+
+    def read_binary(self, path=None, lazy=True):
+        """Initialize object by reading binary output.
+
+        Parameters
+        ----------
+        path : str (default None)
+            analysis folder path under which filterset->condition->obs
+        lazy : bool {True, False}
+            when True, matrices are memory-mapped only when they are accessed
+        """
+        obs_path = self._get_obs_path(user_root=path, write=False)
+        item_path = os.path.join(obs_path, 'times.npz')
+        if not os.path.exists(item_path):
+            raise text.MissingFileError(item_path)
+        with np.load(item_path) as data:
+            self.times = [data['row'], data['column']]
+        for key, basename in [('counts', 'count_cross'),
+                              ('cross', 'cross'),
+                              ('std_dev', 'std_dev')]:
+            item_path = os.path.join(obs_path, basename + '.npy')
+            if lazy:
+                binary.defer(self, key, item_path)
+            else:
+                setattr(self, key, binary.load_array(item_path, lazy=False))
+        return
+
     def compute_stationary(self, indexify, tmin=None, tmax=None):
         """Computes stationary cross-correlation between tmin and tmax.
 
@@ -203,9 +258,11 @@ class Bivariate(object):
         return
 
     def export_text(self, analysis_folder=None):
-        # write each condition
+        # write each condition; binary files of previous exports would
+        # shadow text files upon reading
         for key, val in self._items.items():
             val.write_text(analysis_folder)
+            val.remove_binary(analysis_folder)
         return
 
     def import_from_text(self, analysis_folder=None):
@@ -217,6 +274,30 @@ class Bivariate(object):
             raise BivariateIOError(missing)
         return
 
+    def export_binary(self, analysis_folder=None):
+        """Export results to binary .npy files (same folder layout as text)"""
+        for key, val in self._items.items():
+            val.write_binary(analysis_folder)
+        return
+
+    def import_from_binary(self, analysis_folder=None, lazy=True):
+        """Set instance from binary .npy files.
+
+        Parameters
+        ----------
+        analysis_folder : str (default None)
+            Path to the analysis folder; default is 'analysis' subfolder in
+            experiment folder
+        lazy : bool {True, False}
+            when True, matrices are memory-mapped only when they are accessed
+        """
+        try:
+            for key, val in self._items.items():
+                val.read_binary(analysis_folder, lazy=lazy)
+        except (text.MissingFileError, text.MissingFolderError) as missing:
+            raise BivariateIOError(missing)
+        return
+
     def __getitem__(self, key):
         return self._items[key]
 
@@ -278,7 +359,9 @@ class StationaryBivariateConditioned(object):
                                       write=False)
         index_condition, condition_path = res
         obs_path = text.get_biobservable_path(condition_path, obs, write=write)
-        return obs_path
+        labels = [text.get_window_label(uni.window)
+                  for uni in self.statbivariate.univariates]
+        return text.get_window_path(obs_path, labels, write=write)
 
     def write_text(self, path='.'):
         """Write array to file."""
@@ -15,9 +15,12 @@ import pandas as pd
 from tuna import Parser
 from tuna.base.experiment import Experiment
 from tuna.io import text
+from tuna.io.index import get_time_boundaries
 
 
-def iter_timeseries_(parser, observable, conditions, size=None):
+def iter_timeseries_(parser, observable, conditions, size=None, labels=None,
+                     precision='double', window=None, progress=None,
+                     checkpoint=None):
     """Iterator over :class:`TimeSeries` instances from lineages in parser.
 
     TimeSeries are generated by browing Lineages instances from parser,
@@ -32,18 +35,41 @@ def iter_timeseries_(parser, observable, conditions, size=None):
 
     size : int (default None)
         when not None, limit the iterator to size items.
+    labels : list of str (default None)
+        when not None, restrict the iterator to containers with these labels
+    precision : str {'double', 'single'}
+        storage type of observable values in timeseries
+    window : couple of floats (default None)
+        (tmin, tmax): when not None, lineages whose time extent does not
+        intersect this window are skipped before observable is computed
+    progress : :class:`tuna.stats.progress.Progress` instance (default None)
+        counts processed lineages
+    checkpoint : :class:`tuna.stats.checkpoint.Checkpoint` instance
+        (default None) records processed containers
 
     Yields
     ------
     :class:`TimeSeries` instance
     """
-    for lineage in parser.iter_lineages(mode='all', size=size):
-        ts = lineage.get_timeseries(observable, conditions)
+    for lineage in parser.iter_lineages(mode='all', size=size, labels=labels):
+        if checkpoint is not None:
+            checkpoint.visit(lineage)
+        if progress is not None:
+            progress.add_lineage(lineage)
+        if window is not None:
+            tleft, tright = lineage.get_time_extent()
+            if tright < window[0] or tleft > window[1]:
+                continue
+        ts = lineage.get_timeseries(observable, conditions,
+                                    precision=precision)
         yield ts
+    if progress is not None:
+        progress.finish()
     return
 
 
-def iter_timeseries_2(parser, obs1, obs2, conditions, size=None):
+def iter_timeseries_2(parser, obs1, obs2, conditions, size=None,
+                      labels=None, progress=None, checkpoint=None):
     """Iterator over couples :class:`TimeSeries` instances
 
     :class:`TimeSeries` are generated by browing :class:`Lineage` instances
@@ -58,15 +84,27 @@ def iter_timeseries_2(parser, obs1, obs2, conditions, size=None):
     conditions : list of :class:`FilterSet` instances
     size : int (default None)
         when not None, limit the iterator to size items.
+    labels : list of str (default None)
+        when not None, restrict the iterator to containers with these labels
+    progress : :class:`tuna.stats.progress.Progress` instance (default None)
+        counts processed lineages
+    checkpoint : :class:`tuna.stats.checkpoint.Checkpoint` instance
+        (default None) records processed containers
 
     Yields
     ------
     Couple of :class:`TimeSeries` instances
     """
-    for lineage in parser.iter_lineages(mode='all', size=size):
+    for lineage in parser.iter_lineages(mode='all', size=size, labels=labels):
+        if checkpoint is not None:
+            checkpoint.visit(lineage)
+        if progress is not None:
+            progress.add_lineage(lineage)
         ts1 = lineage.get_timeseries(obs1, conditions)
         ts2 = lineage.get_timeseries(obs2, conditions)
         yield (ts1, ts2)
+    if progress is not None:
+        progress.finish()
     return
 
 
@@ -244,6 +282,9 @@ def _find_time_boundaries(exp):
     ----------
     exp : :class:`tuna.base.experiment.Experiment` instance
     """
+    # text experiments: use (and update) the persisted container index
+    if exp.filetype == 'text':
+        return get_time_boundaries(exp)
     tleft, tright = np.infty, -np.infty
     for container in exp.iter_container(read=True, build=False):
         tmin = np.nanmin(container.data['time'])
@@ -11,9 +11,12 @@ from __future__ import print_function
 
 import pytest
 import os
+import shutil
+import multiprocessing
+import numpy as np
 
 import tuna
-from tuna.base.experiment import Experiment
+from tuna.base.experiment import Experiment, imap_bounded
 from tuna.base.container import Container
 
 path_data = os.path.join(os.path.dirname(tuna.__file__), 'data')
@@ -68,3 +71,60 @@ def test_experiment_iter(fake_exp):
 def test_experiment_get_container(fake_exp):
     container = fake_exp.get_container('container_01')
     assert isinstance(container, Container)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_h5_export(tmpdir, processes):
+    path = os.path.join(str(tmpdir), 'fake')
+    shutil.copytree(path_fake_exp, path)
+    os.remove(os.path.join(path, 'containers', 'container_03.txt'))
+    exp = Experiment(path)
+    h5file = exp.h5_export(directory=str(tmpdir), filiation=True,
+                           processes=processes, out=True)
+    try:
+        assert h5file.root._v_attrs.author == 'Joachim Rambeau'
+        tabs = sorted(h5file.root.lineages._v_children.keys())
+        assert tabs == ['data_' + label for label in sorted(exp.containers)]
+        for label in exp.containers:
+            tab = h5file.get_node(h5file.root.lineages, 'data_' + label)
+            assert tab.filters.complevel == 5
+            assert tab.cols.cellID.is_indexed and tab.cols.time.is_indexed
+            container = exp.get_container(label)
+            arr = tab.read()
+            assert len(arr) == len(container.data)
+            fil = h5file.get_node(h5file.root.filiation,
+                                  'data_' + label).read()
+            assert len(fil) == len(container.cells)
+            for cell in container.cells:
+                row = fil[fil['cellID'] == int(cell.identifier)][0]
+                if cell.parent is None:
+                    assert row['parent'] == -1
+                else:
+                    parent = fil[row['parent']]['cellID']
+                    assert str(parent) == cell.parent.identifier
+                rows = arr[row['start']:row['stop']]
+                assert np.all(rows['cellID'] == int(cell.identifier))
+                assert np.all(rows['time'] == cell.data['time'])
+    finally:
+        h5file.close()
+
+
+def test_imap_bounded():
+    submitted = []
+
+    def items():
+        for index in range(10):
+            submitted.append(index)
+            yield index
+
+    pool = multiprocessing.Pool(2)
+    try:
+        results = []
+        for value in imap_bounded(pool, abs, items(), 2):
+            # at most 2 tasks are pending besides the consumed one
+            assert len(submitted) <= len(results) + 3
+            results.append(value)
+    finally:
+        pool.terminate()
+        pool.join()
+    assert results == list(range(10))
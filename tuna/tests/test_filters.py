@@ -0,0 +1,187 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import pytest
+import os
+import shutil
+import numpy as np
+
+import tuna
+from tuna import Parser
+from tuna import Observable
+from tuna.filters.main import FilterAND, FilterOR, FilterNOT, FilterSet
+from tuna.filters.cells import (FilterCell, FilterObservableBound,
+                                FilterCellIDparity, FilterCompleteCycle,
+                                FilterCycleFrames, FilterTimeInCycle)
+from tuna.filters.compiled import CellTable, compile_cell_filter
+from tuna.filters.lineages import (FilterLineageLength,
+                                   FilterLineageTimeIntersect)
+from tuna.filters.trees import FilterTreeTimeIntersect
+from tuna.filters.containers import FilterContainerMetadataEquals
+from tuna.filters.planning import ContainerPlan
+from tuna.simu.main import SimuParams, DivisionParams
+from tuna.simu.ou import OUParams, OUSimulation
+
+path_data = os.path.join(os.path.dirname(tuna.__file__), 'data')
+path_fake_exp = os.path.join(path_data, 'fake')
+
+
+@pytest.fixture
+def exp_path(tmpdir):
+    path = os.path.join(str(tmpdir), 'fake')
+    shutil.copytree(path_fake_exp, path)
+    return path
+
+
+def test_stage_and_window():
+    bound = FilterObservableBound(lower_bound=1.)
+    length = FilterLineageLength(lower_bound=2)
+    both = FilterAND(FilterLineageTimeIntersect(lower_bound=10.,
+                                                upper_bound=50.),
+                     FilterLineageTimeIntersect(lower_bound=30.),
+                     length)
+    assert bound.get_stage() == 'observable'
+    assert both.get_stage() == 'data'
+    assert both.get_time_window() == (30., 50.)
+    either = FilterOR(FilterLineageTimeIntersect(lower_bound=10.,
+                                                 upper_bound=50.),
+                      length)
+    assert either.get_time_window() is None
+    # evaluation order does not change representation
+    assert [type(f) for f in both._ordered][-1] == FilterLineageLength
+    assert repr(eval(repr(both))) == repr(both)
+
+
+def test_container_plan(exp_path):
+    parser = Parser(exp_path)
+    exp = parser.experiment
+    strain = FilterContainerMetadataEquals('strain', 'Thunnus thynnus')
+    plan = ContainerPlan(FilterSet(filtercontainer=strain), exp)
+    assert plan.select() == ['container_02']
+    assert [c.label for c in parser.iter_containers()] == exp.containers
+    parser.set_filter(FilterSet(filtercontainer=strain))
+    assert [c.label for c in parser.iter_containers()] == ['container_02']
+    # all containers span 0 to 95 minutes
+    late = FilterTreeTimeIntersect(lower_bound=100.)
+    plan = ContainerPlan(FilterSet(filtertree=late), exp)
+    assert plan.select() == []
+    early = FilterTreeTimeIntersect(lower_bound=50.)
+    plan = ContainerPlan(FilterSet(filtertree=early), exp)
+    assert plan.select() == exp.containers
+
+
+class _CountingFilter(FilterCell):
+    """Cell filter (not vectorized) that counts evaluations"""
+
+    def __init__(self):
+        self.label = 'Counting'
+        self._calls = 0
+        return
+
+    def func(self, cell):
+        self._calls += 1
+        return True
+
+
+def test_compiled_cell_filter(exp_path):
+    parser = Parser(exp_path)
+    container = parser.experiment.get_container('container_01')
+    cells = container.cells
+    obs = Observable(raw='value')
+    for cell in cells:
+        cell.build(obs)
+    counting = _CountingFilter()
+    filt = FilterOR(FilterAND(FilterCompleteCycle(daughter_min=1),
+                              FilterCycleFrames(lower_bound=4),
+                              FilterNOT(FilterTimeInCycle(tref=30.))),
+                    FilterAND(FilterCellIDparity('even'),
+                              FilterObservableBound(obs=obs, lower_bound=0.),
+                              counting))
+    expected = np.array([filt(cell) for cell in cells])
+    calls = counting._calls
+    counting._calls = 0
+    mask = compile_cell_filter(filt)(cells)
+    assert np.all(mask == expected)
+    assert 0 < np.sum(mask) < len(cells)
+    # cost-ordered short-circuit: expensive filter is called less often
+    assert counting._calls <= calls
+
+
+def _compare_tables(cells, container):
+    names = ['n_frames', 'identifier', 'valid_identifier', 'time_min',
+             'time_max', 'cycle_start', 'cycle_end']
+    from_cells = CellTable(cells)
+    from_arrays = CellTable(cells, container=container)
+    assert from_arrays.groups() is not None
+    for name in names:
+        expected = from_cells.column(name)
+        assert np.allclose(from_arrays.column(name), expected, equal_nan=True)
+
+
+def test_cell_table_from_arrays(exp_path):
+    parser = Parser(exp_path)
+    for container in parser.experiment.iter_container():
+        _compare_tables(container.cells, container)
+        # subset of cells, in another order
+        _compare_tables(container.cells[::-2], container)
+    simu = OUSimulation(simuParams=SimuParams(nbr_colony_per_container=2,
+                                              stop=150.),
+                        divisionParams=DivisionParams(),
+                        ouParams=OUParams(), seed=7)
+    container = next(simu.iter_container())
+    _compare_tables(container.cells, container)
+
+
+def test_condition_masks(exp_path):
+    parser = Parser(exp_path)
+    container = parser.experiment.get_container('container_01')
+    fset = FilterSet(filtercell=FilterAND(FilterCycleFrames(lower_bound=4),
+                                          FilterCellIDparity('odd')))
+    lineages = [lineage for colony in container.iter_colonies()
+                for lineage in colony.iter_lineages()]
+    for lineage in lineages:
+        tests = lineage.get_boolean_tests([fset, ])
+        expected = [fset.cell_filter(lineage.colony.get_node(cid))
+                    for cid in lineage.idseq]
+        assert np.all(tests[repr(fset)] == expected)
+        assert np.all(tests['master'])
+    # a single mask is computed for the container
+    assert list(container._condition_masks.keys()) == [repr(fset)]
+    assert len(container.get_condition_mask(fset)) == len(container.cells)
+
+
+def test_postfilter_forest(exp_path):
+    parser = Parser(exp_path)
+    container = parser.experiment.get_container('container_01')
+    filt = FilterCellIDparity('odd')
+    ids = sorted(cell.identifier for cell in container.cells)
+    parents = {cell.identifier: cell.bpointer for cell in container.cells}
+    n_trees = len(container.trees)
+    # view mode leaves container untouched
+    forest = container.postfilter(filt=filt, view=True)
+    assert len(container.trees) == n_trees
+    assert sorted(cell.identifier for cell in container.cells) == ids
+    kept = sorted(cid for cid in ids if int(cid) % 2 == 1)
+    assert sorted(cell.identifier for cell in forest.cells) == kept
+    sizes = forest.get_lineage_sizes()
+    assert np.sum(sizes) == len(kept)
+    assert len(sizes) == len(forest.get_leaves())
+    container.postfilter(filt=filt)
+    assert sorted(cell.identifier for cell in container.cells) == kept
+    assert len(container.trees) == len(forest.get_roots())
+    assert (sorted(tree.depth() for tree in container.trees) ==
+            sorted(forest.get_tree_depths()))
+    for tree in container.trees:
+        for cell in tree.all_nodes():
+            if cell.identifier == tree.root:
+                assert parents[cell.identifier] not in kept
+            else:
+                assert cell.bpointer == parents[cell.identifier]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import pytest
+import os
+import shutil
+import random
+import numpy as np
+
+import tuna
+from tuna import Parser, Observable
+from tuna.filters.main import FilterSet
+from tuna.filters.cells import FilterCellIDparity
+from tuna.io.columnar import export_timeseries, read_timeseries
+
+path_fake_exp = os.path.join(os.path.dirname(tuna.__file__), 'data', 'fake')
+
+
+@pytest.fixture
+def parser(tmpdir):
+    path = os.path.join(str(tmpdir), 'fake')
+    shutil.copytree(path_fake_exp, path)
+    os.remove(os.path.join(path, 'containers', 'container_03.txt'))
+    return Parser(path)
+
+
+def test_export_timeseries(parser):
+    obs = Observable(raw='value')
+    dot = Observable(raw='value', differentiate=True)
+    cset = [FilterSet(filtercell=FilterCellIDparity('even')), ]
+    random.seed(4)
+    fname = export_timeseries(parser, [obs, dot], cset=cset, batch_size=10)
+    df, attrs = read_timeseries(fname)
+    assert list(df.columns) == ['container', 'colony', 'lineage', 'cellID',
+                                'time', obs.label(), dot.label(),
+                                'condition_0']
+    assert attrs['experiment'] == 'fake'
+    assert attrs['conditions'] == [repr(cset[0])]
+    # same decomposition: rows match timeseries of each lineage
+    random.seed(4)
+    groups = df.groupby(['container', 'colony', 'lineage'], sort=False)
+    lineages = list(parser.iter_lineages())
+    assert len(groups) == len(lineages)
+    for (key, group), lineage in zip(groups, lineages):
+        assert key[0] == lineage.colony.container.label
+        # rows are the union of times of both observables
+        for item in [obs, dot]:
+            arr = lineage.get_timeseries(item, cset).timeseries
+            values = group[group[item.label()].notnull()]
+            assert np.allclose(values['time'], arr['time'])
+            assert np.allclose(values[item.label()], arr[item.label()])
+        even = group['cellID'] % 2 == 0
+        assert np.all(group['condition_0'] == even)
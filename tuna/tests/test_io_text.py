@@ -7,9 +7,13 @@ from __future__ import print_function
 
 import pytest
 import os
+import shutil
+import numpy as np
 
 import tuna
 from tuna.io import text
+from tuna.io.index import get_container_index
+from tuna.base.experiment import Experiment
 
 
 path_data = os.path.join(os.path.dirname(tuna.__file__), 'data')
@@ -40,3 +44,26 @@ def test_filename_parser(fname):
     assert 'container_02.txt' in basenames
     assert 'container_03.txt' in basenames
     assert len(basenames) == 3
+
+
+def test_get_columns(datatype):
+    fn = os.path.join(path_fake_exp, 'containers', 'container_01.txt')
+    arr = text.get_array(fn, datatype)
+    cols = text.get_columns(fn, datatype, ['time', 'cellID'])
+    assert cols.dtype.names == ('time', 'cellID')
+    assert np.all(cols['time'] == arr['time'])
+    assert np.all(cols['cellID'] == arr['cellID'])
+
+
+def test_container_index(tmpdir):
+    path = os.path.join(str(tmpdir), 'fake')
+    shutil.copytree(path_fake_exp, path)
+    exp = Experiment(path)
+    df = get_container_index(exp)
+    assert sorted(df.index) == sorted(exp.containers)
+    for container in exp.iter_container(read=True, build=False):
+        assert df.loc[container.label, 'tmin'] == np.nanmin(container.data['time'])
+        assert df.loc[container.label, 'tmax'] == np.nanmax(container.data['time'])
+    # index has been persisted
+    assert os.path.exists(os.path.join(path, 'analysis',
+                                       'containers_index.tsv'))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import pytest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+import tuna
+from tuna import Parser, Observable, profiling
+from tuna.profiling import Profiler
+from tuna.stats.api import compute_univariate_dynamics
+
+path_data = os.path.join(os.path.dirname(tuna.__file__), 'data')
+path_fake_exp = os.path.join(path_data, 'fake')
+
+
+@pytest.fixture
+def exp_path(tmpdir):
+    path = os.path.join(str(tmpdir), 'fake')
+    shutil.copytree(path_fake_exp, path)
+    return path
+
+
+def test_disabled_stage():
+    assert profiling.stage('read') is profiling._NULL
+    profiler = Profiler()
+    with profiler:
+        with profiling.stage('read'):
+            with profiling.stage('build'):
+                pass
+    assert profiling.stage('read') is profiling._NULL
+    summary = profiler.summary()
+    assert list(summary.index) == ['build', 'read']
+    assert summary.loc['read', 'self_seconds'] <= summary.loc['read', 'seconds']
+
+
+def test_memory():
+    profiler = Profiler(memory=True)
+    assert profiler.memory_source in ('tracemalloc', 'resident')
+    with profiler:
+        with profiling.stage('read'):
+            arr = np.ones(2 ** 22)  # 32 MB
+    summary = profiler.summary()
+    assert summary.loc['read', 'bytes'] >= 0.9 * arr.nbytes
+
+
+def test_profiled_univariate(exp_path):
+    profiler = Profiler()
+    parser = Parser(exp_path, profiler=profiler)
+    obs = Observable(raw='value')
+    compute_univariate_dynamics(parser, obs)
+    summary = profiler.summary()
+    for name in ['read', 'build', 'decompose', 'observable', 'accumulate',
+                 'interpolate']:
+        assert name in summary.index
+    assert summary.loc['read', 'calls'] == len(parser.experiment.containers)
+    assert np.all(summary['self_seconds'] <= summary['seconds'])
+    # exported alongside analysis results
+    fname = profiler.export_text(parser)
+    exported = pd.read_csv(fname, sep='\t', index_col='stage')
+    assert list(exported.index) == list(summary.index)
+    assert np.all(exported['calls'] == summary['calls'])
+    # parser given as keyword argument
+    parser.profiler = Profiler()
+    compute_univariate_dynamics(parser=parser, obs=obs)
+    assert 'read' in parser.profiler.summary().index
@@ -0,0 +1,191 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import os
+import pytest
+import tables
+import numpy as np
+
+from tuna.base.experiment import Experiment
+from tuna.simu.main import SimuParams, DivisionParams
+from tuna.simu.ou import (OUParams, OUsteps, ou_track, ou_generations,
+                          OUSimulation)
+from tuna.simu.writer import (write_simulation, container_labels,
+                              generate_experiment)
+
+
+def _ou_track_loop(params, dt, steps, start, y_start):
+    """Step by step Gillespie update"""
+    xs = np.zeros(steps+1)
+    ys = np.zeros(steps+1)
+    ns = np.random.normal(0., 1., size=(steps, 2))
+    xs[0] = start
+    ys[0] = y_start
+    k = params.spring
+    ou = OUsteps(params, dt=dt)
+    mu, sigma_x, sigma_y, kappa = ou.mu, ou.sigma, ou.sigma_y, ou.kappa
+    for i, (n1, n2) in enumerate(ns, start=1):
+        xs[i] = xs[i-1] * mu + sigma_x * n1
+        ys[i] = ys[i-1] + (xs[i-1] * (1.-mu)/k +
+                           np.sqrt((sigma_y)**2 - (kappa**2/sigma_x**2)) * n2 +
+                           kappa/sigma_x * n1)
+    return xs, ys
+
+
+def test_ou_track_matches_loop():
+    params = OUParams(target=1., spring=0.3, noise=0.02)
+    for steps in [0, 1, 500]:
+        np.random.seed(9)
+        expected = _ou_track_loop(params, 0.7, steps, 0.4, 2.)
+        after = np.random.uniform()
+        np.random.seed(9)
+        xs, ys = ou_track(params, dt=0.7, steps=steps, start=0.4, y_start=2.)
+        # same draws, consumed in same order
+        assert np.random.uniform() == after
+        assert np.array_equal(xs, expected[0])
+        assert np.array_equal(ys, expected[1])
+
+
+def test_ou_generations():
+    np.random.seed(10)
+    params = OUParams(target=1., spring=0.1, noise=0.02)
+    div = DivisionParams(mean=30., std=3., minimum=5.)
+    data, genealogy, count = ou_generations(params, div, nbr_colony=500,
+                                            tstart=0., tstop=100., dt=5.)
+    assert count == len(genealogy)
+    assert genealogy['stop'][-1] == len(data)
+    for row in genealogy[::97]:
+        rows = data[row['start']:row['stop']]
+        assert np.all(rows['cellID'] == row['cellID'])
+        assert np.all(rows['time'] > row['birth_time'])
+        assert np.all(rows['time'] < row['division_time'])
+        if row['parentID'] > 0:
+            parent = genealogy[genealogy['cellID'] == row['parentID']][0]
+            assert row['birth_time'] == parent['division_time']
+            assert row['birth_ou'] == parent['division_ou']
+    assert np.allclose(data['time'] % 5., 0.)
+    # stationary process
+    values = data['ou'][data['time'] == 50.]
+    assert abs(np.mean(values) - 1.) < 0.05
+    assert abs(np.std(values) - np.sqrt(0.02/0.2)) < 0.05
+
+
+def test_ou_container_colonies():
+    simu = OUSimulation(simuParams=SimuParams(nbr_colony_per_container=2,
+                                              stop=150.),
+                        divisionParams=DivisionParams(),
+                        ouParams=OUParams(), seed=11)
+    container = next(simu.iter_container())
+    # colonies are built on demand
+    assert container._cells is None
+    assert len(container.trees) == 2
+    assert len(container.cells) == len(container.genealogy)
+    sizes = [len(cell.data) for cell in container.cells]
+    assert sum(sizes) == len(container.data)
+    for tree in container.trees:
+        for cell in tree.all_nodes():
+            assert len(cell.childs) == len(tree.children(cell.identifier))
+
+
+def test_simulation_seed():
+    params = dict(simuParams=SimuParams(nbr_container=4,
+                                        nbr_colony_per_container=2,
+                                        stop=200.),
+                  divisionParams=DivisionParams(),
+                  ouParams=OUParams())
+    simu = OUSimulation(seed=123, **params)
+    serial = [container.data for container in simu.iter_container()]
+    parallel = [container.data
+                for container in simu.iter_container(processes=3)]
+    again = [container.data
+             for container in OUSimulation(seed=123,
+                                           **params).iter_container()]
+    for first, second, third in zip(serial, parallel, again):
+        assert first.tobytes() == second.tobytes() == third.tobytes()
+    # containers have independent streams
+    assert serial[0].tobytes() != serial[1].tobytes()
+    other = next(OUSimulation(seed=124, **params).iter_container())
+    assert other.data.tobytes() != serial[0].tobytes()
+    # default seed is drawn from the global numpy random state
+    np.random.seed(7)
+    first = OUSimulation(**params)
+    np.random.seed(7)
+    assert OUSimulation(**params).seed == first.seed
+
+
+@pytest.mark.parametrize('fmt', ['text', 'npy', 'h5'])
+def test_write_simulation(tmpdir, fmt):
+    simu = OUSimulation(label='streamed', seed=5,
+                        simuParams=SimuParams(nbr_container=3,
+                                              nbr_colony_per_container=2,
+                                              stop=200.))
+    exp_path = write_simulation(simu, path=str(tmpdir), fmt=fmt)
+    expected = [data for data, genealogy in simu.iter_arrays()]
+    if fmt == 'h5':
+        h5file = tables.open_file(os.path.join(exp_path, 'streamed.h5'))
+        try:
+            assert h5file.root._v_attrs.seed == 5
+            nodes = [h5file.get_node(h5file.root.lineages, name)
+                     for name in sorted(h5file.root.lineages._v_children)]
+            # same layout as Experiment.h5_export
+            for node in nodes:
+                assert node.filters.complib == 'blosc'
+                assert node.cols.cellID.is_indexed
+            tabs = [node.read() for node in nodes]
+        finally:
+            h5file.close()
+        for tab, data in zip(tabs, expected):
+            assert tab.tobytes() == data.tobytes()
+        return
+    exp = Experiment(exp_path)
+    labels = container_labels(3)
+    assert sorted(exp.containers) == labels
+    assert exp.period == simu.simuParams.interval
+    for label, data in zip(labels, expected):
+        container = exp.get_container(label)
+        assert np.allclose(container.data['ou'], data['ou'], rtol=1e-7)
+        assert np.all(container.data['cellID'] == data['cellID'])
+        assert len(container.cells) == len(np.unique(data['cellID']))
+
+
+def test_generate_experiment(tmpdir):
+    paths = [generate_experiment(path=str(tmpdir.join(str(index))),
+                                 nbr_container=2, nbr_colony=3,
+                                 generations=3, seed=8)
+             for index in range(2)]
+    contents = []
+    for path in paths:
+        exp = Experiment(path)
+        assert len(exp.containers) == 2
+        fn = os.path.join(path, 'containers', 'container_1.txt')
+        with open(fn) as f:
+            contents.append(f.read())
+    assert contents[0] == contents[1]
+
+
+def test_h5_export_simulation(tmpdir):
+    simu = OUSimulation(label='exported', seed=5,
+                        simuParams=SimuParams(nbr_container=2,
+                                              nbr_colony_per_container=2,
+                                              stop=200.))
+    with pytest.raises(ValueError):
+        simu.h5_export(directory=str(tmpdir), processes=2)
+    h5file = simu.h5_export(directory=str(tmpdir), out=True)
+    try:
+        assert h5file.filename == os.path.join(str(tmpdir), 'exported.h5')
+        tabs = [node.read() for node in h5file.root.lineages]
+    finally:
+        h5file.close()
+    expected = [data for data, genealogy in simu.iter_arrays()]
+    # container labels are random: tables are not in simulation order
+    assert (sorted(len(tab) for tab in tabs) ==
+            sorted(len(data) for data in expected))
+    assert all(len(tab) > 0 for tab in tabs)
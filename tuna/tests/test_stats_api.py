@@ -0,0 +1,267 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import pytest
+import os
+import shutil
+import random
+import numpy as np
+
+import tuna
+from tuna import Parser, Observable
+from tuna.stats.api import (compute_univariate_dynamics,
+                            initialize_univariate,
+                            update_univariate_dynamics,
+                            compute_bivariate,
+                            compute_joint_bivariate,
+                            compute_stationary_bivariate)
+from tuna.stats.single import UnivariateIOError
+from tuna.stats.checkpoint import Checkpoint, get_checkpoint_path
+from tuna.stats.utils import Regions, CompuParams
+from tuna.io import text
+from tuna.io.sniff import Sniffer, load_framework
+
+path_data = os.path.join(os.path.dirname(tuna.__file__), 'data')
+path_fake_exp = os.path.join(path_data, 'fake')
+
+
+@pytest.fixture
+def exp_path(tmpdir):
+    """Copy of fake experiment, where container_03 is missing"""
+    path = os.path.join(str(tmpdir), 'fake')
+    shutil.copytree(path_fake_exp, path)
+    os.remove(os.path.join(path, 'containers', 'container_03.txt'))
+    return path
+
+
+def test_update_univariate_dynamics(exp_path):
+    obs = Observable(raw='value')
+    univ = update_univariate_dynamics(Parser(exp_path), obs)
+    assert sorted(univ.processed.keys()) == ['container_01', 'container_02']
+    # new container is added
+    shutil.copy(os.path.join(path_fake_exp, 'containers', 'container_03.txt'),
+                os.path.join(exp_path, 'containers'))
+    parser = Parser(exp_path)
+    updated = update_univariate_dynamics(parser, obs)
+    assert len(updated.processed) == 3
+    # lineage decomposition is random: compare only one-point counts
+    full = compute_univariate_dynamics(parser, obs)
+    assert np.all(updated.master.count_one == full.master.count_one)
+    # nothing new: stored results are returned
+    again = update_univariate_dynamics(parser, obs)
+    assert np.allclose(again.master.autocorr, updated.master.autocorr,
+                       equal_nan=True)
+
+
+def test_update_after_partial_export(exp_path):
+    parser = Parser(exp_path)
+    obs = Observable(raw='value')
+    full = compute_univariate_dynamics(parser, obs)
+    full.export_text()
+    times = full.eval_times
+    # restricted computation is exported aside: full results are intact
+    partial = compute_univariate_dynamics(parser, obs, tmin=times[2],
+                                          tmax=times[-3], decimation=2)
+    partial.export_text()
+    stored = initialize_univariate(parser, obs)
+    stored.import_from_text()
+    stored.import_state()
+    assert np.allclose(stored.master.average, full.master.average,
+                       equal_nan=True)
+    assert stored.master.autocorr.shape == full.master.autocorr.shape
+    assert stored.processed == full.processed
+    restricted = initialize_univariate(parser, obs, tmin=times[2],
+                                       tmax=times[-3], decimation=2)
+    restricted.import_from_text()
+    assert np.allclose(restricted.master.average, partial.master.average,
+                       equal_nan=True)
+    # restricted results cannot be updated
+    with pytest.raises(UnivariateIOError):
+        restricted.import_state()
+    univ = update_univariate_dynamics(parser, obs)
+    size = len(univ.eval_times)
+    assert size == len(times)
+    assert len(univ.master.onepoint) == size
+    assert univ.master.autocorr.shape == (size, size)
+    assert sorted(univ.processed.keys()) == ['container_01', 'container_02']
+
+
+def test_binary_export(exp_path):
+    parser = Parser(exp_path)
+    obs = Observable(raw='value')
+    univ = compute_univariate_dynamics(parser, obs)
+    univ.export_binary()
+    other = initialize_univariate(parser, obs)
+    other.import_from_binary(lazy=True)
+    item = other.master
+    # one-point statistics do not need two-point matrices
+    assert np.allclose(item.average, univ.master.average, equal_nan=True)
+    assert np.allclose(item.std, univ.master.std, equal_nan=True)
+    assert item.__dict__['_autocorr'] is None
+    assert isinstance(item.autocorr, np.memmap)
+    assert np.allclose(item.autocorr, univ.master.autocorr, equal_nan=True)
+    assert np.all(item.count_two == univ.master.count_two)
+    # later text export removes binary files, that would shadow it
+    univ.export_text()
+    with pytest.raises(UnivariateIOError):
+        initialize_univariate(parser, obs).import_from_binary()
+
+
+def test_sniff_results(exp_path):
+    parser = Parser(exp_path)
+    obs = Observable(raw='value')
+    univ = compute_univariate_dynamics(parser, obs)
+    univ.export_binary()
+    analysis = os.path.join(exp_path, 'analysis')
+    kinds = [record[0] for record in text.read_manifest(analysis)]
+    assert kinds == ['filterset', 'condition', 'observable']
+    # tree built from manifest and tree built by walking folders agree
+    from_manifest = Sniffer(exp_path)
+    os.remove(os.path.join(analysis, text.MANIFEST_BASENAME))
+    walked = Sniffer(exp_path)
+    assert (sorted(node.data.path for node in from_manifest._tree.all_nodes()) ==
+            sorted(node.data.path for node in walked._tree.all_nodes()))
+    assert from_manifest._tree.depth() == walked._tree.depth() == 4
+    _, loaded, cset, results = load_framework(from_manifest, 1, obs.label(),
+                                              lazy_results=True)
+    assert loaded.label() == obs.label()
+    assert cset == []
+    handle = results['master']
+    assert 'autocorr' in handle.names
+    assert isinstance(handle['autocorr'], np.memmap)
+    assert np.allclose(handle['autocorr'], univ.master.autocorr,
+                       equal_nan=True)
+
+
+def test_restricted_eval_times(exp_path):
+    parser = Parser(exp_path)
+    obs = Observable(raw='value')
+    random.seed(2)
+    np.random.seed(2)
+    full = compute_univariate_dynamics(parser, obs)
+    times = full.eval_times
+    tmin, tmax = times[2], times[-3]
+    random.seed(2)
+    np.random.seed(2)
+    univ = compute_univariate_dynamics(parser, obs, tmin=tmin, tmax=tmax,
+                                       decimation=2)
+    assert np.allclose(univ.eval_times, times[2:-2:2])
+    assert univ.master.autocorr.shape == (len(univ.eval_times),) * 2
+    assert np.all(univ.master.count_one == full.master.count_one[2:-2:2])
+    assert np.allclose(univ.master.average, full.master.average[2:-2:2],
+                       equal_nan=True)
+    assert univ.processed == {}
+
+
+def test_progress(exp_path):
+    parser = Parser(exp_path)
+    obs = Observable(raw='value')
+    reports = []
+    compute_univariate_dynamics(parser, obs, progress=reports.append)
+    last = reports[-1]
+    assert last['done'] and last['eta'] == 0.
+    # without filters, every lineage and frame is processed
+    for what in ['containers', 'lineages', 'frames']:
+        assert last[what] == last['total_' + what]
+    assert last['containers'] == 2
+    assert last['fraction'] == 1.
+
+
+def test_joint_bivariate(exp_path, monkeypatch):
+    # deterministic lineage decomposition
+    monkeypatch.setattr(tuna.base.colony.random, 'uniform', lambda a, b: a)
+    monkeypatch.setattr(tuna.base.colony.random, 'shuffle', lambda seq: None)
+    parser = Parser(exp_path)
+    obs1 = Observable(raw='value')
+    obs2 = Observable(raw='value', differentiate=True)
+    row, col, two = compute_joint_bivariate(parser, obs1, obs2)
+    row_ref = compute_univariate_dynamics(parser, obs1)
+    col_ref = compute_univariate_dynamics(parser, obs2)
+    two_ref = compute_bivariate(row_ref, col_ref)
+    for univ, ref in [(row, row_ref), (col, col_ref)]:
+        assert np.all(univ.master.count_one == ref.master.count_one)
+        assert np.all(univ.master.count_two == ref.master.count_two)
+        assert np.allclose(univ.master.average, ref.master.average,
+                           equal_nan=True)
+        assert np.allclose(univ.master.autocorr, ref.master.autocorr,
+                           equal_nan=True)
+        assert univ.processed == ref.processed
+    assert np.all(two.master.counts == two_ref.master.counts)
+    assert np.allclose(two.master.cross, two_ref.master.cross, equal_nan=True)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_checkpoint(exp_path, monkeypatch):
+    # deterministic lineage decomposition
+    monkeypatch.setattr(tuna.base.colony.random, 'uniform', lambda a, b: a)
+    monkeypatch.setattr(tuna.base.colony.random, 'shuffle', lambda seq: None)
+    parser = Parser(exp_path)
+    obs1 = Observable(raw='value')
+    obs2 = Observable(raw='value', differentiate=True)
+    univs = [compute_univariate_dynamics(parser, obs) for obs in (obs1, obs2)]
+    for univ in univs:
+        univ.export_text()
+    region = Regions(parser).get('ALL')
+    options = CompuParams(disjoint=False)
+    full = compute_stationary_bivariate(univs[0], univs[1], region, options)
+
+    # computation is interrupted after each checkpoint
+    save = Checkpoint.save
+
+    def save_and_interrupt(self):
+        save(self)
+        raise Interrupted()
+
+    monkeypatch.setattr(Checkpoint, 'save', save_and_interrupt)
+    interruptions = 0
+    ckpt_path = get_checkpoint_path(parser.experiment)
+    while True:
+        try:
+            resumed = compute_stationary_bivariate(univs[0], univs[1],
+                                                   region, options,
+                                                   checkpoint=0)
+            break
+        except Interrupted:
+            interruptions += 1
+            assert interruptions < 10
+            # dataframe is written in chunks aside from the main file
+            assert len(os.listdir(ckpt_path)) == 2
+    # stationary univariates are imported: only bivariate is interrupted
+    assert interruptions == 1
+    for name in full['master'].array.dtype.names:
+        assert np.allclose(resumed['master'].array[name],
+                           full['master'].array[name], equal_nan=True)
+    assert len(resumed.dataframe) == len(full.dataframe)
+    # checkpoint is removed once computation is complete
+    assert os.listdir(ckpt_path) == []
+
+    # resumed progress only counts remaining containers
+    with pytest.raises(Interrupted):
+        compute_bivariate(univs[0], univs[1], checkpoint=0)
+    # checkpoint is ignored when univariate averages changed
+    other = compute_univariate_dynamics(parser, obs1, size=1)
+    reports = []
+    monkeypatch.setattr(Checkpoint, 'save', save)
+    compute_bivariate(other, univs[1], progress=reports.append,
+                      checkpoint=0)
+    assert reports[-1]['total_containers'] == 2
+    reports = []
+    compute_bivariate(univs[0], univs[1], progress=reports.append,
+                      checkpoint=0)
+    assert reports[-1]['total_containers'] == 1
+    assert reports[-1]['containers'] == 1
+    assert os.listdir(ckpt_path) == []
+    with pytest.raises(ValueError):
+        compute_stationary_bivariate(univs[0], univs[1], region, options,
+                                     size=2, checkpoint=0)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import pytest
+import numpy as np
+
+from tuna.stats import compute
+
+
+@pytest.fixture
+def eval_times():
+    return np.arange(0., 60., 2.5)
+
+
+def _random_timeseries(eval_times, label):
+    """Random couples (time, value) spanning part of eval_times"""
+    start = np.random.uniform(eval_times[0] - 10., eval_times[-1] - 10.)
+    stop = np.random.uniform(start + 3., eval_times[-1] + 10.)
+    times = np.arange(start, stop, 2.)
+    values = np.random.normal(size=len(times))
+    # punch a few holes
+    values[np.random.uniform(size=len(times)) < 0.1] = np.nan
+    ts = np.zeros(len(times), dtype=[('time', 'f8'), (label, 'f8')])
+    ts['time'] = times
+    ts[label] = values
+    return ts
+
+
+def _new_record(eval_times):
+    size = 2 * len(eval_times) - 1
+    return {'counts': np.zeros(size, dtype=int),
+            'first': np.zeros(size),
+            'second': np.zeros(size)}
+
+
+def test_stationary_cross_fft_matches_direct(eval_times):
+    np.random.seed(42)
+    row_mean = np.random.normal(size=len(eval_times))
+    col_mean = np.random.normal(size=len(eval_times))
+    direct = _new_record(eval_times)
+    fft = _new_record(eval_times)
+    for _ in range(50):
+        row_ts = _random_timeseries(eval_times, 'x')
+        col_ts = _random_timeseries(eval_times, 'y')
+        compute.update_stationary_cross(row_ts, col_ts, eval_times,
+                                        row_mean, col_mean, direct,
+                                        disjoint=False)
+        compute.update_stationary_cross_fft(row_ts, col_ts, eval_times,
+                                            row_mean, col_mean, fft)
+    assert np.all(direct['counts'] == fft['counts'])
+    assert np.allclose(direct['first'], fft['first'])
+    assert np.allclose(direct['second'], fft['second'])
+
+
+class _FakeConditioned(object):
+    """Mimics UnivariateConditioned attributes used for stationary stats"""
+
+    def __init__(self, time, count_two, autocorr):
+        self.time = time
+        self.count_two = count_two
+        self.autocorr = autocorr
+
+
+def test_get_stat_from_dynamics(eval_times):
+    np.random.seed(7)
+    size = len(eval_times)
+    count_two = np.random.randint(1, 20, size=(size, size))
+    autocorr = np.random.normal(size=(size, size))
+    singlecdt = _FakeConditioned(eval_times, count_two, autocorr)
+    dts, counts, res = compute.get_stat_from_dynamics(singlecdt)
+    assert np.allclose(dts, eval_times - eval_times[0])
+    for k in range(size):
+        rows = np.arange(size - k)
+        expected_counts = np.sum(count_two[rows, rows + k])
+        expected = np.sum(count_two[rows, rows + k] *
+                          autocorr[rows, rows + k])/expected_counts
+        assert counts[k] == expected_counts
+        assert np.isclose(res[k], expected)
+
+
+def _random_samples(size, number, offset=0.):
+    """Random samples evaluated on size times, NaNs out of random bounds"""
+    samples = []
+    for _ in range(number):
+        arr = offset + np.random.normal(size=size)
+        start, stop = sorted(np.random.randint(0, size + 1, size=2))
+        arr[:start] = np.nan
+        arr[stop:] = np.nan
+        samples.append(arr)
+    return samples
+
+
+def test_welford_matches_sums():
+    np.random.seed(3)
+    size = 12
+    sums = compute.SumsAccumulator(size)
+    welford = compute.WelfordAccumulator(size)
+    for arr in _random_samples(size, 100):
+        sums.add(arr)
+        welford.add(arr)
+    for expected, value in zip(sums.finalize(), welford.finalize()):
+        assert np.allclose(expected, value, equal_nan=True)
+
+
+def test_welford_merge():
+    np.random.seed(4)
+    size = 12
+    samples = _random_samples(size, 60)
+    whole = compute.WelfordAccumulator(size)
+    first = compute.WelfordAccumulator(size)
+    second = compute.WelfordAccumulator(size)
+    for index, arr in enumerate(samples):
+        whole.add(arr)
+        if index < 25:
+            first.add(arr)
+        else:
+            second.add(arr)
+    first.merge(second)
+    for expected, value in zip(whole.finalize(), first.finalize()):
+        assert np.allclose(expected, value, equal_nan=True)
+
+
+def test_welford_large_values():
+    np.random.seed(5)
+    size = 5
+    welford = compute.WelfordAccumulator(size)
+    samples = [1.e9 + np.random.normal(size=size) for _ in range(1000)]
+    for arr in samples:
+        welford.add(arr)
+    count_one, mean, count_two, autocov = welford.finalize()
+    expected = np.cov(np.array(samples).T, bias=True)
+    assert np.allclose(autocov, expected, atol=1.e-6)
+
+
+def test_single_precision():
+    np.random.seed(6)
+    size = 8
+    samples = _random_samples(size, 500, offset=100.)
+    double = compute.SumsAccumulator(size)
+    single = compute.SumsAccumulator(size, precision='single',
+                                     compensated=True)
+    for arr in samples:
+        double.add(arr)
+        single.add(arr)
+    assert single.twos.dtype == np.float32
+    assert single.count_twos.dtype == np.uint32
+    state = single.get_state()
+    restored = compute.load_accumulator('sums', state)
+    assert restored.precision == 'single' and restored.compensated
+    count_one, mean, count_two, autocov = double.finalize()
+    s_count_one, s_mean, s_count_two, s_autocov = restored.finalize()
+    assert np.all(count_two == s_count_two)
+    assert np.allclose(mean, s_mean, rtol=1.e-6, equal_nan=True)
+    # products of values around 1.e4 are summed in float32
+    assert np.allclose(autocov, s_autocov, atol=2.e-2, equal_nan=True)
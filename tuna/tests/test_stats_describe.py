@@ -0,0 +1,68 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+tuna package
+============
+
+test suite
+~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+from __future__ import print_function
+
+import os
+import pytest
+
+import tuna
+from tuna import Parser, FilterSet
+from tuna.filters.cells import FilterCellIDparity, FilterCycleFrames
+from tuna.stats.describe import count_experiment, summarize
+from tuna.simu.main import SimuParams, DivisionParams
+from tuna.simu.ou import OUParams, OUSimulation
+
+path_data = os.path.join(os.path.dirname(tuna.__file__), 'data')
+path_fake_exp = os.path.join(path_data, 'fake')
+
+
+def test_count_experiment():
+    exp = Parser(path_fake_exp).experiment
+    odd = FilterCellIDparity('odd')
+    fsets = [FilterSet(), odd, FilterSet(filtercell=FilterCycleFrames(4))]
+    counts = count_experiment(exp, fsets)
+    assert list(counts.columns) == ['filterset', 'what', 'size', 'count']
+    # compare to counts from containers postfiltered in place
+    for index, filt in enumerate([None, odd]):
+        cells = 0
+        depths = {}
+        leaves = 0
+        for container in exp.iter_container():
+            container.postfilter(filt=filt, exonerate_root=True)
+            cells += len(container.cells)
+            for tree in container.trees:
+                depths[tree.depth()] = depths.get(tree.depth(), 0) + 1
+                leaves += len(tree.leaves())
+        sub = counts[counts['filterset'] == index]
+        assert sub[sub['what'] == 'cell']['count'].sum() == cells
+        trees = sub[sub['what'] == 'tree']
+        assert dict(zip(trees['size'], trees['count'])) == depths
+        lineages = sub[sub['what'] == 'lineage']
+        assert lineages['count'].sum() == leaves
+        assert (lineages['size'] * lineages['count']).sum() == cells
+    # parallel processing gives same counts (lineages: random sizes)
+    parallel = count_experiment(exp, fsets, processes=2)
+    totals = summarize(counts, fsets)
+    assert summarize(parallel, fsets).equals(totals)
+    assert list(totals.columns) == ['label', 'cell', 'tree', 'lineage']
+
+
+def test_count_simulation():
+    simu = OUSimulation(simuParams=SimuParams(nbr_container=2,
+                                              nbr_colony_per_container=2,
+                                              stop=150.),
+                        divisionParams=DivisionParams(),
+                        ouParams=OUParams(), seed=3)
+    counts = count_experiment(simu, [FilterSet()])
+    cells = sum(len(container.cells) for container in simu.iter_container())
+    sub = counts[counts['what'] == 'cell']
+    assert sub['count'].sum() == cells
+    with pytest.raises(ValueError):
+        count_experiment(simu, [FilterSet()], processes=2)